@@ -1,6 +1,8 @@
 import numpy as np
 from contextlib import contextmanager
 
+_UFUNCS = {"v_add": np.add, "v_sub": np.subtract, "v_mul": np.multiply, "v_div": np.divide}
+
 class NPU:
     def __init__(self, pool_size=10, max_array_size=(1024, 1024)):
         self.internal_registers = {}
@@ -68,3 +70,10 @@ class NPU:
         op_func = self._operations[op_type]
         # The context manager in v_* methods handles returning the array to the pool
         return op_func(operands[0], operands[1])
+
+    def execute_into(self, op_type, a, b, out):
+        """Apply ``op_type`` to ``a`` and ``b`` elementwise into ``out``, without pooling or copies."""
+        ufunc = _UFUNCS.get(op_type)
+        if ufunc is None:
+            raise ValueError(f"Unknown NPU operation type: {op_type}")
+        return ufunc(a, b, out=out)
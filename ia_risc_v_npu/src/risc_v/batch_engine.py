@@ -0,0 +1,227 @@
+"""Lockstep vectorized engine running many instances of one program.
+
+``BatchEngine`` keeps the architectural state of ``N`` independent program
+instances in NumPy arrays: registers are ``(N, 32)``, every instance owns a
+private slice of a ``(N, memory_size)`` byte array, and each instance has its
+own PC. Every step decodes one instruction (shared decode logic with
+:class:`RISCVEngine`) and applies it to all instances sitting at that PC at
+once.
+
+Divergent branches are handled with per-instance PC masks. Each step advances
+the instances at the lowest PC, which lets diverged groups wait for each
+other and reconverge at join points.
+
+All instances must execute the same code: instruction words are fetched from
+the first instance of each group and stores into code are not detected.
+"""
+
+import numpy as np
+
+from src.risc_v.engine import HALT_JAL_INSTRUCTION, decode_instruction
+from src.risc_v.registers import NUM_REGISTERS
+
+DEFAULT_MEMORY_SIZE = 64 * 1024  # bytes per instance
+
+_BYTE_OFFSETS = np.arange(4, dtype=np.int64)
+
+# Branch mnemonic -> (comparison ufunc, compare as signed).
+_BRANCH_COMPARATORS = {
+    "BEQ": (np.equal, False),
+    "BNE": (np.not_equal, False),
+    "BLT": (np.less, True),
+    "BGE": (np.greater_equal, True),
+    "BLTU": (np.less, False),
+    "BGEU": (np.greater_equal, False),
+}
+
+
+class BatchEngine:
+    def __init__(self, num_instances, memory_size=DEFAULT_MEMORY_SIZE):
+        if num_instances <= 0:
+            raise ValueError("BatchEngine requires at least one instance")
+        self.num_instances = num_instances
+        self.memory_size = memory_size
+        self.registers = np.zeros((num_instances, NUM_REGISTERS), dtype=np.uint32)
+        self.memory = np.zeros((num_instances, memory_size), dtype=np.uint8)
+        self.pc = np.zeros(num_instances, dtype=np.int64)
+        self.halted = np.zeros(num_instances, dtype=bool)
+        self.instruction_count = np.zeros(num_instances, dtype=np.int64)
+        self._decode_cache = {}
+        self._executors = {
+            "ADD": self._execute_add,
+            "SUB": self._execute_sub,
+            "XOR": self._execute_xor,
+            "OR": self._execute_or,
+            "AND": self._execute_and,
+            "MUL": self._execute_mul,
+            "DIV": self._execute_div,
+            "LW": self._execute_lw,
+            "SW": self._execute_sw,
+            "FMADD": self._execute_fmadd,
+            "JAL": self._execute_jal,
+            "JALR": self._execute_jalr,
+            "BEQ": self._execute_branch,
+            "BNE": self._execute_branch,
+            "BLT": self._execute_branch,
+            "BGE": self._execute_branch,
+            "BLTU": self._execute_branch,
+            "BGEU": self._execute_branch,
+        }
+
+    def load_program(self, instructions, base_address=0):
+        """Write the same program into every instance and point all PCs at it."""
+        words = np.asarray(list(instructions), dtype=np.uint32)
+        data = words.astype("<u4").view(np.uint8)
+        self._check_bounds(np.array([base_address]), len(data))
+        self.memory[:, base_address:base_address + len(data)] = data
+        self.pc[:] = base_address
+        self.halted[:] = False
+        self._decode_cache.clear()
+
+    def write_memory(self, address, data):
+        """Write per-instance data; ``data`` is ``(N, nbytes)`` or broadcastable."""
+        data = np.asarray(data, dtype=np.uint8)
+        nbytes = data.shape[-1]
+        self._check_bounds(np.array([address]), nbytes)
+        self.memory[:, address:address + nbytes] = data
+
+    def read_words(self, address, count):
+        """Return ``(N, count)`` little-endian words starting at ``address``."""
+        self._check_bounds(np.array([address]), count * 4)
+        raw = np.ascontiguousarray(self.memory[:, address:address + count * 4])
+        return raw.view("<u4").astype(np.uint32)
+
+    def _check_bounds(self, addresses, size):
+        if addresses.size and (addresses.min() < 0 or addresses.max() + size > self.memory_size):
+            raise MemoryError(
+                f"Batch memory access out of bounds: size={size}, memory size={self.memory_size}"
+            )
+
+    def _fetch(self, instance, pc):
+        entry = self._decode_cache.get(pc)
+        if entry is None:
+            self._check_bounds(np.array([pc]), 4)
+            instruction = int(self.memory[instance, pc:pc + 4].view("<u4")[0])
+            if instruction == 0 or instruction == HALT_JAL_INSTRUCTION:
+                entry = (None, ())
+            else:
+                entry = decode_instruction(instruction)
+            self._decode_cache[pc] = entry
+        return entry
+
+    def step(self):
+        """Advance the instances at the lowest active PC by one instruction.
+
+        Returns the number of instances that executed, 0 once all halted.
+        """
+        active = np.flatnonzero(~self.halted)
+        if active.size == 0:
+            return 0
+        active_pcs = self.pc[active]
+        pc = int(active_pcs.min())
+        idx = active[active_pcs == pc]
+
+        spec, operands = self._fetch(int(idx[0]), pc)
+        self.instruction_count[idx] += 1
+        if spec is None:
+            self.halted[idx] = True
+            return idx.size
+
+        self._executors[spec.mnemonic](spec, idx, pc, *operands)
+        if not spec.sets_pc:
+            self.pc[idx] = pc + 4
+        return idx.size
+
+    def run(self, max_steps=0):
+        """Step until every instance halts or ``max_steps`` steps ran.
+
+        Returns the number of steps taken.
+        """
+        steps = 0
+        while max_steps <= 0 or steps < max_steps:
+            if self.step() == 0:
+                break
+            steps += 1
+        return steps
+
+    # --- Helpers ---
+
+    def _write_rd(self, idx, rd, values):
+        if rd != 0:  # x0 is hardwired to zero
+            self.registers[idx, rd] = values
+
+    def _signed(self, idx, reg):
+        return self.registers[idx, reg].view(np.int32)
+
+    # --- ALU ---
+
+    def _execute_add(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] + self.registers[idx, rs2])
+
+    def _execute_sub(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] - self.registers[idx, rs2])
+
+    def _execute_xor(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] ^ self.registers[idx, rs2])
+
+    def _execute_or(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] | self.registers[idx, rs2])
+
+    def _execute_and(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] & self.registers[idx, rs2])
+
+    def _execute_mul(self, spec, idx, pc, rd, rs1, rs2):
+        self._write_rd(idx, rd, self.registers[idx, rs1] * self.registers[idx, rs2])
+
+    def _execute_div(self, spec, idx, pc, rd, rs1, rs2):
+        dividend = self._signed(idx, rs1).astype(np.int64)
+        divisor = self._signed(idx, rs2).astype(np.int64)
+        safe_divisor = np.where(divisor == 0, 1, divisor)
+        quotient = np.abs(dividend) // np.abs(safe_divisor)
+        quotient = np.where((dividend < 0) != (safe_divisor < 0), -quotient, quotient)
+        quotient = np.where(divisor == 0, -1, quotient)
+        self._write_rd(idx, rd, (quotient & 0xFFFFFFFF).astype(np.uint32))
+
+    def _execute_fmadd(self, spec, idx, pc, rd, rs1, rs2, rs3):
+        registers = self.registers
+        self._write_rd(idx, rd, registers[idx, rs1] * registers[idx, rs2] + registers[idx, rs3])
+
+    # --- Memory ---
+
+    def _byte_addresses(self, idx, rs1, imm):
+        addresses = self.registers[idx, rs1].astype(np.int64) + imm
+        self._check_bounds(addresses, 4)
+        return addresses[:, None] + _BYTE_OFFSETS
+
+    def _execute_lw(self, spec, idx, pc, rd, rs1, imm):
+        if rd == 0:
+            return
+        raw = self.memory[idx[:, None], self._byte_addresses(idx, rs1, imm)]
+        self.registers[idx, rd] = np.ascontiguousarray(raw).view("<u4")[:, 0]
+
+    def _execute_sw(self, spec, idx, pc, rs1, rs2, imm):
+        values = self.registers[idx, rs2].astype("<u4")
+        self.memory[idx[:, None], self._byte_addresses(idx, rs1, imm)] = (
+            values.view(np.uint8).reshape(-1, 4)
+        )
+
+    # --- Control flow ---
+
+    def _execute_jal(self, spec, idx, pc, rd, imm):
+        self._write_rd(idx, rd, pc + 4)
+        self.pc[idx] = pc + imm
+
+    def _execute_jalr(self, spec, idx, pc, rd, rs1, imm):
+        targets = (self.registers[idx, rs1].astype(np.int64) + imm) & 0xFFFFFFFE
+        self._write_rd(idx, rd, pc + 4)
+        self.pc[idx] = targets
+
+    def _execute_branch(self, spec, idx, pc, rs1, rs2, imm):
+        compare, signed = _BRANCH_COMPARATORS[spec.mnemonic]
+        if signed:
+            taken = compare(self._signed(idx, rs1), self._signed(idx, rs2))
+        else:
+            taken = compare(self.registers[idx, rs1], self.registers[idx, rs2])
+        self.pc[idx] = np.where(taken, pc + imm, pc + 4)
+
+__all__ = ["BatchEngine", "DEFAULT_MEMORY_SIZE"]
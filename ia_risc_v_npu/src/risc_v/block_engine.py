@@ -0,0 +1,240 @@
+"""Basic-block translating execution engine.
+
+Guest code is split into basic blocks that end at a branch, JAL, halt or an
+instruction the translator does not handle. Each block is translated once into
+a specialized Python function operating on a plain register list and cached by
+entry PC, so the dispatcher makes one call per block instead of one per
+instruction. Anything the translator does not cover falls back to the
+interpreter in :class:`RISCVEngine`.
+"""
+
+import logging
+
+from src.risc_v.engine import (
+    CODE_PAGE_SHIFT,
+    HALT_JAL_INSTRUCTION,
+    OPERAND_FIELDS,
+    RISCVEngine,
+    RunResult,
+    StopReason,
+    decode_instruction,
+)
+from src.risc_v.instructions import alu, memory
+from src.risc_v.registers import to_signed
+
+# Upper bound on straight-line code translated into a single block.
+MAX_BLOCK_INSTRUCTIONS = 64
+
+# Straight-line instructions by mnemonic. Templates writing ``rd`` are skipped
+# entirely when ``rd`` is x0.
+_RD_TEMPLATES = {
+    "ADD": "r[{rd}] = (r[{rs1}] + r[{rs2}]) & 0xFFFFFFFF",
+    "SUB": "r[{rd}] = (r[{rs1}] - r[{rs2}]) & 0xFFFFFFFF",
+    "XOR": "r[{rd}] = r[{rs1}] ^ r[{rs2}]",
+    "OR": "r[{rd}] = r[{rs1}] | r[{rs2}]",
+    "AND": "r[{rd}] = r[{rs1}] & r[{rs2}]",
+    "MUL": "r[{rd}] = (r[{rs1}] * r[{rs2}]) & 0xFFFFFFFF",
+    "DIV": "r[{rd}] = div(to_signed(r[{rs1}]), to_signed(r[{rs2}])) & 0xFFFFFFFF",
+    "LW": "r[{rd}] = lw(bus, r[{rs1}] + {imm})",
+    "FMADD": "r[{rd}] = (r[{rs1}] * r[{rs2}] + r[{rs3}]) & 0xFFFFFFFF",
+}
+_STORE_TEMPLATES = {
+    "SW": "sw(bus, r[{rs1}] + {imm}, r[{rs2}])",
+}
+
+# Signed comparisons flip the sign bit so unsigned register values order correctly.
+_BRANCH_CONDITIONS = {
+    "BEQ": "r[{rs1}] == r[{rs2}]",
+    "BNE": "r[{rs1}] != r[{rs2}]",
+    "BLT": "(r[{rs1}] ^ 0x80000000) < (r[{rs2}] ^ 0x80000000)",
+    "BGE": "(r[{rs1}] ^ 0x80000000) >= (r[{rs2}] ^ 0x80000000)",
+    "BLTU": "r[{rs1}] < r[{rs2}]",
+    "BGEU": "r[{rs1}] >= r[{rs2}]",
+}
+
+_BLOCK_GLOBALS = {"lw": memory.lw, "sw": memory.sw, "div": alu.div, "to_signed": to_signed}
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TranslatedBlock:
+    """A translated basic block and its chained successors."""
+
+    __slots__ = ("pc", "end_pc", "length", "function", "exits", "valid")
+
+    def __init__(self, pc, end_pc, length, function):
+        self.pc = pc
+        self.end_pc = end_pc
+        self.length = length
+        # ``None`` means the entry instruction must be interpreted.
+        self.function = function
+        # Successor blocks keyed by the PC the block returned.
+        self.exits = {}
+        self.valid = True
+
+
+class BlockEngine(RISCVEngine):
+    """RISC-V engine that executes translated basic blocks.
+
+    Registers always use the ``"int"`` backend: a plain ``list`` of Python ints
+    in ``[0, 2**32)``.
+    Stores into translated code invalidate the affected blocks; a block that
+    modifies its own code observes the change from the next block on.
+    """
+
+    def __init__(self, bus):
+        super().__init__(bus, register_backend="int")
+        self._blocks = {}
+        self._block_pages = {}
+
+    def invalidate_decode_cache(self):
+        super().invalidate_decode_cache()
+        for block in self._blocks.values():
+            block.valid = False
+        self._blocks.clear()
+        self._block_pages.clear()
+
+    def _on_bus_write(self, address, size):
+        super()._on_bus_write(address, size)
+        block_pages = self._block_pages
+        if not block_pages:
+            return
+        end = address + size
+        for page in range(address >> CODE_PAGE_SHIFT, ((end - 1) >> CODE_PAGE_SHIFT) + 1):
+            entry_pcs = block_pages.get(page)
+            if not entry_pcs:
+                continue
+            for entry_pc in list(entry_pcs):
+                block = self._blocks.get(entry_pc)
+                if block is None or (address < block.end_pc and block.pc < end):
+                    self._drop_block(entry_pc)
+
+    def _drop_block(self, entry_pc):
+        block = self._blocks.pop(entry_pc, None)
+        if block is None:
+            return
+        block.valid = False
+        for page in range(block.pc >> CODE_PAGE_SHIFT, ((block.end_pc - 1) >> CODE_PAGE_SHIFT) + 1):
+            entry_pcs = self._block_pages.get(page)
+            if entry_pcs is not None:
+                entry_pcs.discard(entry_pc)
+                if not entry_pcs:
+                    del self._block_pages[page]
+
+    def _translate_instruction(self, instruction, pc):
+        """Return ``(source_lines, terminates)`` or ``None`` if untranslatable."""
+        if instruction == 0 or instruction == HALT_JAL_INSTRUCTION:
+            return None
+        try:
+            spec, operands = decode_instruction(instruction)
+        except ValueError:
+            return None
+
+        mnemonic = spec.mnemonic
+        fields = dict(zip(OPERAND_FIELDS[spec.fmt], operands))
+        if mnemonic in _RD_TEMPLATES:
+            if fields["rd"] == 0:
+                return [], False
+            return [_RD_TEMPLATES[mnemonic].format(**fields)], False
+        if mnemonic in _STORE_TEMPLATES:
+            return [_STORE_TEMPLATES[mnemonic].format(**fields)], False
+        if mnemonic in _BRANCH_CONDITIONS:
+            return [
+                "if " + _BRANCH_CONDITIONS[mnemonic].format(**fields) + ":",
+                f"    return {pc + fields['imm']}",
+                f"return {pc + 4}",
+            ], True
+        if mnemonic == "JAL":
+            lines = [f"r[{fields['rd']}] = {pc + 4}"] if fields["rd"] != 0 else []
+            lines.append(f"return {pc + fields['imm']}")
+            return lines, True
+        if mnemonic == "JALR":
+            lines = [f"target = (r[{fields['rs1']}] + {fields['imm']}) & 0xFFFFFFFE"]
+            if fields["rd"] != 0:
+                lines.append(f"r[{fields['rd']}] = {pc + 4}")
+            lines.append("return target")
+            return lines, True
+        return None
+
+    def _translate_block(self, entry_pc):
+        pc = entry_pc
+        body = []
+        length = 0
+        terminated = False
+        while length < MAX_BLOCK_INSTRUCTIONS:
+            translated = self._translate_instruction(self._read_word(pc), pc)
+            if translated is None:
+                break
+            lines, terminated = translated
+            body.extend(lines)
+            length += 1
+            pc += 4
+            if terminated:
+                break
+
+        if length == 0:
+            block = TranslatedBlock(entry_pc, entry_pc + 4, 1, None)
+        else:
+            if not terminated:
+                body.append(f"return {pc}")
+            name = f"block_{entry_pc:08x}"
+            source = f"def {name}(r, bus):\n" + "".join(f"    {line}\n" for line in body)
+            namespace = dict(_BLOCK_GLOBALS)
+            exec(compile(source, f"<{name}>", "exec"), namespace)
+            block = TranslatedBlock(entry_pc, pc, length, namespace[name])
+            LOGGER.debug("translated block 0x%08x-0x%08x (%s instructions)", entry_pc, pc, length)
+
+        self._blocks[entry_pc] = block
+        for page in range(entry_pc >> CODE_PAGE_SHIFT, ((block.end_pc - 1) >> CODE_PAGE_SHIFT) + 1):
+            self._block_pages.setdefault(page, set()).add(entry_pc)
+        return block
+
+    def run(self, max_instructions=0, fetch_hook=None):
+        """Execute blocks until halt or until ``max_instructions`` retire.
+
+        Per-instruction ``fetch_hook`` and data hook calls cannot be made from
+        inside a translated block, so runs with either hook use the interpreter.
+        """
+        if fetch_hook is not None or self._data_hook is not None or not self._decode_cache_enabled:
+            return super().run(max_instructions, fetch_hook)
+
+        start_count = self.instruction_count
+        limit = start_count + max_instructions if max_instructions > 0 else None
+        registers = self.registers
+        bus = self.bus
+        blocks = self._blocks
+        block = None
+        reason = StopReason.LIMIT
+        while True:
+            if block is None or not block.valid:
+                block = blocks.get(self.pc)
+                if block is None:
+                    block = self._translate_block(self.pc)
+
+            if block.function is None or (
+                limit is not None and self.instruction_count + block.length > limit
+            ):
+                if limit is not None and self.instruction_count >= limit:
+                    break
+                if self.execute_instruction() == "halt":
+                    reason = StopReason.HALT
+                    break
+                block = None
+                continue
+
+            next_pc = block.function(registers, bus)
+            self.instruction_count += block.length
+            self.pc = next_pc
+            successor = block.exits.get(next_pc)
+            if successor is None or not successor.valid:
+                successor = blocks.get(next_pc)
+                if successor is None:
+                    successor = self._translate_block(next_pc)
+                if block.valid:
+                    block.exits[next_pc] = successor
+            block = successor
+
+        executed = self.instruction_count - start_count - (reason is StopReason.HALT)
+        return RunResult(executed=executed, reason=reason, pc=self.pc)
+
+__all__ = ["BlockEngine", "TranslatedBlock", "MAX_BLOCK_INSTRUCTIONS"]
@@ -1,7 +1,12 @@
 import logging
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
 
 from src.risc_v.instructions import alu, memory, control_flow
-import numpy as np
+from src.risc_v.registers import create_register_file, register_array, to_signed
+from src.risc_v.tracing import TRACE_CONTROL, TRACE_INSTRUCTION, LoggingTraceSink
 
 # Instruction format constants
 OPCODE_R_TYPE = 0b0110011
@@ -10,6 +15,7 @@ OPCODE_S_TYPE_STORE = 0b0100011
 OPCODE_B_TYPE = 0b1100011
 OPCODE_R4_TYPE_FMADD = 0b1000011
 OPCODE_J_TYPE_JAL = 0b1101111
+OPCODE_I_TYPE_JALR = 0b1100111
 
 # Funct3 constants for R-type
 FUNCT3_ADD_SUB = 0b000
@@ -20,30 +26,180 @@ FUNCT3_AND = 0b111
 # Funct7 constants for R-type
 FUNCT7_ADD = 0b0000000
 FUNCT7_SUB = 0b0100000
+FUNCT7_MULDIV = 0b0000001
+
+# Funct3 constants for RV32M
+FUNCT3_MUL = 0b000
+FUNCT3_DIV = 0b100
 
 # Funct3 constants for other types
 FUNCT3_LW = 0b010
 FUNCT3_SW = 0b010
 FUNCT3_FMADD = 0b000
+FUNCT3_JALR = 0b000
+
+# Funct3 constants for B-type
+FUNCT3_BEQ = 0b000
+FUNCT3_BNE = 0b001
+FUNCT3_BLT = 0b100
+FUNCT3_BGE = 0b101
+FUNCT3_BLTU = 0b110
+FUNCT3_BGEU = 0b111
+
+# JAL x0, 0 jumps to itself and is treated as a halt.
+HALT_JAL_INSTRUCTION = OPCODE_J_TYPE_JAL
+
+# Decoded instructions are tracked per code page so bus writes can invalidate them.
+CODE_PAGE_SHIFT = 12
 
 LOGGER = logging.getLogger(__name__)
 
 
+class StopReason(Enum):
+    """Why :meth:`RISCVEngine.run` returned."""
+
+    HALT = "halt"
+    LIMIT = "max_instructions"
+
+
+@dataclass(slots=True)
+class RunResult:
+    executed: int
+    reason: StopReason
+    pc: int
+    latency: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class InstructionSpec:
+    """Declarative description of one instruction understood by the engine.
+
+    ``funct3``/``funct7`` of ``None`` mean the field does not select the
+    instruction. ``handler`` names the ``RISCVEngine`` method that executes it
+    with the operands produced for ``fmt``.
+    """
+
+    mnemonic: str
+    opcode: int
+    fmt: str
+    handler: str
+    funct3: Optional[int] = None
+    funct7: Optional[int] = None
+    sets_pc: bool = False
+
+    @property
+    def key(self):
+        return self.opcode, self.funct3, self.funct7
+
+
+# Human readable names used in "unsupported instruction" errors.
+_OPCODE_CLASSES = {
+    OPCODE_R_TYPE: "ALU",
+    OPCODE_I_TYPE_LOAD: "load",
+    OPCODE_S_TYPE_STORE: "store",
+    OPCODE_B_TYPE: "branch",
+    OPCODE_R4_TYPE_FMADD: "FMADD",
+    OPCODE_I_TYPE_JALR: "JALR",
+}
+
+# Operand names produced by RISCVEngine._decode_operands for each format.
+OPERAND_FIELDS = {
+    "R": ("rd", "rs1", "rs2"),
+    "I": ("rd", "rs1", "imm"),
+    "S": ("rs1", "rs2", "imm"),
+    "B": ("rs1", "rs2", "imm"),
+    "J": ("rd", "imm"),
+    "R4": ("rd", "rs1", "rs2", "rs3"),
+}
+
+_INSTRUCTION_SPECS = []
+
+
+def instruction(mnemonic, opcode, fmt, *, funct3=None, funct7=None, sets_pc=False):
+    """Register the decorated ``RISCVEngine`` method as an instruction handler."""
+    def register(handler):
+        _INSTRUCTION_SPECS.append(
+            InstructionSpec(mnemonic, opcode, fmt, handler.__name__, funct3, funct7, sets_pc)
+        )
+        return handler
+    return register
+
+
 class RISCVEngine:
-    def __init__(self, bus):
+    def __init__(self, bus, register_backend="numpy", trace=None):
         self.pc = 0
-        self.registers = np.zeros(32, dtype=np.uint32)
+        self.register_backend = register_backend
+        self.registers = create_register_file(register_backend)
         self.bus = bus
         self.instruction_count = 0
 
+        # Predecoded instructions keyed by PC: (handler, operands, sets_pc, word).
+        self._decode_cache = {}
+        self._code_pages = {}
+        # The same entries keyed by instruction word (without the PC operand of
+        # control flow), so code that runs once still decodes each distinct
+        # word only once. Keyed by content, they never go stale.
+        self._decoded_words = {}
+        add_write_observer = getattr(bus, "add_write_observer", None)
+        # Without write notifications a cached entry could go stale, so only
+        # buses that report writes get the cache.
+        self._decode_cache_enabled = add_write_observer is not None
+        if self._decode_cache_enabled:
+            add_write_observer(self._on_bus_write)
+        self._backward_branch_hook = None
+        self._data_hook = None
+        # Latency the data hook charged since the last run() picked it up.
+        self.data_latency = 0
+
+        # Tracing is fixed at construction: traced engines swap in dedicated
+        # loops so the default ones contain no tracing code.
+        self.trace = trace
+        if trace is not None:
+            self.execute_instruction = self._execute_traced_instruction
+            self.run = self._run_traced
+
         # Initialize registers for testing
         self.registers[2] = 10
         self.registers[3] = 20
 
+    def register_array(self):
+        """Return the register file as a ``np.uint32`` array for inspection."""
+        return register_array(self.registers)
+
     def _read_word(self, address):
-        return int.from_bytes(self.bus.read(address, 4), 'little')
+        return self.bus.read_u32(address)
 
-    def _decode_r_type_instruction(self, instruction):
+    def invalidate_decode_cache(self):
+        """Drop every predecoded instruction.
+
+        Writes routed through the bus invalidate affected entries automatically;
+        call this after modifying code storage behind the bus's back.
+        """
+        self._decode_cache.clear()
+        self._code_pages.clear()
+        self._decoded_words.clear()
+
+    def _on_bus_write(self, address, size):
+        code_pages = self._code_pages
+        if not code_pages:
+            return
+        end = address + size
+        for page in range(address >> CODE_PAGE_SHIFT, ((end - 1) >> CODE_PAGE_SHIFT) + 1):
+            cached_pcs = code_pages.get(page)
+            if cached_pcs is None:
+                continue
+            if size <= 64:
+                stale = [pc for pc in range(address & ~3, end, 4) if pc in cached_pcs]
+            else:
+                stale = [pc for pc in cached_pcs if address < pc + 4 and pc < end]
+            for pc in stale:
+                cached_pcs.discard(pc)
+                self._decode_cache.pop(pc, None)
+            if not cached_pcs:
+                del code_pages[page]
+
+    @staticmethod
+    def _decode_r_type_instruction(instruction):
         opcode = instruction & 0x7F
         rd = (instruction >> 7) & 0x1F
         funct3 = (instruction >> 12) & 0x7
@@ -52,7 +208,8 @@ class RISCVEngine:
         funct7 = (instruction >> 25) & 0x7F
         return opcode, rd, funct3, rs1, rs2, funct7
 
-    def _decode_i_type_instruction(self, instruction):
+    @staticmethod
+    def _decode_i_type_instruction(instruction):
         opcode = instruction & 0x7F
         rd = (instruction >> 7) & 0x1F
         funct3 = (instruction >> 12) & 0x7
@@ -62,7 +219,8 @@ class RISCVEngine:
             imm -= 1 << 12
         return opcode, rd, funct3, rs1, imm
 
-    def _decode_s_type_instruction(self, instruction):
+    @staticmethod
+    def _decode_s_type_instruction(instruction):
         opcode = instruction & 0x7F
         imm1 = (instruction >> 7) & 0x1F
         funct3 = (instruction >> 12) & 0x7
@@ -74,7 +232,8 @@ class RISCVEngine:
             imm -= 1 << 12
         return opcode, funct3, rs1, rs2, imm
 
-    def _decode_r4_type_instruction(self, instruction):
+    @staticmethod
+    def _decode_r4_type_instruction(instruction):
         opcode = instruction & 0x7F
         rd = (instruction >> 7) & 0x1F
         funct3 = (instruction >> 12) & 0x7
@@ -83,7 +242,8 @@ class RISCVEngine:
         rs3 = (instruction >> 27) & 0x1F
         return opcode, rd, funct3, rs1, rs2, rs3
 
-    def _decode_j_type_instruction(self, instruction: int) -> tuple[int, int, int]:
+    @staticmethod
+    def _decode_j_type_instruction(instruction: int) -> tuple[int, int, int]:
         imm_20 = (instruction >> 31) & 0x1
         imm_10_1 = (instruction >> 21) & 0x3FF
         imm_11 = (instruction >> 20) & 0x1
@@ -100,7 +260,8 @@ class RISCVEngine:
 
         return opcode, rd, imm
 
-    def _decode_b_type_instruction(self, instruction):
+    @staticmethod
+    def _decode_b_type_instruction(instruction):
         opcode = instruction & 0x7F
         imm1 = (instruction >> 7) & 0x1F
         funct3 = (instruction >> 12) & 0x7
@@ -117,118 +278,370 @@ class RISCVEngine:
             imm -= (1 << 13)
         return opcode, funct3, rs1, rs2, imm
 
-    def _execute_alu_instruction(self, funct3, rd, rs1, rs2, funct7):
-        if rd == 0: # x0 is hardwired to zero, so no-op
-            return
+    @classmethod
+    def _decode_operands(cls, fmt, instruction):
+        if fmt == "R":
+            _, rd, _, rs1, rs2, _ = cls._decode_r_type_instruction(instruction)
+            return rd, rs1, rs2
+        if fmt == "I":
+            _, rd, _, rs1, imm = cls._decode_i_type_instruction(instruction)
+            return rd, rs1, imm
+        if fmt == "S":
+            _, _, rs1, rs2, imm = cls._decode_s_type_instruction(instruction)
+            return rs1, rs2, imm
+        if fmt == "B":
+            _, _, rs1, rs2, imm = cls._decode_b_type_instruction(instruction)
+            return rs1, rs2, imm
+        if fmt == "J":
+            _, rd, imm = cls._decode_j_type_instruction(instruction)
+            return rd, imm
+        if fmt == "R4":
+            _, rd, _, rs1, rs2, rs3 = cls._decode_r4_type_instruction(instruction)
+            return rd, rs1, rs2, rs3
+        raise ValueError(f"Unknown instruction format: {fmt}")
 
-        result = 0
-        if funct3 == FUNCT3_ADD_SUB:
-            if funct7 == FUNCT7_ADD:
-                result = alu.add(self.registers[rs1], self.registers[rs2])
-            elif funct7 == FUNCT7_SUB:
-                result = alu.sub(self.registers[rs1], self.registers[rs2])
-            else:
-                raise ValueError(f"Unsupported ALU instruction for funct3={funct3}: funct7={funct7}")
-        elif funct3 == FUNCT3_XOR:
-            result = alu.xor(self.registers[rs1], self.registers[rs2])
-        elif funct3 == FUNCT3_OR:
-            result = alu.or_(self.registers[rs1], self.registers[rs2])
-        elif funct3 == FUNCT3_AND:
-            result = alu.and_(self.registers[rs1], self.registers[rs2])
-        else:
-            raise ValueError(f"Unsupported ALU instruction: funct3={funct3}")
-        
-        self.registers[rd] = result & 0xFFFFFFFF
+    # --- RV32I ALU ---
 
-    def _execute_load_instruction(self, funct3, rd, rs1, imm):
-        if funct3 == FUNCT3_LW:
-            address = self.registers[rs1] + imm
-            if rd != 0:
-                self.registers[rd] = memory.lw(self.bus, address)
-        else:
-            raise ValueError(f"Unsupported load instruction: funct3={funct3}")
+    @instruction("ADD", OPCODE_R_TYPE, "R", funct3=FUNCT3_ADD_SUB, funct7=FUNCT7_ADD)
+    def _execute_add(self, rd, rs1, rs2):
+        if rd != 0:  # x0 is hardwired to zero, so no-op
+            self.registers[rd] = alu.add(self.registers[rs1], self.registers[rs2]) & 0xFFFFFFFF
 
-    def _execute_store_instruction(self, funct3, rs1, rs2, imm):
-        if funct3 == FUNCT3_SW:
-            address = self.registers[rs1] + imm
-            memory.sw(self.bus, address, self.registers[rs2])
-        else:
-            raise ValueError(f"Unsupported store instruction: funct3={funct3}")
+    @instruction("SUB", OPCODE_R_TYPE, "R", funct3=FUNCT3_ADD_SUB, funct7=FUNCT7_SUB)
+    def _execute_sub(self, rd, rs1, rs2):
+        if rd != 0:
+            self.registers[rd] = alu.sub(self.registers[rs1], self.registers[rs2]) & 0xFFFFFFFF
 
-    def _execute_fmadd_instruction(self, funct3, rd, rs1, rs2, rs3):
-        if funct3 == FUNCT3_FMADD:
-            if rd != 0:
-                result = alu.fmadd(self.registers[rs1], self.registers[rs2], self.registers[rs3])
-                self.registers[rd] = result & 0xFFFFFFFF
-        else:
-            raise ValueError(f"Unsupported FMADD instruction: funct3={funct3}")
+    @instruction("XOR", OPCODE_R_TYPE, "R", funct3=FUNCT3_XOR, funct7=FUNCT7_ADD)
+    def _execute_xor(self, rd, rs1, rs2):
+        if rd != 0:
+            self.registers[rd] = alu.xor(self.registers[rs1], self.registers[rs2]) & 0xFFFFFFFF
+
+    @instruction("OR", OPCODE_R_TYPE, "R", funct3=FUNCT3_OR, funct7=FUNCT7_ADD)
+    def _execute_or(self, rd, rs1, rs2):
+        if rd != 0:
+            self.registers[rd] = alu.or_(self.registers[rs1], self.registers[rs2]) & 0xFFFFFFFF
 
-    def _execute_jal_instruction(self, rd, imm, original_pc):
+    @instruction("AND", OPCODE_R_TYPE, "R", funct3=FUNCT3_AND, funct7=FUNCT7_ADD)
+    def _execute_and(self, rd, rs1, rs2):
+        if rd != 0:
+            self.registers[rd] = alu.and_(self.registers[rs1], self.registers[rs2]) & 0xFFFFFFFF
+
+    # --- RV32M ---
+
+    @instruction("MUL", OPCODE_R_TYPE, "R", funct3=FUNCT3_MUL, funct7=FUNCT7_MULDIV)
+    def _execute_mul(self, rd, rs1, rs2):
+        if rd != 0:
+            product = alu.mul(int(self.registers[rs1]), int(self.registers[rs2]))
+            self.registers[rd] = product & 0xFFFFFFFF
+
+    @instruction("DIV", OPCODE_R_TYPE, "R", funct3=FUNCT3_DIV, funct7=FUNCT7_MULDIV)
+    def _execute_div(self, rd, rs1, rs2):
+        if rd != 0:
+            quotient = alu.div(to_signed(self.registers[rs1]), to_signed(self.registers[rs2]))
+            self.registers[rd] = quotient & 0xFFFFFFFF
+
+    # --- Memory ---
+
+    @instruction("LW", OPCODE_I_TYPE_LOAD, "I", funct3=FUNCT3_LW)
+    def _execute_lw(self, rd, rs1, imm):
+        if rd != 0:
+            self.registers[rd] = memory.lw(self.bus, int(self.registers[rs1]) + imm)
+
+    @instruction("SW", OPCODE_S_TYPE_STORE, "S", funct3=FUNCT3_SW)
+    def _execute_sw(self, rs1, rs2, imm):
+        memory.sw(self.bus, int(self.registers[rs1]) + imm, self.registers[rs2])
+
+    @instruction("FMADD", OPCODE_R4_TYPE_FMADD, "R4", funct3=FUNCT3_FMADD)
+    def _execute_fmadd(self, rd, rs1, rs2, rs3):
+        if rd != 0:
+            result = alu.fmadd(self.registers[rs1], self.registers[rs2], self.registers[rs3])
+            self.registers[rd] = result & 0xFFFFFFFF
+
+    # --- Control flow (handlers receive the instruction's PC last) ---
+
+    @instruction("JAL", OPCODE_J_TYPE_JAL, "J", sets_pc=True)
+    def _execute_jal(self, rd, imm, original_pc):
         if rd != 0:
             self.registers[rd] = original_pc + 4
         self.pc = original_pc + imm
 
-    def _execute_branch_instruction(self, funct3, rs1, rs2, imm, original_pc):
-        val1 = self.registers[rs1]
-        val2 = self.registers[rs2]
-        
-        branch_taken = False
-        if funct3 == 0b000: # BEQ
-            branch_taken = control_flow.beq(val1, val2)
-        elif funct3 == 0b001: # BNE
-            branch_taken = control_flow.bne(val1, val2)
-        elif funct3 == 0b100: # BLT
-            branch_taken = control_flow.blt(val1, val2)
-        elif funct3 == 0b101: # BGE
-            branch_taken = control_flow.bge(val1, val2)
-        elif funct3 == 0b110: # BLTU
-            branch_taken = control_flow.bltu(val1, val2)
-        elif funct3 == 0b111: # BGEU
-            branch_taken = control_flow.bgeu(val1, val2)
-
-        if branch_taken:
+    @instruction("JALR", OPCODE_I_TYPE_JALR, "I", funct3=FUNCT3_JALR, sets_pc=True)
+    def _execute_jalr(self, rd, rs1, imm, original_pc):
+        target = (int(self.registers[rs1]) + imm) & 0xFFFFFFFE
+        if rd != 0:
+            self.registers[rd] = original_pc + 4
+        self.pc = target
+
+    def _branch(self, taken, imm, original_pc):
+        if taken:
             self.pc = original_pc + imm
-            LOGGER.debug("branch taken: 0x%08x -> 0x%08x", original_pc, self.pc)
+        else:
+            self.pc = original_pc + 4
+
+    @instruction("BEQ", OPCODE_B_TYPE, "B", funct3=FUNCT3_BEQ, sets_pc=True)
+    def _execute_beq(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.beq(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    @instruction("BNE", OPCODE_B_TYPE, "B", funct3=FUNCT3_BNE, sets_pc=True)
+    def _execute_bne(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.bne(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    @instruction("BLT", OPCODE_B_TYPE, "B", funct3=FUNCT3_BLT, sets_pc=True)
+    def _execute_blt(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.blt(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    @instruction("BGE", OPCODE_B_TYPE, "B", funct3=FUNCT3_BGE, sets_pc=True)
+    def _execute_bge(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.bge(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    @instruction("BLTU", OPCODE_B_TYPE, "B", funct3=FUNCT3_BLTU, sets_pc=True)
+    def _execute_bltu(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.bltu(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    @instruction("BGEU", OPCODE_B_TYPE, "B", funct3=FUNCT3_BGEU, sets_pc=True)
+    def _execute_bgeu(self, rs1, rs2, imm, original_pc):
+        self._branch(control_flow.bgeu(self.registers[rs1], self.registers[rs2]), imm, original_pc)
+
+    def _decode(self, instruction):
+        """Resolve an instruction word to ``(handler, operands, sets_pc, word)``.
+
+        A ``None`` handler marks a halt instruction. Handlers with ``sets_pc``
+        also take the instruction's PC, which the caller appends.
+        """
+        if instruction == 0 or instruction == HALT_JAL_INSTRUCTION:
+            return None, (), False, instruction
+
+        spec, operands = decode_instruction(instruction)
+        handler = getattr(self, spec.handler)
+        if self._backward_branch_hook is not None and spec.fmt == "B" and operands[2] < 0:
+            handler = self._with_backward_branch_hook(handler)
+        if self._data_hook is not None:
+            if spec.opcode == OPCODE_S_TYPE_STORE:
+                handler = self._with_data_hook(handler, is_write=True)
+            elif spec.opcode == OPCODE_I_TYPE_LOAD and operands[0] != 0:
+                handler = self._with_data_hook(handler, is_write=False)
+        return handler, operands, spec.sets_pc, instruction
+
+    def set_backward_branch_hook(self, hook):
+        """Call ``hook(engine, branch_pc)`` after every taken backward branch.
+
+        The hook may rewrite registers, ``pc`` and ``instruction_count``. It is
+        bound at decode time, so engines without a hook pay nothing for it.
+        Pass ``None`` to remove the hook.
+        """
+        self._backward_branch_hook = hook
+        self.invalidate_decode_cache()
+
+    def _with_backward_branch_hook(self, handler):
+        hook = self._backward_branch_hook
+
+        def hooked_branch(rs1, rs2, imm, original_pc):
+            handler(rs1, rs2, imm, original_pc)
+            if self.pc == original_pc + imm:
+                hook(self, original_pc)
+
+        return hooked_branch
+
+    @property
+    def data_hook(self):
+        return self._data_hook
+
+    def set_data_hook(self, hook):
+        """Call ``hook(address, size, is_write)`` after every load and store.
+
+        Its return values accumulate in ``data_latency``, which :meth:`run`
+        adds to the run's ``latency``. Loads into x0 make no access and are not
+        reported. Like the backward-branch hook it is bound at decode time;
+        pass ``None`` to remove it.
+        """
+        self._data_hook = hook
+        self.invalidate_decode_cache()
+
+    def _with_data_hook(self, handler, is_write):
+        hook = self._data_hook
+
+        if is_write:
+            def hooked_access(rs1, rs2, imm):
+                handler(rs1, rs2, imm)
+                self.data_latency += hook(int(self.registers[rs1]) + imm, 4, True)
+        else:
+            def hooked_access(rd, rs1, imm):
+                # Read the base first: the load may overwrite it.
+                address = int(self.registers[rs1]) + imm
+                handler(rd, rs1, imm)
+                self.data_latency += hook(address, 4, False)
+
+        return hooked_access
+
+    def _fetch_decoded(self, pc):
+        word = self._read_word(pc)
+        entry = self._decoded_words.get(word)
+        if entry is None:
+            entry = self._decoded_words[word] = self._decode(word)
+        if entry[2]:
+            entry = (entry[0], entry[1] + (pc,), True, word)
+        if self._decode_cache_enabled:
+            self._decode_cache[pc] = entry
+            page = pc >> CODE_PAGE_SHIFT
+            cached_pcs = self._code_pages.get(page)
+            if cached_pcs is None:
+                cached_pcs = self._code_pages[page] = set()
+            cached_pcs.add(pc)
+        return entry
 
     def execute_instruction(self):
         self.instruction_count += 1
-        instruction = self._read_word(self.pc)
-        LOGGER.debug("pc=0x%08x instruction=0x%08x", self.pc, instruction)
-        original_pc = self.pc
-        opcode = instruction & 0x7F
-
-        if instruction == 0:
+        pc = self.pc
+        entry = self._decode_cache.get(pc)
+        if entry is None:
+            entry = self._fetch_decoded(pc)
+        handler, operands, sets_pc, instruction = entry
+        if handler is None:
             return "halt"
 
-        pc_changed = False
-        if opcode == OPCODE_R_TYPE:
-            _, rd, funct3, rs1, rs2, funct7 = self._decode_r_type_instruction(instruction)
-            self._execute_alu_instruction(funct3, rd, rs1, rs2, funct7)
-        elif opcode == OPCODE_I_TYPE_LOAD:
-            _, rd, funct3, rs1, imm = self._decode_i_type_instruction(instruction)
-            self._execute_load_instruction(funct3, rd, rs1, imm)
-        elif opcode == OPCODE_S_TYPE_STORE:
-            _, funct3, rs1, rs2, imm = self._decode_s_type_instruction(instruction)
-            self._execute_store_instruction(funct3, rs1, rs2, imm)
-        elif opcode == OPCODE_B_TYPE:
-            _, funct3, rs1, rs2, imm = self._decode_b_type_instruction(instruction)
-            self._execute_branch_instruction(funct3, rs1, rs2, imm, original_pc)
-            if self.pc != original_pc: # if branch was taken
-                pc_changed = True
-        elif opcode == OPCODE_R4_TYPE_FMADD:
-            _, rd, funct3, rs1, rs2, rs3 = self._decode_r4_type_instruction(instruction)
-            self._execute_fmadd_instruction(funct3, rd, rs1, rs2, rs3)
-        elif opcode == OPCODE_J_TYPE_JAL:
-            _, rd, imm = self._decode_j_type_instruction(instruction)
-            if rd == 0 and imm == 0:
-                return "halt"
-            self._execute_jal_instruction(rd, imm, original_pc)
-            LOGGER.debug("jump: 0x%08x -> 0x%08x", original_pc, self.pc)
-            pc_changed = True
-        else:
-            raise ValueError(f"Unsupported opcode: {opcode}")
-        
-        if not pc_changed:
-            self.pc += 4
-        
+        handler(*operands)
+        if not sets_pc:
+            self.pc = pc + 4
+
         return "continue"
+
+    def run(self, max_instructions=0, fetch_hook=None):
+        """Execute up to ``max_instructions`` instructions (0 means no limit).
+
+        ``executed`` counts retired non-halt instructions; a halt instruction
+        still advances ``instruction_count`` like :meth:`execute_instruction`.
+        When given, ``fetch_hook(pc, 0)`` is called after each instruction with
+        the next PC and its return values are summed into ``latency``, together
+        with whatever the data hook (see :meth:`set_data_hook`) charged.
+
+        With DEBUG logging enabled for this module the run goes through the
+        traced loop, logging every instruction and jump.
+        """
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            return self._run_traced(max_instructions, fetch_hook, LoggingTraceSink(LOGGER))
+
+        limit = max_instructions if max_instructions > 0 else sys.maxsize
+        decode_cache = self._decode_cache
+        fetch_decoded = self._fetch_decoded
+        pc = self.pc
+        executed = 0
+        latency = 0
+        reason = StopReason.LIMIT
+        try:
+            while executed < limit:
+                entry = decode_cache.get(pc)
+                if entry is None:
+                    entry = fetch_decoded(pc)
+                handler, operands, sets_pc, _ = entry
+                if handler is None:
+                    reason = StopReason.HALT
+                    break
+                handler(*operands)
+                if sets_pc:
+                    pc = self.pc
+                else:
+                    pc += 4
+                executed += 1
+                if fetch_hook is not None:
+                    latency += fetch_hook(pc, 0)
+        finally:
+            self.pc = pc
+            self.instruction_count += executed + (reason is StopReason.HALT)
+        if self.data_latency:
+            latency += self.data_latency
+            self.data_latency = 0
+        return RunResult(executed=executed, reason=reason, pc=pc, latency=latency)
+
+    def _execute_traced_instruction(self):
+        pc = self.pc
+        entry = self._decode_cache.get(pc)
+        if entry is None:
+            entry = self._fetch_decoded(pc)
+        self.trace.record(TRACE_INSTRUCTION, pc, entry[3])
+        result = RISCVEngine.execute_instruction(self)
+        if entry[2] and self.pc != pc + 4:
+            self.trace.record(TRACE_CONTROL, pc, self.pc)
+        return result
+
+    def _run_traced(self, max_instructions=0, fetch_hook=None, trace=None):
+        """:meth:`run` that reports every instruction and jump to ``trace``."""
+        record = (trace or self.trace).record
+        limit = max_instructions if max_instructions > 0 else sys.maxsize
+        decode_cache = self._decode_cache
+        fetch_decoded = self._fetch_decoded
+        pc = self.pc
+        executed = 0
+        latency = 0
+        reason = StopReason.LIMIT
+        try:
+            while executed < limit:
+                entry = decode_cache.get(pc)
+                if entry is None:
+                    entry = fetch_decoded(pc)
+                handler, operands, sets_pc, word = entry
+                record(TRACE_INSTRUCTION, pc, word)
+                if handler is None:
+                    reason = StopReason.HALT
+                    break
+                handler(*operands)
+                if sets_pc:
+                    if self.pc != pc + 4:
+                        record(TRACE_CONTROL, pc, self.pc)
+                    pc = self.pc
+                else:
+                    pc += 4
+                executed += 1
+                if fetch_hook is not None:
+                    latency += fetch_hook(pc, 0)
+        finally:
+            self.pc = pc
+            self.instruction_count += executed + (reason is StopReason.HALT)
+        if self.data_latency:
+            latency += self.data_latency
+            self.data_latency = 0
+        return RunResult(executed=executed, reason=reason, pc=pc, latency=latency)
+
+
+def _build_dispatch_table(specs):
+    table = {}
+    selectors = {}
+    for spec in specs:
+        selector = (spec.funct3 is not None, spec.funct7 is not None)
+        if selectors.setdefault(spec.opcode, selector) != selector:
+            raise ValueError(f"Inconsistent funct fields registered for opcode {spec.opcode:#09b}")
+        if spec.key in table:
+            raise ValueError(f"Duplicate instruction encoding for {spec.mnemonic}")
+        table[spec.key] = spec
+    return table, selectors
+
+
+# (opcode, funct3, funct7) -> InstructionSpec; unused funct fields are None.
+DISPATCH_TABLE, _OPCODE_SELECTORS = _build_dispatch_table(_INSTRUCTION_SPECS)
+INSTRUCTIONS_BY_MNEMONIC = {spec.mnemonic: spec for spec in _INSTRUCTION_SPECS}
+
+
+def lookup_instruction(instruction):
+    """Return the :class:`InstructionSpec` for a raw instruction word."""
+    opcode = instruction & 0x7F
+    selector = _OPCODE_SELECTORS.get(opcode)
+    if selector is None:
+        raise ValueError(f"Unsupported opcode: {opcode}")
+    funct3 = (instruction >> 12) & 0x7 if selector[0] else None
+    funct7 = (instruction >> 25) & 0x7F if selector[1] else None
+    spec = DISPATCH_TABLE.get((opcode, funct3, funct7))
+    if spec is None:
+        raise ValueError(
+            f"Unsupported {_OPCODE_CLASSES.get(opcode, 'opcode')} instruction: "
+            f"funct3={funct3}, funct7={funct7}"
+        )
+    return spec
+
+
+def decode_instruction(instruction):
+    """Return ``(spec, operands)`` for a raw instruction word.
+
+    Operands are ordered as named by ``OPERAND_FIELDS[spec.fmt]``.
+    """
+    spec = lookup_instruction(instruction)
+    return spec, RISCVEngine._decode_operands(spec.fmt, instruction)
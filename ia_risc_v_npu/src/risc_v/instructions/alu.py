@@ -15,3 +15,13 @@ def xor(a, b):
 
 def fmadd(a, b, c):
     return a * b + c
+
+def mul(a, b):
+    return a * b
+
+def div(a, b):
+    """Signed division truncating toward zero; division by zero yields -1."""
+    if b == 0:
+        return -1
+    quotient = abs(a) // abs(b)
+    return -quotient if (a < 0) != (b < 0) else quotient
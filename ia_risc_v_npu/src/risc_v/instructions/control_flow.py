@@ -1,4 +1,4 @@
-import numpy as np
+from src.risc_v.registers import to_signed
 
 def beq(rs1, rs2):
     """Branch if equal."""
@@ -10,11 +10,11 @@ def bne(rs1, rs2):
 
 def blt(rs1, rs2):
     """Branch if less than (signed)."""
-    return np.int32(rs1) < np.int32(rs2)
+    return to_signed(rs1) < to_signed(rs2)
 
 def bge(rs1, rs2):
     """Branch if greater than or equal (signed)."""
-    return np.int32(rs1) >= np.int32(rs2)
+    return to_signed(rs1) >= to_signed(rs2)
 
 def bltu(rs1, rs2):
     """Branch if less than (unsigned)."""
@@ -1,16 +1,11 @@
-import numpy as np
-
 def ld(bus, address):
-    return int.from_bytes(bus.read(address, 8), 'little')
+    return bus.read_u64(address)
 
 def sd(bus, address, value):
-    bus.write(address, value.to_bytes(8, 'little'))
+    bus.write_u64(address, value)
 
 def lw(bus, address):
-    return int.from_bytes(bus.read(address, 4), 'little')
+    return bus.read_u32(address)
 
 def sw(bus, address, value):
-    if isinstance(value, np.uint32):
-        bus.write(address, value.tobytes())
-    else:
-        bus.write(address, value.to_bytes(4, 'little'))
\ No newline at end of file
+    bus.write_u32(address, value)
@@ -0,0 +1,56 @@
+"""Register file backends for the RISC-V engines.
+
+Two storages are supported for the 32 general-purpose registers:
+
+``"numpy"``
+    A ``np.uint32`` array. Convenient for inspection, but every element access
+    boxes a NumPy scalar.
+``"int"``
+    A plain ``list`` of Python ints kept in ``[0, 2**XLEN)``. Arithmetic on it
+    is several times faster; results are masked explicitly by the engine.
+"""
+
+import numpy as np
+
+XLEN = 32
+REGISTER_MASK = (1 << XLEN) - 1
+NUM_REGISTERS = 32
+
+REGISTER_BACKENDS = ("numpy", "int")
+
+
+def create_register_file(backend="numpy"):
+    """Return zeroed register storage for ``backend``."""
+    if backend == "numpy":
+        return np.zeros(NUM_REGISTERS, dtype=np.uint32)
+    if backend == "int":
+        return [0] * NUM_REGISTERS
+    raise ValueError(f"Unknown register backend: {backend}. Expected one of {REGISTER_BACKENDS}")
+
+
+def to_signed(value):
+    """Interpret the low ``XLEN`` bits of ``value`` as a two's complement integer."""
+    value = int(value) & REGISTER_MASK
+    return value - (1 << XLEN) if value >> (XLEN - 1) else value
+
+
+def register_array(registers):
+    """Return the registers as a ``np.uint32`` array.
+
+    NumPy storage is returned as-is (writes go through); list storage is
+    copied, so the result is a read-only snapshot for inspection.
+    """
+    if isinstance(registers, np.ndarray):
+        return registers
+    return np.array([int(value) & REGISTER_MASK for value in registers], dtype=np.uint32)
+
+
+__all__ = [
+    "XLEN",
+    "REGISTER_MASK",
+    "NUM_REGISTERS",
+    "REGISTER_BACKENDS",
+    "create_register_file",
+    "to_signed",
+    "register_array",
+]
@@ -0,0 +1,137 @@
+"""Compact binary execution traces.
+
+:class:`ExecutionTraceWriter` is a trace sink (see :mod:`src.risc_v.tracing`)
+that turns the event stream of a traced engine and bus into one fixed-width
+record per executed instruction: PC, raw instruction word and the data
+memory access it made, if any. Records are buffered and appended to the file
+in chunks, so traces can grow far beyond RAM.
+
+:func:`read_execution_trace` maps a trace file as a NumPy structured array
+with ``np.memmap``; nothing is read until the records are touched.
+
+File layout: a 16-byte header (``TRACE_MAGIC``, format version and record
+size as little-endian ``u4``) followed by ``EXECUTION_TRACE_DTYPE`` records.
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from src.risc_v.engine import OPCODE_I_TYPE_LOAD, OPCODE_S_TYPE_STORE
+from src.risc_v.tracing import DEFAULT_CHUNK_RECORDS, TRACE_BUS_READ, TRACE_BUS_WRITE, TRACE_INSTRUCTION
+
+TRACE_MAGIC = b"RVTRACE\x00"
+TRACE_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+TRACE_HEADER_SIZE = _HEADER.size
+
+# ``mem_size`` is 0 for instructions without a data access.
+EXECUTION_TRACE_DTYPE = np.dtype([
+    ("pc", "<u4"),
+    ("instruction", "<u4"),
+    ("mem_address", "<u4"),
+    ("mem_size", "<u2"),
+    ("is_write", "u1"),
+    ("reserved", "u1"),
+])
+
+
+class ExecutionTraceWriter:
+    """Trace sink writing one ``EXECUTION_TRACE_DTYPE`` record per instruction.
+
+    Pass the same writer to the engine and the bus (``AdaptiveSimulator(trace=...)``
+    does). Only the first bus access after a store, or a load into a register
+    other than ``x0`` (loads into ``x0`` are skipped), is attributed to the
+    instruction; instruction fetches and jumps are implied by the PCs.
+    """
+
+    def __init__(self, path, chunk_records=DEFAULT_CHUNK_RECORDS):
+        if chunk_records <= 0:
+            raise ValueError(f"chunk_records must be positive: {chunk_records}")
+        self.path = Path(path)
+        self.chunk_records = chunk_records
+        self.records_written = 0
+        self._records = []
+        self._pending = None
+        self._expect_access = False
+        self._file = self.path.open("wb")
+        self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, EXECUTION_TRACE_DTYPE.itemsize))
+
+    def record(self, kind, address, value, size=0):
+        if kind == TRACE_INSTRUCTION:
+            if self._pending is not None:
+                self._records.append(tuple(self._pending))
+                if len(self._records) >= self.chunk_records:
+                    self._write_records()
+            self._pending = [address, value, 0, 0, 0, 0]
+            opcode = value & 0x7F
+            self._expect_access = opcode == OPCODE_S_TYPE_STORE or (
+                opcode == OPCODE_I_TYPE_LOAD and (value >> 7) & 0x1F != 0
+            )
+        elif self._expect_access and (kind == TRACE_BUS_READ or kind == TRACE_BUS_WRITE):
+            pending = self._pending
+            pending[2] = address
+            pending[3] = size
+            pending[4] = kind == TRACE_BUS_WRITE
+            self._expect_access = False
+
+    def _write_records(self):
+        if self._records:
+            self._file.write(np.array(self._records, dtype=EXECUTION_TRACE_DTYPE).tobytes())
+            self.records_written += len(self._records)
+            self._records = []
+
+    def flush(self):
+        """Write every completed record to disk.
+
+        Call between runs, not while an instruction is executing: the last
+        instruction is considered complete.
+        """
+        if self._pending is not None:
+            self._records.append(tuple(self._pending))
+            self._pending = None
+            self._expect_access = False
+        self._write_records()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_execution_trace(path):
+    """Return the records of the trace file at ``path`` as a read-only ``np.memmap``."""
+    path = Path(path)
+    with path.open("rb") as handle:
+        header = handle.read(TRACE_HEADER_SIZE)
+    if len(header) < TRACE_HEADER_SIZE:
+        raise ValueError(f"Not an execution trace (file too short): {path}")
+    magic, version, record_size = _HEADER.unpack(header)
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"Not an execution trace (bad magic): {path}")
+    if version != TRACE_VERSION or record_size != EXECUTION_TRACE_DTYPE.itemsize:
+        raise ValueError(f"Unsupported execution trace format version {version}: {path}")
+    payload = path.stat().st_size - TRACE_HEADER_SIZE
+    if payload % record_size:
+        raise ValueError(f"Execution trace ends with a partial record: {path}")
+    if payload == 0:
+        return np.zeros(0, dtype=EXECUTION_TRACE_DTYPE)
+    return np.memmap(path, dtype=EXECUTION_TRACE_DTYPE, mode="r", offset=TRACE_HEADER_SIZE)
+
+
+__all__ = [
+    "EXECUTION_TRACE_DTYPE",
+    "TRACE_MAGIC",
+    "TRACE_VERSION",
+    "TRACE_HEADER_SIZE",
+    "ExecutionTraceWriter",
+    "read_execution_trace",
+]
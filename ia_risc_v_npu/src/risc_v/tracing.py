@@ -0,0 +1,128 @@
+"""Structured execution tracing.
+
+Engines and buses take an optional trace sink at construction time. Without
+one they run loops that contain no tracing code at all; with one they switch
+to dedicated traced variants that call ``sink.record(kind, address, value,
+size)`` for every event:
+
+``TRACE_INSTRUCTION``
+    ``address`` is the PC, ``value`` the raw instruction word.
+``TRACE_CONTROL``
+    A jump or taken branch from ``address`` to ``value``.
+``TRACE_BUS_READ`` / ``TRACE_BUS_WRITE``
+    A bus access of ``size`` bytes at ``address``; ``value`` holds the data
+    for accesses of up to eight bytes (little-endian), otherwise 0.
+"""
+
+import numpy as np
+
+TRACE_INSTRUCTION = 0
+TRACE_CONTROL = 1
+TRACE_BUS_READ = 2
+TRACE_BUS_WRITE = 3
+
+TRACE_RECORD_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("address", "<u4"),
+    ("value", "<u8"),
+    ("size", "<u4"),
+])
+
+DEFAULT_CHUNK_RECORDS = 65536
+
+_RECORD_FORMATS = {
+    TRACE_INSTRUCTION: "pc=0x%08x instruction=0x%08x",
+    TRACE_CONTROL: "jump: 0x%08x -> 0x%08x",
+    TRACE_BUS_READ: "bus read: address=0x%08x value=0x%08x size=%d",
+    TRACE_BUS_WRITE: "bus write: address=0x%08x value=0x%08x size=%d",
+}
+
+
+def format_record(kind, address, value, size=0):
+    """Render one trace record the way the debug log shows it."""
+    template = _RECORD_FORMATS[kind]
+    if kind in (TRACE_BUS_READ, TRACE_BUS_WRITE):
+        return template % (address, value, size)
+    return template % (address, value)
+
+
+def access_value(data):
+    """Return the ``value`` field recorded for a bus access of ``data``."""
+    return int.from_bytes(data, "little") if len(data) <= 8 else 0
+
+
+class TraceBuffer:
+    """In-memory trace sink.
+
+    Records are appended as tuples and packed into ``TRACE_RECORD_DTYPE``
+    chunks of ``chunk_records`` entries. With ``max_records`` only the most
+    recent records are kept (rounded up to whole chunks).
+    """
+
+    def __init__(self, chunk_records=DEFAULT_CHUNK_RECORDS, max_records=None):
+        if chunk_records <= 0:
+            raise ValueError(f"chunk_records must be positive: {chunk_records}")
+        self.chunk_records = chunk_records
+        self.max_records = max_records
+        self._chunks = []
+        self._pending = []
+        self.dropped = 0
+
+    def record(self, kind, address, value, size=0):
+        pending = self._pending
+        pending.append((kind, address, value, size))
+        if len(pending) >= self.chunk_records:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._chunks.append(np.array(self._pending, dtype=TRACE_RECORD_DTYPE))
+        self._pending = []
+        if self.max_records is not None:
+            while len(self._chunks) > 1 and (len(self) - len(self._chunks[0])) >= self.max_records:
+                self.dropped += len(self._chunks.pop(0))
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks) + len(self._pending)
+
+    def records(self):
+        """Return every buffered record as one ``TRACE_RECORD_DTYPE`` array."""
+        self._flush()
+        if not self._chunks:
+            return np.zeros(0, dtype=TRACE_RECORD_DTYPE)
+        return np.concatenate(self._chunks)
+
+    def lines(self):
+        """Yield the buffered records formatted like the debug log."""
+        for kind, address, value, size in self.records().tolist():
+            yield format_record(kind, address, value, size)
+
+    def clear(self):
+        self._chunks = []
+        self._pending = []
+        self.dropped = 0
+
+
+class LoggingTraceSink:
+    """Trace sink that writes each record to ``logger`` at DEBUG level."""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def record(self, kind, address, value, size=0):
+        self.logger.debug("%s", format_record(kind, address, value, size))
+
+
+__all__ = [
+    "TRACE_INSTRUCTION",
+    "TRACE_CONTROL",
+    "TRACE_BUS_READ",
+    "TRACE_BUS_WRITE",
+    "TRACE_RECORD_DTYPE",
+    "DEFAULT_CHUNK_RECORDS",
+    "format_record",
+    "access_value",
+    "TraceBuffer",
+    "LoggingTraceSink",
+]
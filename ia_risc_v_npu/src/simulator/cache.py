@@ -0,0 +1,423 @@
+"""Set-associative cache models for the timing hooks.
+
+:class:`SetAssociativeCache` keeps its tags and replacement state in compact
+NumPy arrays (one row per set). Single accesses short-circuit repeats of the
+most recently used line, which covers most straight-line instruction
+fetches; :meth:`SetAssociativeCache.access_batch` handles whole address
+arrays, removing repeated lines per set with vectorised passes so only
+accesses that can change the cache state are simulated in order.
+
+:class:`CacheHierarchy` combines split L1 instruction/data caches with an
+optional shared L2 and turns hits and misses into access latencies. Misses
+to memory cost a fixed latency or, with a
+:class:`src.simulator.dram.DRAMController`, whatever the DRAM model charges.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from src.simulator.dram import DRAMController, DRAMState
+
+CACHE_POLICIES = ("lru", "plru")
+
+DEFAULT_L1_SIZE = 32 * 1024
+DEFAULT_L2_SIZE = 256 * 1024
+DEFAULT_LINE_SIZE = 64
+DEFAULT_WAYS = 8
+DEFAULT_L1_LATENCY = 1
+DEFAULT_L2_LATENCY = 8
+DEFAULT_MEMORY_LATENCY = 40
+
+_INVALID = -1
+
+
+def _is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+class CacheState(NamedTuple):
+    """Tags, replacement state and statistics of a :class:`SetAssociativeCache`."""
+
+    tags: np.ndarray
+    replacement: np.ndarray
+    clock: int
+    last_line: int
+    hits: int
+    misses: int
+
+
+class HierarchyState(NamedTuple):
+    """Per-level :class:`CacheState` of a :class:`CacheHierarchy`; ``l2`` and ``dram`` are ``None`` without them."""
+
+    l1i: CacheState
+    l1d: CacheState
+    l2: Optional[CacheState]
+    dram: Optional[DRAMState]
+
+
+class SetAssociativeCache:
+    """Timing-only set-associative cache with LRU or tree-PLRU replacement.
+
+    Only tags are modelled: there is no data and no dirty state, and every
+    access (read or write) allocates its line on a miss.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_L1_SIZE,
+        line_size: int = DEFAULT_LINE_SIZE,
+        ways: int = DEFAULT_WAYS,
+        policy: str = "lru",
+        hit_latency: int = DEFAULT_L1_LATENCY,
+    ) -> None:
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unknown cache replacement policy: {policy!r}")
+        if not (_is_power_of_two(line_size) and _is_power_of_two(ways)):
+            raise ValueError(f"Line size and ways must be powers of two: line_size={line_size}, ways={ways}")
+        sets, remainder = divmod(size, line_size * ways)
+        if remainder or not _is_power_of_two(sets):
+            raise ValueError(
+                f"Cache size must be a power-of-two number of sets of {ways} x {line_size} bytes: {size}"
+            )
+        self.size = size
+        self.line_size = line_size
+        self.ways = ways
+        self.sets = sets
+        self.policy = policy
+        self.hit_latency = hit_latency
+        self._line_shift = line_size.bit_length() - 1
+        self._set_mask = sets - 1
+        self._levels = ways.bit_length() - 1
+        # Tags hold whole line numbers, so a line's set is implied by its tag.
+        self.tags = np.full((sets, ways), _INVALID, dtype=np.int64)
+        if policy == "lru":
+            self.ages = np.zeros((sets, ways), dtype=np.int64)
+        else:
+            self.tree = np.zeros((sets, max(ways - 1, 1)), dtype=np.uint8)
+        self._clock = 0
+        self._last_line = _INVALID
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def accesses(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def miss_rate(self) -> float:
+        return self.misses / self.accesses if self.accesses else 0.0
+
+    def reset(self) -> None:
+        """Invalidate every line and clear the statistics."""
+        self.tags.fill(_INVALID)
+        if self.policy == "lru":
+            self.ages.fill(0)
+        else:
+            self.tree.fill(0)
+        self._clock = 0
+        self._last_line = _INVALID
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self) -> CacheState:
+        """Capture the cache contents, replacement order and statistics."""
+        replacement = self.ages if self.policy == "lru" else self.tree
+        return CacheState(
+            self.tags.copy(), replacement.copy(), self._clock, self._last_line, self.hits, self.misses
+        )
+
+    def restore(self, state: CacheState) -> None:
+        """Return to ``state``."""
+        self.tags[:] = state.tags
+        if self.policy == "lru":
+            self.ages[:] = state.replacement
+        else:
+            self.tree[:] = state.replacement
+        self._clock = state.clock
+        self._last_line = state.last_line
+        self.hits = state.hits
+        self.misses = state.misses
+
+    def access(self, address: int) -> bool:
+        """Look up ``address``, allocating its line on a miss; returns whether it hit."""
+        line = address >> self._line_shift
+        self._clock += 1
+        if line == self._last_line:
+            # Re-touching the most recently used line leaves the replacement
+            # order unchanged.
+            self.hits += 1
+            return True
+        self._last_line = line
+        index = line & self._set_mask
+        row = self.tags[index].tolist()
+        if line in row:
+            way = row.index(line)
+            hit = True
+            self.hits += 1
+        else:
+            way = self._victim(index, row)
+            self.tags[index, way] = line
+            hit = False
+            self.misses += 1
+        if self.policy == "lru":
+            self.ages[index, way] = self._clock
+        else:
+            self._touch_tree(self.tree[index], way)
+        return hit
+
+    def _victim(self, index: int, row: list) -> int:
+        if _INVALID in row:
+            return row.index(_INVALID)
+        if self.policy == "lru":
+            return int(self.ages[index].argmin())
+        bits = self.tree[index]
+        node = way = 0
+        for _ in range(self._levels):
+            bit = int(bits[node])
+            way = (way << 1) | bit
+            node = 2 * node + 1 + bit
+        return way
+
+    def _touch_tree(self, bits, way: int) -> None:
+        # Point every node on the path to ``way`` at the other half.
+        node = 0
+        for level in range(self._levels - 1, -1, -1):
+            bit = (way >> level) & 1
+            bits[node] = bit ^ 1
+            node = 2 * node + 1 + bit
+
+    def access_batch(self, addresses) -> np.ndarray:
+        """Look up every address in order; returns a boolean hit array.
+
+        Equivalent to calling :meth:`access` for each address. Accesses that
+        repeat the previous line of their set are hits that leave the state
+        unchanged, so they are resolved in bulk and only the rest are
+        simulated one by one.
+        """
+        lines = np.asarray(addresses, dtype=np.int64) >> self._line_shift
+        count = len(lines)
+        hits = np.ones(count, dtype=bool)
+        if count == 0:
+            return hits
+        order = np.argsort(lines & self._set_mask, kind="stable")
+        grouped = lines[order]
+        changes = np.ones(count, dtype=bool)
+        changes[1:] = grouped[1:] != grouped[:-1]
+        pending = order[changes]
+
+        tags = self.tags.tolist()
+        lru = self.policy == "lru"
+        ages = self.ages.tolist() if lru else None
+        tree = self.tree.tolist() if not lru else None
+        levels, set_mask, base = self._levels, self._set_mask, self._clock
+        misses = 0
+        for position, line in zip(pending.tolist(), lines[pending].tolist()):
+            index = line & set_mask
+            row = tags[index]
+            if line in row:
+                way = row.index(line)
+            else:
+                misses += 1
+                hits[position] = False
+                if _INVALID in row:
+                    way = row.index(_INVALID)
+                elif lru:
+                    set_ages = ages[index]
+                    way = set_ages.index(min(set_ages))
+                else:
+                    bits = tree[index]
+                    node = way = 0
+                    for _ in range(levels):
+                        bit = bits[node]
+                        way = (way << 1) | bit
+                        node = 2 * node + 1 + bit
+                row[way] = line
+            if lru:
+                ages[index][way] = base + position + 1
+            else:
+                bits = tree[index]
+                node = 0
+                for level in range(levels - 1, -1, -1):
+                    bit = (way >> level) & 1
+                    bits[node] = bit ^ 1
+                    node = 2 * node + 1 + bit
+
+        self.tags[:] = tags
+        if lru:
+            self.ages[:] = ages
+        else:
+            self.tree[:] = tree
+        self._clock = base + count
+        self._last_line = int(lines[-1])
+        self.misses += misses
+        self.hits += count - misses
+        return hits
+
+
+class CacheHierarchy:
+    """Split L1 instruction/data caches backed by an optional shared L2.
+
+    Latencies add up along the levels probed: an L1 hit costs the L1 hit
+    latency, an L2 hit adds the L2 hit latency, and a miss everywhere adds
+    ``memory_latency`` on top (or the ``dram`` model's latency when given).
+    """
+
+    def __init__(
+        self,
+        l1i: Optional[SetAssociativeCache] = None,
+        l1d: Optional[SetAssociativeCache] = None,
+        l2: Optional[SetAssociativeCache] = None,
+        *,
+        shared_l2: bool = True,
+        memory_latency: int = DEFAULT_MEMORY_LATENCY,
+        dram: Optional[DRAMController] = None,
+    ) -> None:
+        self.l1i = l1i or SetAssociativeCache()
+        self.l1d = l1d or SetAssociativeCache()
+        if l2 is None and shared_l2:
+            l2 = SetAssociativeCache(DEFAULT_L2_SIZE, hit_latency=DEFAULT_L2_LATENCY)
+        self.l2 = l2
+        self.memory_latency = memory_latency
+        self.dram = dram
+
+    @classmethod
+    def from_config(cls, config: dict, *, dram: Optional[DRAMController] = None) -> "CacheHierarchy":
+        """Build a hierarchy from ``{"l1i": {...}, "l1d": {...}, "l2": {...} | null, "memory_latency": n}``.
+
+        Level dicts hold :class:`SetAssociativeCache` keyword arguments;
+        omitted levels use the defaults and ``"l2": null`` disables the L2.
+        """
+        unknown = set(config) - {"l1i", "l1d", "l2", "memory_latency"}
+        if unknown:
+            raise ValueError(f"Unknown cache options: {', '.join(sorted(unknown))}")
+        levels = {}
+        for name in ("l1i", "l1d", "l2"):
+            options = config.get(name, {})
+            if options is not None:
+                if name == "l2":
+                    options = {"size": DEFAULT_L2_SIZE, "hit_latency": DEFAULT_L2_LATENCY, **options}
+                levels[name] = SetAssociativeCache(**options)
+        return cls(
+            levels.get("l1i"),
+            levels.get("l1d"),
+            levels.get("l2"),
+            shared_l2="l2" in levels,
+            memory_latency=config.get("memory_latency", DEFAULT_MEMORY_LATENCY),
+            dram=dram,
+        )
+
+    def _memory(self, address: int, cycle: Optional[int]) -> int:
+        return self.memory_latency if self.dram is None else self.dram.access(address, cycle)
+
+    def _access(self, l1: SetAssociativeCache, address: int, cycle: Optional[int]) -> int:
+        if l1.access(address):
+            return l1.hit_latency
+        latency = l1.hit_latency
+        l2 = self.l2
+        if l2 is not None:
+            latency += l2.hit_latency
+            if l2.access(address):
+                return latency
+        # The miss reaches memory once every level has been probed.
+        return latency + self._memory(address, None if cycle is None else cycle + latency)
+
+    def fetch(self, pc: int, cycle: Optional[int] = None) -> int:
+        """Latency of an instruction fetch from ``pc`` issued at ``cycle``.
+
+        ``cycle`` is passed on to the DRAM model; see :meth:`DRAMController.access`.
+        """
+        return self._access(self.l1i, pc, cycle)
+
+    def data(self, address: int, cycle: Optional[int] = None) -> int:
+        """Latency of a load or store to ``address`` issued at ``cycle``; see :meth:`fetch`."""
+        return self._access(self.l1d, address, cycle)
+
+    def _access_batch(self, l1: SetAssociativeCache, addresses) -> np.ndarray:
+        addresses = np.asarray(addresses, dtype=np.int64)
+        latencies = np.full(len(addresses), l1.hit_latency, dtype=np.int64)
+        return self._miss_batch(addresses, latencies, np.flatnonzero(~l1.access_batch(addresses)))
+
+    def _miss_batch(self, addresses: np.ndarray, latencies: np.ndarray, missed: np.ndarray) -> np.ndarray:
+        """Add the L2 and memory latencies of the L1 misses at indices ``missed``."""
+        if self.l2 is not None:
+            latencies[missed] += self.l2.hit_latency
+            missed = missed[~self.l2.access_batch(addresses[missed])]
+        if self.dram is None:
+            latencies[missed] += self.memory_latency
+        else:
+            latencies[missed] += self.dram.access_batch(addresses[missed])
+        return latencies
+
+    def fetch_batch(self, pcs) -> np.ndarray:
+        """Latencies of fetching from every PC in ``pcs``, in order."""
+        return self._access_batch(self.l1i, pcs)
+
+    def data_batch(self, addresses) -> np.ndarray:
+        """Latencies of data accesses to every address in ``addresses``, in order."""
+        return self._access_batch(self.l1d, addresses)
+
+    def access_batch(self, addresses, data) -> np.ndarray:
+        """Latencies of a mixed stream of fetches and data accesses, in order.
+
+        ``data[i]`` marks ``addresses[i]`` as a data access, otherwise it is an
+        instruction fetch. Each L1 sees its own accesses and the L2 and memory
+        see the misses of both in stream order, as with :meth:`fetch` and
+        :meth:`data` calls.
+        """
+        addresses = np.asarray(addresses, dtype=np.int64)
+        data = np.asarray(data, dtype=bool)
+        latencies = np.empty(len(addresses), dtype=np.int64)
+        hits = np.empty(len(addresses), dtype=bool)
+        for l1, selected in ((self.l1i, ~data), (self.l1d, data)):
+            inside = np.flatnonzero(selected)
+            latencies[inside] = l1.hit_latency
+            hits[inside] = l1.access_batch(addresses[inside])
+        return self._miss_batch(addresses, latencies, np.flatnonzero(~hits))
+
+    def stats(self) -> dict:
+        """Return ``{level: {"hits", "misses", "miss_rate"}}`` for every level."""
+        levels = {"l1i": self.l1i, "l1d": self.l1d, "l2": self.l2}
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses, "miss_rate": cache.miss_rate}
+            for name, cache in levels.items() if cache is not None
+        }
+
+    def snapshot(self) -> HierarchyState:
+        """Capture every level and the DRAM model; see :meth:`SetAssociativeCache.snapshot`."""
+        return HierarchyState(
+            self.l1i.snapshot(),
+            self.l1d.snapshot(),
+            self.l2.snapshot() if self.l2 is not None else None,
+            self.dram.snapshot() if self.dram is not None else None,
+        )
+
+    def restore(self, state: HierarchyState) -> None:
+        """Return every level and the DRAM model to ``state``."""
+        self.l1i.restore(state.l1i)
+        self.l1d.restore(state.l1d)
+        if self.l2 is not None:
+            self.l2.restore(state.l2)
+        if self.dram is not None:
+            self.dram.restore(state.dram)
+
+    def reset(self) -> None:
+        for cache in (self.l1i, self.l1d, self.l2):
+            if cache is not None:
+                cache.reset()
+        if self.dram is not None:
+            self.dram.reset()
+
+
+__all__ = [
+    "CACHE_POLICIES",
+    "DEFAULT_L1_LATENCY",
+    "DEFAULT_L2_LATENCY",
+    "DEFAULT_MEMORY_LATENCY",
+    "CacheState",
+    "HierarchyState",
+    "SetAssociativeCache",
+    "CacheHierarchy",
+]
@@ -10,12 +10,22 @@ from pathlib import Path
 from time import perf_counter
 from typing import Iterable, List, Optional
 
+import numpy as np
+
 try:  # pragma: no cover - import guarded for environments without pyelftools
     from elftools.elf.elffile import ELFFile
 except ImportError:  # pragma: no cover - fallback handled at runtime
     ELFFile = None  # type: ignore[assignment]
 
-from src.simulator.main import AdaptiveSimulator, SimulationReport, DRAM_SIZE
+from src.risc_v.trace_file import ExecutionTraceWriter
+from src.risc_v.tracing import LoggingTraceSink
+from src.simulator.cache import CacheHierarchy
+from src.simulator.dram import DRAMController
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.interconnect import BusArbiter
+from src.simulator.main import AdaptiveSimulator, SimulationReport, DRAM_SIZE, MAX_DRAM_SIZE
+from src.simulator.memory import PAGE_SIZE
+from src.simulator.sampling import SampledSimulationReport
 
 LOGGER = logging.getLogger(__name__)
 
@@ -26,7 +36,7 @@ class CLIError(RuntimeError):
 
 @dataclass(slots=True)
 class ProgramImage:
-    instructions: List[int]
+    instructions: np.ndarray  # uint32 words; AdaptiveSimulator.load_program also takes lists
     text_size: int
 
 
@@ -42,6 +52,11 @@ def configure_logging(verbose: bool) -> None:
     logging.basicConfig(level=level, format="%(levelname)s %(name)s: %(message)s")
 
 
+def _trace_sink(verbose: bool) -> Optional[LoggingTraceSink]:
+    # Verbose runs log every instruction and bus access; others run untraced.
+    return LoggingTraceSink(LOGGER) if verbose else None
+
+
 def load_config(config_path: Optional[Path]) -> dict:
     if not config_path:
         return {}
@@ -58,11 +73,75 @@ def load_config(config_path: Optional[Path]) -> dict:
     return data
 
 
-def _extract_instruction_words(data: bytes) -> List[int]:
+def _parse_image(value: str) -> tuple[Path, int]:
+    path, separator, address = value.rpartition("@")
+    if not separator or not path:
+        raise argparse.ArgumentTypeError(f"expected PATH@ADDRESS, got {value!r}")
+    try:
+        return Path(path), int(address, 0)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid image address {address!r}") from exc
+
+
+def _load_images(simulator: AdaptiveSimulator, images: Iterable[tuple[Path, int]]) -> None:
+    for path, address in images:
+        try:
+            simulator.load_image(path, address)
+        except OSError as exc:
+            raise CLIError(f"Failed to read image: {path}") from exc
+        except (ValueError, IndexError, MemoryError) as exc:
+            raise CLIError(f"Cannot load image {path} at {address:#x}: {exc}") from exc
+        LOGGER.debug("Loaded image %s at 0x%08x", path, address)
+
+
+def _timing_hooks(config: dict) -> Optional[TimingHookSystem]:
+    caches = config.get("caches")
+    dram = config.get("dram")
+    if caches is None and dram is None:
+        return None
+    for option, value in (("caches", caches), ("dram", dram)):
+        if value is not None and not isinstance(value, dict):
+            raise CLIError(f"Config option '{option}' must be a JSON object")
+    try:
+        controller = DRAMController.from_config(dram) if dram is not None else None
+    except (TypeError, ValueError) as exc:
+        raise CLIError(f"Invalid DRAM configuration: {exc}") from exc
+    try:
+        hierarchy = CacheHierarchy.from_config(caches, dram=controller) if caches is not None else None
+    except (TypeError, ValueError) as exc:
+        raise CLIError(f"Invalid cache configuration: {exc}") from exc
+    return TimingHookSystem(caches=hierarchy, dram=controller)
+
+
+def _interconnect(config: dict) -> Optional[BusArbiter]:
+    options = config.get("interconnect")
+    if options is None:
+        return None
+    if not isinstance(options, dict):
+        raise CLIError("Config option 'interconnect' must be a JSON object")
+    try:
+        arbiter = BusArbiter.from_config(options)
+        arbiter.index("cpu")
+    except (TypeError, ValueError) as exc:
+        raise CLIError(f"Invalid interconnect configuration: {exc}") from exc
+    return arbiter
+
+
+def _dram_size(config: dict) -> int:
+    value = config.get("dram_size", DRAM_SIZE)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise CLIError("Config option 'dram_size' must be an integer number of bytes")
+    if not 0 < value <= MAX_DRAM_SIZE or value % PAGE_SIZE:
+        raise CLIError(
+            f"Config option 'dram_size' must be a multiple of {PAGE_SIZE} bytes up to {MAX_DRAM_SIZE:#x}"
+        )
+    return value
+
+
+def _extract_instruction_words(data: bytes) -> np.ndarray:
     if len(data) % 4 != 0:
         raise CLIError("Executable section size must be word-aligned (4 bytes)")
-    words = [int.from_bytes(data[i : i + 4], "little", signed=False) for i in range(0, len(data), 4)]
-    return words
+    return np.frombuffer(data, dtype="<u4")
 
 
 def load_program_image(elf_path: Path) -> ProgramImage:
@@ -93,16 +172,14 @@ def load_program_image(elf_path: Path) -> ProgramImage:
         raise CLIError("ELF file does not contain executable instructions")
 
     exec_sections.sort(key=lambda item: item[0])
-    instructions: List[int] = []
-    for _, data in exec_sections:
-        instructions.extend(_extract_instruction_words(data))
+    instructions = np.concatenate([_extract_instruction_words(data) for _, data in exec_sections])
 
     text_size = sum(len(data) for _, data in exec_sections)
     return ProgramImage(instructions=instructions, text_size=text_size)
 
 
 def write_output(
-    result: SimulationReport,
+    result: SimulationReport | SampledSimulationReport,
     output_path: Optional[Path],
     instruction_count: int,
     *,
@@ -134,31 +211,95 @@ def run_simulate(args: argparse.Namespace) -> int:
     max_cycles = int(config.get("max_cycles", 0) or 0)
 
     program = load_program_image(args.elf_file)
-    simulator = AdaptiveSimulator()
+    dram_size = _dram_size(config)
+    trace_file = config.get("trace_file")
+    if trace_file is not None:
+        try:
+            trace = ExecutionTraceWriter(Path(trace_file))
+        except OSError as exc:
+            raise CLIError(f"Failed to create trace file: {trace_file}") from exc
+    else:
+        trace = _trace_sink(args.verbose)
+    simulator = AdaptiveSimulator(
+        fast_forward_loops=bool(config.get("fast_forward_loops", False)),
+        trace=trace,
+        dram_size=dram_size,
+        timing_hooks=_timing_hooks(config),
+        interconnect=_interconnect(config),
+        device_timing=bool(config.get("device_timing", False)),
+    )
     simulator.load_program(program.instructions)
+    _load_images(simulator, getattr(args, "images", None) or ())
 
     LOGGER.debug("Loaded %s bytes (%s instructions)", program.text_size, len(program.instructions))
 
-    result = asyncio.run(simulator.run_simulation(max_cycles=max_cycles))
-    write_output(result, args.output, simulator.risc_v_engine.instruction_count)
+    sampling = config.get("sampling")
+    parallel = config.get("parallel")
+    for option, value in (("sampling", sampling), ("parallel", parallel)):
+        if value is not None and not isinstance(value, dict):
+            raise CLIError(f"Config option '{option}' must be a JSON object")
+    if sampling:
+        result = asyncio.run(simulator.run_sampled_simulation(max_cycles=max_cycles, **sampling))
+        extra = {
+            "sim_time_error": result.sim_time_error,
+            "intervals": result.intervals,
+            "clusters": result.clusters,
+            "detailed_instructions": result.detailed_instructions,
+        }
+    elif parallel:
+        result = asyncio.run(simulator.run_parallel_simulation(max_cycles=max_cycles, **parallel))
+        extra = None
+    else:
+        result = asyncio.run(simulator.run_simulation(max_cycles=max_cycles))
+        hooks = simulator.timing_hooks
+        extra = {
+            name: model.stats()
+            for name, model in (
+                ("caches", hooks.caches), ("dram", hooks.dram), ("interconnect", simulator.interconnect)
+            )
+            if model is not None
+        } or None
+    if isinstance(trace, ExecutionTraceWriter):
+        trace.close()
+    write_output(result, args.output, simulator.risc_v_engine.instruction_count, extra=extra)
     return 0
 
 
-def _generate_synthetic_program(length: int) -> ProgramImage:
+def _generate_synthetic_program(length: int, dram_size: int = DRAM_SIZE) -> ProgramImage:
     if length <= 0:
         raise CLIError("Synthetic program length must be positive")
 
-    # DRAM holds 1MB, so ensure the program fits.
-    max_words = (DRAM_SIZE // 4) - 1  # reserve space for halt instruction
+    # Ensure the program fits in DRAM.
+    max_words = (dram_size // 4) - 1  # reserve space for halt instruction
     if length > max_words:
         raise CLIError(f"Synthetic program length exceeds DRAM capacity ({max_words} instructions)")
 
     add_instruction = 0x003100B3  # ADD x1, x2, x3
-    program = [add_instruction] * length
-    program.append(0)  # halt sentinel
+    program = np.full(length + 1, add_instruction, dtype=np.uint32)
+    program[-1] = 0  # halt sentinel
     return ProgramImage(instructions=program, text_size=len(program) * 4)
 
 
+def _generate_loop_program(length: int) -> ProgramImage:
+    if length <= 0:
+        raise CLIError("Synthetic program length must be positive")
+
+    # x5 counts up in steps of x2 (10) to a bound loaded from the word after
+    # the halt, so the loop body (ADD, BNE) repeats about length / 2 times.
+    iterations = max(1, length // 2)
+    program = np.array(
+        [
+            0x01002303,  # lw x6, 16(x0)
+            0x002282B3,  # add x5, x5, x2
+            0xFE629EE3,  # bne x5, x6, -4
+            0,  # halt sentinel
+            (10 * iterations) & 0xFFFFFFFF,
+        ],
+        dtype=np.uint32,
+    )
+    return ProgramImage(instructions=program, text_size=16)
+
+
 def _measure_performance(simulator: AdaptiveSimulator, max_cycles: int) -> tuple[SimulationReport, BenchmarkMetrics]:
     start = perf_counter()
     result = asyncio.run(simulator.run_simulation(max_cycles=max_cycles))
@@ -174,12 +315,19 @@ def run_benchmark(args: argparse.Namespace) -> int:
     config = load_config(args.config)
     max_cycles = int(config.get("max_cycles", 0) or args.max_cycles or 0)
 
+    dram_size = _dram_size(config)
     if args.elf_file:
         program = load_program_image(args.elf_file)
+    elif getattr(args, "workload", "straight") == "loop":
+        program = _generate_loop_program(args.instructions)
     else:
-        program = _generate_synthetic_program(args.instructions)
+        program = _generate_synthetic_program(args.instructions, dram_size)
 
-    simulator = AdaptiveSimulator()
+    simulator = AdaptiveSimulator(
+        trace=_trace_sink(args.verbose),
+        dram_size=dram_size,
+        timing_hooks=_timing_hooks(config),
+    )
     simulator.load_program(program.instructions)
 
     LOGGER.debug(
@@ -221,6 +369,15 @@ def build_parser() -> argparse.ArgumentParser:
     simulate_parser.add_argument(
         "--output", type=Path, default=None, help="Write simulation summary to the specified path"
     )
+    simulate_parser.add_argument(
+        "--image",
+        dest="images",
+        type=_parse_image,
+        action="append",
+        default=[],
+        metavar="PATH@ADDRESS",
+        help="Load a raw binary image at ADDRESS (page-aligned DRAM images are memory-mapped); repeatable",
+    )
     simulate_parser.add_argument("--verbose", action="store_true", help="Enable verbose logging output")
     simulate_parser.set_defaults(handler=run_simulate)
 
@@ -239,6 +396,12 @@ def build_parser() -> argparse.ArgumentParser:
         default=200_000,
         help="Synthetic ADD instruction count when no ELF is provided",
     )
+    benchmark_parser.add_argument(
+        "--workload",
+        choices=("straight", "loop"),
+        default="straight",
+        help="Synthetic program shape: straight-line ADDs (each decoded once) or a counted loop",
+    )
     benchmark_parser.add_argument(
         "--max-cycles",
         type=int,
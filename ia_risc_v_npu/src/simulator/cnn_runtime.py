@@ -15,15 +15,16 @@ from src.simulator.cnn_utils import compute_output_dims, normalize_kernel_shape
 
 
 def _reshape_input(bus: Bus, addr: int, shape: Sequence[int]) -> np.ndarray:
+    # 버스 저장소를 복사 없이 읽기 전용 배열로 본다.
     byte_len = np.prod(shape, dtype=np.int64) * 4
-    data = bus.read(addr, int(byte_len))
-    return np.frombuffer(memoryview(data), dtype=np.uint32).reshape(shape)
+    data = bus.read_view(addr, int(byte_len))
+    return np.frombuffer(data, dtype=np.uint32).reshape(shape)
 
 
 def _reshape_weights(bus: Bus, addr: int, shape: Sequence[int]) -> np.ndarray:
     byte_len = np.prod(shape, dtype=np.int64) * 4
-    data = bus.read(addr, int(byte_len))
-    return np.frombuffer(memoryview(data), dtype=np.uint32).reshape(shape)
+    data = bus.read_view(addr, int(byte_len))
+    return np.frombuffer(data, dtype=np.uint32).reshape(shape)
 
 
 def run_cnn_layer(
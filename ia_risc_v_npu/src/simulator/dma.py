@@ -0,0 +1,238 @@
+"""DMA engine moving data between bus devices, driven through MMIO registers.
+
+The CPU programs a transfer with word writes to the registers below and
+starts it by writing the doorbell. Each transfer copies ``rows`` rows of
+``length`` bytes from ``src`` to ``dst``, advancing by the source and
+destination strides between rows (a stride of 0 means rows are packed), so
+one doorbell moves a whole 2-D tile. Rows are moved with bulk
+:meth:`Bus.read_view`/:meth:`Bus.write` copies, or one copy when the tile is
+contiguous on both sides.
+
+Data lands when the doorbell is written; what is modelled in time is when
+the transfer *completes*. With a ``clock`` each transfer takes
+``setup_cycles + ceil(bytes / bytes_per_cycle)`` cycles, starting when the
+previous one finishes, and ``STATUS`` reports ``BUSY`` until the clock
+passes its completion cycle, so the CPU keeps executing while the transfer
+runs. Software either polls ``STATUS`` for ``DONE`` or sets
+``CONTROL_IRQ_ENABLE`` and is notified through ``interrupt(cycle)``.
+Without a clock transfers complete immediately.
+
+Register map (byte offsets, 32-bit registers)::
+
+    0x00 SRC         0x04 DST          0x08 LENGTH       0x0C ROWS
+    0x10 SRC_STRIDE  0x14 DST_STRIDE   0x18 CONTROL      0x1C DOORBELL
+    0x20 STATUS      0x24 COMPLETED
+
+``STATUS`` bits ``DONE``, ``ERROR`` and ``IRQ`` are cleared by writing 1s.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+from src.simulator.mmio import RegisterBlock
+
+DMA_SRC = 0x00
+DMA_DST = 0x04
+DMA_LENGTH = 0x08
+DMA_ROWS = 0x0C
+DMA_SRC_STRIDE = 0x10
+DMA_DST_STRIDE = 0x14
+DMA_CONTROL = 0x18
+DMA_DOORBELL = 0x1C
+DMA_STATUS = 0x20
+DMA_COMPLETED = 0x24
+DMA_REGISTER_SPACE = 0x100
+
+STATUS_BUSY = 1 << 0
+STATUS_DONE = 1 << 1
+STATUS_ERROR = 1 << 2
+STATUS_IRQ = 1 << 3
+_STATUS_STICKY = STATUS_DONE | STATUS_ERROR | STATUS_IRQ
+
+CONTROL_IRQ_ENABLE = 1 << 0
+
+DEFAULT_BYTES_PER_CYCLE = 8
+DEFAULT_SETUP_CYCLES = 16
+
+_PROGRAMMABLE = (DMA_SRC, DMA_DST, DMA_LENGTH, DMA_ROWS, DMA_SRC_STRIDE, DMA_DST_STRIDE, DMA_CONTROL)
+
+
+class DMATransfer(NamedTuple):
+    src: int
+    dst: int
+    length: int
+    rows: int
+    src_stride: int
+    dst_stride: int
+    start: int
+    finish: int
+
+    @property
+    def size(self) -> int:
+        return self.length * self.rows
+
+
+class DMAState(NamedTuple):
+    """Channel registers, status counters and queued transfers of a :class:`DMAEngine`."""
+
+    registers: dict
+    status: int
+    completed: int
+    bytes_transferred: int
+    in_flight: tuple
+
+
+class DMAEngine(RegisterBlock):
+    """Single-channel DMA device with a FIFO of in-flight transfers."""
+
+    def __init__(
+        self,
+        bus,
+        clock: Optional[Callable[[], int]] = None,
+        *,
+        bytes_per_cycle: int = DEFAULT_BYTES_PER_CYCLE,
+        setup_cycles: int = DEFAULT_SETUP_CYCLES,
+        interconnect=None,
+        interrupt: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        if bytes_per_cycle <= 0 or setup_cycles < 0:
+            raise ValueError(
+                f"DMA bandwidth must be positive and setup non-negative: "
+                f"bytes_per_cycle={bytes_per_cycle}, setup_cycles={setup_cycles}"
+            )
+        self.bus = bus
+        self.clock = clock
+        self.bytes_per_cycle = bytes_per_cycle
+        self.setup_cycles = setup_cycles
+        # Transfers are submitted as "dma" traffic when the interconnect knows that master.
+        self.interconnect = interconnect if interconnect is not None and "dma" in interconnect.masters else None
+        self.interrupt = interrupt
+        self.registers = dict.fromkeys(_PROGRAMMABLE, 0)
+        self.registers[DMA_ROWS] = 1
+        self.status = 0
+        self.completed = 0
+        self.bytes_transferred = 0
+        self.in_flight = deque()
+
+    def _now(self) -> int:
+        return self.clock() if self.clock is not None else 0
+
+    def advance(self, cycle: Optional[int] = None) -> None:
+        """Retire every transfer that has completed by ``cycle`` (default: the clock)."""
+        now = self._now() if cycle is None else cycle
+        in_flight = self.in_flight
+        while in_flight and in_flight[0].finish <= now:
+            transfer = in_flight.popleft()
+            self.completed += 1
+            self.status |= STATUS_DONE
+            if self.registers[DMA_CONTROL] & CONTROL_IRQ_ENABLE:
+                self.status |= STATUS_IRQ
+                if self.interrupt is not None:
+                    self.interrupt(transfer.finish)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.in_flight)
+
+    @property
+    def busy_until(self) -> int:
+        """Completion cycle of the last queued transfer (0 when idle)."""
+        return self.in_flight[-1].finish if self.in_flight else 0
+
+    def snapshot(self) -> DMAState:
+        """Capture the engine state; the transferred data lives in the bus devices."""
+        return DMAState(
+            dict(self.registers), self.status, self.completed, self.bytes_transferred, tuple(self.in_flight)
+        )
+
+    def restore(self, state: DMAState) -> None:
+        """Return to ``state``, dropping transfers started since it was captured."""
+        self.registers = dict(state.registers)
+        self.status = state.status
+        self.completed = state.completed
+        self.bytes_transferred = state.bytes_transferred
+        self.in_flight = deque(state.in_flight)
+
+    def rebase(self, origin: int) -> None:
+        """Count cycles from ``origin`` on, e.g. when the simulator restarts its clock."""
+        self.in_flight = deque(
+            transfer._replace(start=transfer.start - origin, finish=transfer.finish - origin)
+            for transfer in self.in_flight
+        )
+
+    def _start(self) -> None:
+        registers = self.registers
+        length, rows = registers[DMA_LENGTH], max(registers[DMA_ROWS], 1)
+        src, dst = registers[DMA_SRC], registers[DMA_DST]
+        src_stride = registers[DMA_SRC_STRIDE] or length
+        dst_stride = registers[DMA_DST_STRIDE] or length
+        try:
+            self._copy(src, dst, length, rows, src_stride, dst_stride)
+        except (MemoryError, IndexError):
+            self.status |= STATUS_ERROR
+            return
+        now = self._now()
+        start = max(now, self.busy_until)
+        duration = 0
+        if self.clock is not None:
+            duration = self.setup_cycles + -(-(length * rows) // self.bytes_per_cycle)
+        transfer = DMATransfer(src, dst, length, rows, src_stride, dst_stride, start, start + duration)
+        self.bytes_transferred += transfer.size
+        if self.interconnect is not None and transfer.size:
+            self.interconnect.submit("dma", start, transfer.size)
+        self.in_flight.append(transfer)
+        self.advance(now)
+
+    def _copy(self, src, dst, length, rows, src_stride, dst_stride) -> None:
+        if not length:
+            return
+        bus = self.bus
+        if src_stride == length and dst_stride == length:
+            bus.write(dst, bus.read_view(src, length * rows))
+            return
+        for row in range(rows):
+            bus.write(dst + row * dst_stride, bus.read_view(src + row * src_stride, length))
+
+    def read_u32(self, offset: int) -> int:
+        if offset == DMA_STATUS:
+            self.advance()
+            return self.status | (STATUS_BUSY if self.in_flight else 0)
+        if offset == DMA_COMPLETED:
+            self.advance()
+            return self.completed & 0xFFFFFFFF
+        return self.registers.get(offset, 0)
+
+    def write_u32(self, offset: int, value: int) -> None:
+        if offset in self.registers:
+            self.registers[offset] = value
+        elif offset == DMA_DOORBELL:
+            if value:
+                self._start()
+        elif offset == DMA_STATUS:
+            self.status &= ~(value & _STATUS_STICKY)
+        # Writes to read-only or unmapped offsets are ignored.
+
+
+__all__ = [
+    "CONTROL_IRQ_ENABLE",
+    "DMA_COMPLETED",
+    "DMA_CONTROL",
+    "DMA_DOORBELL",
+    "DMA_DST",
+    "DMA_DST_STRIDE",
+    "DMA_LENGTH",
+    "DMA_REGISTER_SPACE",
+    "DMA_ROWS",
+    "DMA_SRC",
+    "DMA_SRC_STRIDE",
+    "DMA_STATUS",
+    "STATUS_BUSY",
+    "STATUS_DONE",
+    "STATUS_ERROR",
+    "STATUS_IRQ",
+    "DMATransfer",
+    "DMAState",
+    "DMAEngine",
+]
@@ -0,0 +1,286 @@
+"""DRAM controller timing model with per-bank row buffers.
+
+:class:`DRAMController` maps addresses row-interleaved across banks (row |
+bank | column) and keeps an open-page row buffer per bank. Each access costs:
+
+* ``t_cas`` on a row-buffer hit,
+* ``t_rcd + t_cas`` when the bank has no open row,
+* ``t_rp + t_rcd + t_cas`` on a row conflict.
+
+Every ``t_refi`` cycles a refresh closes all rows and blocks the device for
+``t_rfc`` cycles; accesses issued during a refresh wait for it to finish.
+
+Accesses are issued either at an explicit cycle or, by default, back to back
+on the controller's own clock. :meth:`DRAMController.access_batch` times whole
+address arrays with vectorised per-bank row comparisons and gives the same
+latencies and statistics as calling :meth:`DRAMController.access` in order.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_BANKS = 8
+DEFAULT_ROW_SIZE = 2048
+DEFAULT_T_RCD = 14
+DEFAULT_T_CAS = 14
+DEFAULT_T_RP = 14
+DEFAULT_T_REFI = 7800
+DEFAULT_T_RFC = 350
+
+_CLOSED = -1
+# Row-buffer outcomes, used as indices into the latency table.
+_HIT, _EMPTY, _CONFLICT = 0, 1, 2
+
+
+def _is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+class DRAMState(NamedTuple):
+    """Open rows, clock and statistics of a :class:`DRAMController`."""
+
+    open_rows: np.ndarray
+    now: int
+    epoch: int
+    row_hits: int
+    row_empties: int
+    row_conflicts: int
+    refreshes: int
+    refresh_stall_cycles: int
+
+
+class DRAMController:
+    """Open-page DRAM timing model with banks, row buffers and periodic refresh."""
+
+    def __init__(
+        self,
+        banks: int = DEFAULT_BANKS,
+        row_size: int = DEFAULT_ROW_SIZE,
+        t_rcd: int = DEFAULT_T_RCD,
+        t_cas: int = DEFAULT_T_CAS,
+        t_rp: int = DEFAULT_T_RP,
+        t_refi: int = DEFAULT_T_REFI,
+        t_rfc: int = DEFAULT_T_RFC,
+    ) -> None:
+        if not (_is_power_of_two(banks) and _is_power_of_two(row_size)):
+            raise ValueError(f"Banks and row size must be powers of two: banks={banks}, row_size={row_size}")
+        if min(t_rcd, t_rp, t_rfc) < 0 or t_cas <= 0:
+            raise ValueError("DRAM timings must be non-negative and t_cas positive")
+        if not 0 <= t_rfc < t_refi:
+            raise ValueError(f"Refresh interval must exceed the refresh time: t_refi={t_refi}, t_rfc={t_rfc}")
+        self.banks = banks
+        self.row_size = row_size
+        self.t_rcd = t_rcd
+        self.t_cas = t_cas
+        self.t_rp = t_rp
+        self.t_refi = t_refi
+        self.t_rfc = t_rfc
+        self._row_shift = row_size.bit_length() - 1
+        self._bank_mask = banks - 1
+        self._bank_bits = banks.bit_length() - 1
+        self._latencies = np.array([t_cas, t_rcd + t_cas, t_rp + t_rcd + t_cas], dtype=np.int64)
+        self.open_rows = np.full(banks, _CLOSED, dtype=np.int64)
+        self.now = 0
+        self._epoch = 0
+        self.row_hits = 0
+        self.row_empties = 0
+        self.row_conflicts = 0
+        self.refreshes = 0
+        self.refresh_stall_cycles = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "DRAMController":
+        """Build a controller from a dict of :class:`DRAMController` keyword arguments."""
+        unknown = set(config) - {"banks", "row_size", "t_rcd", "t_cas", "t_rp", "t_refi", "t_rfc"}
+        if unknown:
+            raise ValueError(f"Unknown DRAM options: {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+    @property
+    def accesses(self) -> int:
+        return self.row_hits + self.row_empties + self.row_conflicts
+
+    @property
+    def row_hit_rate(self) -> float:
+        return self.row_hits / self.accesses if self.accesses else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "accesses": self.accesses,
+            "row_hits": self.row_hits,
+            "row_empties": self.row_empties,
+            "row_conflicts": self.row_conflicts,
+            "row_hit_rate": self.row_hit_rate,
+            "refreshes": self.refreshes,
+            "refresh_stall_cycles": self.refresh_stall_cycles,
+        }
+
+    def reset(self) -> None:
+        """Close every row, rewind the clock and clear the statistics."""
+        self.open_rows.fill(_CLOSED)
+        self.now = 0
+        self._epoch = 0
+        self.row_hits = self.row_empties = self.row_conflicts = 0
+        self.refreshes = 0
+        self.refresh_stall_cycles = 0
+
+    def snapshot(self) -> DRAMState:
+        """Capture the row buffers, the clock and the statistics."""
+        return DRAMState(
+            self.open_rows.copy(), self.now, self._epoch, self.row_hits, self.row_empties,
+            self.row_conflicts, self.refreshes, self.refresh_stall_cycles,
+        )
+
+    def restore(self, state: DRAMState) -> None:
+        """Return to ``state``."""
+        self.open_rows[:] = state.open_rows
+        self.now = state.now
+        self._epoch = state.epoch
+        self.row_hits = state.row_hits
+        self.row_empties = state.row_empties
+        self.row_conflicts = state.row_conflicts
+        self.refreshes = state.refreshes
+        self.refresh_stall_cycles = state.refresh_stall_cycles
+
+    def rebase(self, origin: int) -> None:
+        """Count cycles from ``origin`` on, e.g. when the simulator restarts its clock.
+
+        Refresh intervals restart from the new origin; open rows are kept.
+        """
+        self.now = max(self.now - origin, 0)
+        self._epoch = self.now // self.t_refi
+
+    def _refresh_stall(self, cycle: int) -> int:
+        """Enter ``cycle``'s refresh interval and return the cycles spent waiting for its refresh."""
+        epoch = cycle // self.t_refi
+        if epoch > self._epoch:
+            self.open_rows.fill(_CLOSED)
+            self.refreshes += epoch - self._epoch
+            self._epoch = epoch
+        offset = cycle - epoch * self.t_refi
+        return self.t_rfc - offset if epoch and offset < self.t_rfc else 0
+
+    def access(self, address: int, cycle: int | None = None) -> int:
+        """Time an access to ``address`` issued at ``cycle``; returns its latency.
+
+        Without ``cycle`` the access is issued when the previous one completed.
+        Issue cycles must not decrease.
+        """
+        if cycle is None:
+            cycle = self.now
+        stall = self._refresh_stall(cycle)
+        row_index = address >> self._row_shift
+        bank = row_index & self._bank_mask
+        row = row_index >> self._bank_bits
+        open_row = int(self.open_rows[bank])
+        if open_row == row:
+            outcome = _HIT
+            self.row_hits += 1
+        elif open_row == _CLOSED:
+            outcome = _EMPTY
+            self.row_empties += 1
+        else:
+            outcome = _CONFLICT
+            self.row_conflicts += 1
+        self.open_rows[bank] = row
+        latency = stall + int(self._latencies[outcome])
+        self.refresh_stall_cycles += stall
+        self.now = cycle + latency
+        return latency
+
+    def _row_outcomes(self, banks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Classify accesses within one refresh interval and update the open rows."""
+        order = np.argsort(banks, kind="stable")
+        grouped_banks = banks[order]
+        grouped_rows = rows[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = grouped_banks[1:] != grouped_banks[:-1]
+        previous = np.empty_like(grouped_rows)
+        previous[1:] = grouped_rows[:-1]
+        previous[first] = self.open_rows[grouped_banks[first]]
+        outcomes = np.empty(len(order), dtype=np.int64)
+        outcomes[order] = np.where(
+            previous == grouped_rows, _HIT, np.where(previous == _CLOSED, _EMPTY, _CONFLICT)
+        )
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = first[1:]
+        self.open_rows[grouped_banks[last]] = grouped_rows[last]
+        return outcomes
+
+    def _count(self, outcomes: np.ndarray) -> None:
+        hits, empties, conflicts = np.bincount(outcomes, minlength=3).tolist()
+        self.row_hits += hits
+        self.row_empties += empties
+        self.row_conflicts += conflicts
+
+    def access_batch(self, addresses, cycles=None) -> np.ndarray:
+        """Time every access in order; returns an int64 latency array.
+
+        Equivalent to calling :meth:`access` for each address (with the
+        matching entry of ``cycles`` when given). Row-buffer outcomes are
+        resolved per refresh interval with vectorised per-bank comparisons.
+        """
+        addresses = np.asarray(addresses, dtype=np.int64)
+        count = len(addresses)
+        latencies = np.zeros(count, dtype=np.int64)
+        if count == 0:
+            return latencies
+        row_indices = addresses >> self._row_shift
+        banks = row_indices & self._bank_mask
+        rows = row_indices >> self._bank_bits
+        if cycles is not None:
+            self._access_at(np.asarray(cycles, dtype=np.int64), banks, rows, latencies)
+        else:
+            self._access_back_to_back(banks, rows, latencies)
+        return latencies
+
+    def _access_at(self, cycles, banks, rows, latencies) -> None:
+        t_refi, t_rfc = self.t_refi, self.t_rfc
+        epochs = cycles // t_refi
+        offsets = cycles - epochs * t_refi
+        stalls = np.where((epochs > 0) & (offsets < t_rfc), t_rfc - offsets, 0)
+        bounds = np.concatenate(([0], np.flatnonzero(epochs[1:] != epochs[:-1]) + 1, [len(cycles)]))
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            self._refresh_stall(int(cycles[start]))
+            outcomes = self._row_outcomes(banks[start:end], rows[start:end])
+            self._count(outcomes)
+            latencies[start:end] = self._latencies[outcomes]
+        latencies += stalls
+        self.refresh_stall_cycles += int(stalls.sum())
+        self.now = int(cycles[-1] + latencies[-1])
+
+    def _access_back_to_back(self, banks, rows, latencies) -> None:
+        # Every access takes at least t_cas, so a window this long reaches
+        # the next refresh interval.
+        window = self.t_refi // self.t_cas + 1
+        position, count = 0, len(banks)
+        while position < count:
+            stall = self._refresh_stall(self.now)
+            end = min(count, position + window)
+            saved_rows = self.open_rows.copy()
+            outcomes = self._row_outcomes(banks[position:end], rows[position:end])
+            window_latencies = self._latencies[outcomes]
+            window_latencies[0] += stall
+            finish = self.now + np.cumsum(window_latencies)
+            # Accesses that start in a later refresh interval are redone
+            # from there after the refresh has closed the rows; the earlier
+            # outcomes stand, only the open rows are rewound to them.
+            crossed = np.flatnonzero(finish[:-1] // self.t_refi != self._epoch)
+            if len(crossed):
+                taken = int(crossed[0]) + 1
+                outcomes = outcomes[:taken]
+                window_latencies = window_latencies[:taken]
+                finish = finish[:taken]
+                taken_banks = banks[position:position + taken][::-1]
+                taken_rows = rows[position:position + taken][::-1]
+                touched, last = np.unique(taken_banks, return_index=True)
+                self.open_rows[:] = saved_rows
+                self.open_rows[touched] = taken_rows[last]
+            self._count(outcomes)
+            self.refresh_stall_cycles += stall
+            latencies[position:position + len(window_latencies)] = window_latencies
+            position += len(window_latencies)
+            self.now = int(finish[-1])
@@ -0,0 +1,258 @@
+"""Analytic fast-forwarding of tight counted loops.
+
+When a backward branch is taken, the loop body between the branch target and
+the branch is analysed. Loops qualify when the body only contains
+register-to-register ALU instructions and every register it writes is either
+
+* *affine*: ``rd = rd + rs`` or ``rd = rd - rs`` with ``rs`` loop invariant, or
+* *constant*: computed only from loop-invariant registers.
+
+The remaining trip count is solved from the branch condition and the engine
+jumps straight to the loop exit, crediting ``instruction_count`` and the
+latency the skipped iterations would have cost: ``LATENCY_TABLE`` execute
+cycles by default, or a fixed fetch latency per instruction for callers
+that time execution by instruction fetches.
+Loops that touch memory or whose exit cannot be solved exactly run normally.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import math
+
+from src.risc_v.engine import CODE_PAGE_SHIFT, HALT_JAL_INSTRUCTION, OPERAND_FIELDS, decode_instruction
+from src.risc_v.registers import REGISTER_MASK, XLEN, to_signed
+from src.simulator.latency import LATENCY_TABLE
+
+DEFAULT_INSTRUCTION_LATENCY = 1  # for mnemonics missing from the latency table
+MAX_LOOP_BODY = 64  # instructions, including the closing branch
+
+_LOOP_BODY_OPERATIONS = frozenset({"ADD", "SUB", "XOR", "OR", "AND", "MUL", "DIV"})
+_SIGNED_RANGE = (-(1 << (XLEN - 1)), (1 << (XLEN - 1)) - 1)
+_UNSIGNED_RANGE = (0, REGISTER_MASK)
+
+
+class TightLoop(NamedTuple):
+    start_pc: int
+    branch_pc: int
+    length: int  # instructions per iteration, including the branch
+    latency: int  # LATENCY_TABLE cycles per iteration
+    induction: Dict[int, Tuple[int, int]]  # rd -> (step register, +1 / -1)
+    constants: Tuple[Tuple[str, Tuple[int, int, int]], ...]  # (handler, operands)
+    branch: str
+    branch_operands: Tuple[int, int]
+
+
+class LoopFastForwarder:
+    """Installs a backward-branch hook on ``engine`` that skips tight loops.
+
+    ``instruction_allowance`` caps how many instructions may still be skipped
+    (``None`` means unlimited) so callers can honour instruction budgets; it
+    is decremented as iterations are skipped.
+
+    With ``fetch_latency``, ``skipped_latency`` charges that many cycles per
+    skipped instruction instead of ``latency_table`` execute cycles.
+
+    Only the interpreter loop of :class:`RISCVEngine` calls the hook; blocks
+    translated by ``BlockEngine`` execute their branches inline.
+    """
+
+    def __init__(self, engine, latency_table=None, fetch_latency=None):
+        self.engine = engine
+        self.latency_table = LATENCY_TABLE if latency_table is None else latency_table
+        self.fetch_latency = fetch_latency
+        self.instruction_allowance: Optional[int] = None
+        self.skipped_instructions = 0
+        self.skipped_latency = 0
+        self.loops_fast_forwarded = 0
+        self._loops: Dict[int, Tuple[int, Optional[TightLoop]]] = {}
+        self._loop_pages = set()
+        add_write_observer = getattr(engine.bus, "add_write_observer", None)
+        self._cache_enabled = add_write_observer is not None
+        if self._cache_enabled:
+            add_write_observer(self._on_bus_write)
+        self.attach()
+
+    def attach(self):
+        """Install the hook on the engine; done on construction."""
+        self.engine.set_backward_branch_hook(self._on_backward_branch)
+
+    def detach(self):
+        """Remove the hook from the engine."""
+        self.engine.set_backward_branch_hook(None)
+
+    def invalidate_cache(self):
+        """Forget all loop analyses, e.g. after memory was replaced wholesale."""
+        self._loops.clear()
+        self._loop_pages.clear()
+
+    def _on_bus_write(self, address, size):
+        end = address + size
+        pages = range(address >> CODE_PAGE_SHIFT, ((end - 1) >> CODE_PAGE_SHIFT) + 1)
+        if not any(page in self._loop_pages for page in pages):
+            return
+        stale = [
+            branch_pc for branch_pc, (start_pc, _) in self._loops.items()
+            if address < branch_pc + 4 and start_pc < end
+        ]
+        for branch_pc in stale:
+            del self._loops[branch_pc]
+
+    def analyse(self, branch_pc):
+        """Return the :class:`TightLoop` closed at ``branch_pc``, or ``None``."""
+        cached = self._loops.get(branch_pc)
+        if cached is not None:
+            return cached[1]
+        spec, operands = decode_instruction(self.engine._read_word(branch_pc))
+        fields = dict(zip(OPERAND_FIELDS[spec.fmt], operands))
+        start_pc = branch_pc + fields["imm"]
+        loop = self._analyse_body(start_pc, branch_pc, spec.mnemonic, (fields["rs1"], fields["rs2"]))
+        if self._cache_enabled:
+            self._loops[branch_pc] = (start_pc, loop)
+            self._loop_pages.update(
+                range(start_pc >> CODE_PAGE_SHIFT, (branch_pc >> CODE_PAGE_SHIFT) + 1)
+            )
+        return loop
+
+    def _analyse_body(self, start_pc, branch_pc, branch, branch_operands):
+        length = (branch_pc - start_pc) // 4 + 1
+        if length > MAX_LOOP_BODY:
+            return None
+
+        body = []
+        for pc in range(start_pc, branch_pc, 4):
+            word = self.engine._read_word(pc)
+            if word == 0 or word == HALT_JAL_INSTRUCTION:
+                return None
+            try:
+                spec, operands = decode_instruction(word)
+            except ValueError:
+                return None
+            if spec.mnemonic not in _LOOP_BODY_OPERATIONS:
+                return None
+            body.append((spec, operands))
+
+        written = [operands[0] for _, operands in body if operands[0] != 0]
+        if len(written) != len(set(written)):
+            return None
+        invariant = set(range(32)).difference(written)
+
+        induction = {}
+        constants = []
+        for spec, (rd, rs1, rs2) in body:
+            if rd == 0:
+                continue
+            if rs1 in invariant and rs2 in invariant:
+                constants.append((spec.handler, (rd, rs1, rs2)))
+            elif spec.mnemonic == "ADD" and rd == rs1 and rs2 in invariant:
+                induction[rd] = (rs2, 1)
+            elif spec.mnemonic == "ADD" and rd == rs2 and rs1 in invariant:
+                induction[rd] = (rs1, 1)
+            elif spec.mnemonic == "SUB" and rd == rs1 and rs2 in invariant:
+                induction[rd] = (rs2, -1)
+            else:
+                return None
+
+        latency = self.latency_table.get(branch, DEFAULT_INSTRUCTION_LATENCY) + sum(
+            self.latency_table.get(spec.mnemonic, DEFAULT_INSTRUCTION_LATENCY) for spec, _ in body
+        )
+        return TightLoop(
+            start_pc, branch_pc, length, latency, induction, tuple(constants), branch, branch_operands
+        )
+
+    def _on_backward_branch(self, engine, branch_pc):
+        loop = self.analyse(branch_pc)
+        if loop is None:
+            return
+        steps = {
+            rd: (sign * int(engine.registers[source])) & REGISTER_MASK
+            for rd, (source, sign) in loop.induction.items()
+        }
+        remaining = self._remaining_iterations(loop, steps)
+        if remaining is None:
+            return
+        iterations = remaining
+        if self.instruction_allowance is not None:
+            iterations = min(iterations, self.instruction_allowance // loop.length)
+        if iterations <= 0:
+            return
+
+        registers = engine.registers
+        for rd, step in steps.items():
+            registers[rd] = (int(registers[rd]) + iterations * step) & REGISTER_MASK
+        for handler, operands in loop.constants:
+            getattr(engine, handler)(*operands)
+
+        skipped = iterations * loop.length
+        engine.instruction_count += skipped
+        engine.pc = loop.branch_pc + 4 if iterations == remaining else loop.start_pc
+        self.skipped_instructions += skipped
+        if self.fetch_latency is None:
+            self.skipped_latency += iterations * loop.latency
+        else:
+            self.skipped_latency += skipped * self.fetch_latency
+        self.loops_fast_forwarded += 1
+        if self.instruction_allowance is not None:
+            self.instruction_allowance -= skipped
+
+    def _branch_operand(self, loop, register, steps):
+        """Return ``(value seen by the branch after one more iteration, step)``."""
+        engine = self.engine
+        for handler, operands in loop.constants:
+            if operands[0] == register:
+                saved = engine.registers[register]
+                getattr(engine, handler)(*operands)
+                value = int(engine.registers[register])
+                engine.registers[register] = saved
+                return value, 0
+        step = steps.get(register, 0)
+        return (int(engine.registers[register]) + step) & REGISTER_MASK, step
+
+    def _remaining_iterations(self, loop, steps):
+        """Iterations left, counting the one about to start, or ``None`` if unsolvable."""
+        lhs, lhs_step = self._branch_operand(loop, loop.branch_operands[0], steps)
+        rhs, rhs_step = self._branch_operand(loop, loop.branch_operands[1], steps)
+        if (lhs_step == 0) == (rhs_step == 0):
+            return None  # exactly one side must be an induction variable
+        if lhs_step:
+            value, step, bound, induction_on_left = lhs, lhs_step, rhs, True
+        else:
+            value, step, bound, induction_on_left = rhs, rhs_step, lhs, False
+
+        if loop.branch == "BNE":
+            extra = _solve_linear_congruence(step, (bound - value) & REGISTER_MASK)
+            return None if extra is None else extra + 1
+        if loop.branch == "BEQ":
+            return 1 if value != bound else None
+
+        signed = loop.branch in ("BLT", "BGE")
+        if signed:
+            value, bound = to_signed(value), to_signed(bound)
+        low, high = _SIGNED_RANGE if signed else _UNSIGNED_RANGE
+        step = to_signed(step)
+        # Express the taken condition on the induction value x as either
+        # "x < limit" (taken while small) or "x > limit" (taken while large).
+        less_than = loop.branch in ("BLT", "BLTU")
+        if less_than == induction_on_left:
+            limit = bound if less_than else bound + 1  # x < b, or b >= x
+            if step <= 0:
+                return None
+            extra = max(0, -((value - limit) // step))
+            return extra + 1 if value + extra * step <= high else None
+        limit = bound - 1 if induction_on_left else bound  # x >= b, or b < x
+        if step >= 0:
+            return None
+        extra = max(0, -((limit - value) // -step))
+        return extra + 1 if value + extra * step >= low else None
+
+
+def _solve_linear_congruence(step, difference):
+    """Smallest ``j >= 0`` with ``j * step == difference (mod 2**XLEN)``."""
+    modulus = 1 << XLEN
+    divisor = math.gcd(step, modulus)
+    if difference % divisor:
+        return None
+    modulus //= divisor
+    return (difference // divisor) * pow(step // divisor, -1, modulus) % modulus
+
+
+__all__ = ["LoopFastForwarder", "TightLoop", "DEFAULT_INSTRUCTION_LATENCY", "MAX_LOOP_BODY"]
@@ -2,12 +2,29 @@ import time
 import numpy as np
 
 class TimingHookSystem:
+    """Latency hooks called by the simulator.
+
+    By default instruction-cache misses are drawn from pre-generated random
+    choices. With ``caches`` (a :class:`src.simulator.cache.CacheHierarchy`)
+    fetch and memory latencies come from the cache model instead, driven by
+    the actual PCs and data addresses. Without caches, a ``dram``
+    (:class:`src.simulator.dram.DRAMController`) replaces the flat
+    ``MEMORY_ACCESS_LATENCY`` of data accesses; with caches, give the
+    controller to the :class:`CacheHierarchy` so it times the misses.
+    Only DRAM accesses reach ``memory_hook``: the simulator charges
+    ``UNCACHED_ACCESS_LATENCY`` for the SPM and device registers. With a DRAM
+    model the simulator passes each access's issue ``cycle`` to the hooks so
+    refresh follows simulated time.
+    """
     ICACHE_HIT_LATENCY = 1
     ICACHE_MISS_LATENCY = 10
     MEMORY_ACCESS_LATENCY = 2
+    UNCACHED_ACCESS_LATENCY = 2
 
-    def __init__(self, buffer_size=10000):
+    def __init__(self, buffer_size=10000, caches=None, dram=None):
         self.buffer_size = buffer_size
+        self.caches = caches
+        self.dram = dram
         self.hook_stats = {
             'fetch': np.zeros(buffer_size, dtype=[('timestamp', 'f8'), ('latency', 'i4'), ('cache_miss', '?')]),
             'decode': [],
@@ -18,12 +35,48 @@ class TimingHookSystem:
         # Pre-generate random choices for performance
         self.random_choices = np.random.choice([True, False], size=buffer_size)
 
+    @property
+    def fetch_hit_latency(self):
+        """Latency of an instruction fetch that hits, e.g. inside a hot loop."""
+        if self.caches is not None:
+            return self.caches.l1i.hit_latency
+        return self.ICACHE_HIT_LATENCY
+
+    @property
+    def dram_model(self):
+        """The DRAM controller timing accesses, directly or behind the caches; ``None`` without one."""
+        if self.caches is not None:
+            return self.caches.dram
+        return self.dram
+
+    def snapshot(self):
+        """Capture the state of the timing models, keyed by model name."""
+        state = {}
+        if self.caches is not None:
+            state['caches'] = self.caches.snapshot()
+        if self.dram is not None:
+            state['dram'] = self.dram.snapshot()
+        return state
+
+    def restore(self, state):
+        """Return the timing models to a :meth:`snapshot` state."""
+        if self.caches is not None:
+            self.caches.restore(state['caches'])
+        if self.dram is not None:
+            self.dram.restore(state['dram'])
+
     def _check_icache_miss(self, pc):
         # Use pre-generated random numbers instead of calling random.choice repeatedly
         return self.random_choices[self.counters['fetch']]
 
-    def fetch_hook(self, pc, inst_bits):
+    def fetch_hook(self, pc, inst_bits, cycle=None):
         idx = self.counters['fetch']
+        if self.caches is not None:
+            latency = self.caches.fetch(pc, cycle)
+            if idx < self.buffer_size:
+                self.hook_stats['fetch'][idx] = (time.time(), latency, latency > self.caches.l1i.hit_latency)
+                self.counters['fetch'] += 1
+            return latency
         if idx >= self.buffer_size:
             # Buffer full, returning default latency and stopping recording.
             return self.ICACHE_HIT_LATENCY
@@ -43,8 +96,20 @@ class TimingHookSystem:
     def execute_hook(self, op):
         pass
 
-    def memory_hook(self, address, size, is_write):
+    def memory_hook(self, address, size, is_write, cycle=None):
         idx = self.counters['memory']
+        if self.caches is not None:
+            latency = self.caches.data(address, cycle)
+            if idx < self.buffer_size:
+                self.hook_stats['memory'][idx] = (time.time(), latency, address, size, is_write)
+                self.counters['memory'] += 1
+            return latency
+        if self.dram is not None:
+            latency = self.dram.access(address, cycle)
+            if idx < self.buffer_size:
+                self.hook_stats['memory'][idx] = (time.time(), latency, address, size, is_write)
+                self.counters['memory'] += 1
+            return latency
         if idx >= self.buffer_size:
             # Buffer full, returning default latency and stopping recording.
             return self.MEMORY_ACCESS_LATENCY
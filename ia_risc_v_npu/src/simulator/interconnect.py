@@ -0,0 +1,259 @@
+"""Shared-bus arbitration between the CPU and the NPU/DMA masters.
+
+:class:`BusArbiter` models one bus ``width`` bytes wide that moves one beat
+per cycle. A transaction of ``size`` bytes needs ``ceil(size / width)``
+beats and is granted the bus a burst (up to ``burst`` beats) at a time; at
+every burst boundary the arbiter picks among the masters with a request
+waiting, either round-robin or by fixed priority (earlier masters first).
+Each master is served in issue order.
+
+Transactions are arbitrated in batches. The bus is work-conserving, so its
+busy periods do not depend on the policy and are found for a whole batch at
+once; only busy periods in which several masters compete are stepped burst
+by burst.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+ARBITRATION_POLICIES = ("round_robin", "priority")
+
+DEFAULT_MASTERS = ("cpu", "npu", "dma")
+DEFAULT_BUS_WIDTH = 8
+DEFAULT_BURST_BEATS = 8
+
+
+class ArbitrationResult(NamedTuple):
+    """Per-transaction outcome of :meth:`BusArbiter.arbitrate`, in input order."""
+
+    masters: np.ndarray  # master index of each transaction
+    start: np.ndarray    # cycle of the first granted beat
+    finish: np.ndarray   # cycle after the last beat
+    delay: np.ndarray    # cycles spent waiting for the bus
+
+    def master_delay(self, master: int) -> int:
+        """Total queueing delay of ``master``'s transactions."""
+        return int(self.delay[self.masters == master].sum())
+
+
+class ArbiterState(NamedTuple):
+    """Bus occupancy, round-robin pointer and statistics of a :class:`BusArbiter`."""
+
+    busy_until: int
+    next_master: int
+    transactions: tuple
+    beats: tuple
+    queueing_delay: tuple
+
+
+class BusArbiter:
+    """Single shared bus arbitrating bursts between several masters."""
+
+    def __init__(
+        self,
+        masters: Sequence[str] = DEFAULT_MASTERS,
+        policy: str = "round_robin",
+        width: int = DEFAULT_BUS_WIDTH,
+        burst: int = DEFAULT_BURST_BEATS,
+    ) -> None:
+        if policy not in ARBITRATION_POLICIES:
+            raise ValueError(f"Unknown arbitration policy: {policy!r}")
+        if width <= 0 or burst <= 0:
+            raise ValueError(f"Bus width and burst length must be positive: width={width}, burst={burst}")
+        if not masters or len(set(masters)) != len(masters):
+            raise ValueError(f"Bus masters must be distinct and non-empty: {list(masters)}")
+        self.masters = tuple(masters)
+        self.policy = policy
+        self.width = width
+        self.burst = burst
+        self.busy_until = 0
+        self._next = 0  # round-robin pointer: first master considered at the next grant
+        self._pending = ([], [], [])  # masters, cycles, sizes submitted since the last drain
+        count = len(self.masters)
+        self.transactions = np.zeros(count, dtype=np.int64)
+        self.beats = np.zeros(count, dtype=np.int64)
+        self.queueing_delay = np.zeros(count, dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "BusArbiter":
+        """Build an arbiter from a dict of :class:`BusArbiter` keyword arguments."""
+        unknown = set(config) - {"masters", "policy", "width", "burst"}
+        if unknown:
+            raise ValueError(f"Unknown interconnect options: {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+    def index(self, master: str) -> int:
+        try:
+            return self.masters.index(master)
+        except ValueError:
+            raise ValueError(f"Unknown bus master: {master!r}") from None
+
+    def submit(self, master: str, cycle: int, size: int) -> None:
+        """Queue one transaction for the next :meth:`drain`."""
+        masters, cycles, sizes = self._pending
+        masters.append(self.index(master))
+        cycles.append(cycle)
+        sizes.append(size)
+
+    def submit_batch(self, master: str, cycles, size) -> None:
+        """Queue one transaction per entry of ``cycles``; ``size`` is a scalar or per-transaction."""
+        cycles = np.asarray(cycles, dtype=np.int64).ravel()
+        masters, pending_cycles, sizes = self._pending
+        masters.append(np.full(len(cycles), self.index(master), dtype=np.int64))
+        pending_cycles.append(cycles)
+        sizes.append(np.broadcast_to(np.asarray(size, dtype=np.int64), cycles.shape))
+
+    def drain(self) -> ArbitrationResult:
+        """Arbitrate every submitted transaction in one batch and clear the queue."""
+        masters, cycles, sizes = (
+            np.concatenate([np.atleast_1d(np.asarray(part, dtype=np.int64)) for part in parts])
+            if parts else np.zeros(0, dtype=np.int64)
+            for parts in self._pending
+        )
+        self._pending = ([], [], [])
+        return self.arbitrate(masters, cycles, sizes)
+
+    def arbitrate(self, masters, cycles, sizes) -> ArbitrationResult:
+        """Arbitrate transactions given as master-index, issue-cycle and byte-size arrays.
+
+        Transactions issued before the bus is free from an earlier batch
+        wait for it, but are not arbitrated against that batch.
+        """
+        masters = np.asarray(masters, dtype=np.int64)
+        cycles = np.asarray(cycles, dtype=np.int64)
+        beats = np.maximum(-(-np.asarray(sizes, dtype=np.int64) // self.width), 1)
+        count = len(cycles)
+        start = np.zeros(count, dtype=np.int64)
+        finish = np.zeros(count, dtype=np.int64)
+        if count == 0:
+            return ArbitrationResult(masters, start, finish, np.zeros(0, dtype=np.int64))
+
+        order = np.argsort(cycles, kind="stable")
+        issue, who, work = cycles[order], masters[order], beats[order]
+        # First-come first-served completion times; busy periods start where
+        # a transaction arrives to an idle bus.
+        served = np.cumsum(work)
+        before = served - work
+        fcfs_finish = served + np.maximum.accumulate(np.maximum(issue, self.busy_until) - before)
+        idle = np.ones(count, dtype=bool)
+        idle[1:] = issue[1:] >= fcfs_finish[:-1]
+        period = np.cumsum(idle) - 1
+        contested = (who[1:] != who[:-1]) & (period[1:] == period[:-1])
+
+        ordered_start = fcfs_finish - work
+        ordered_finish = fcfs_finish
+        masters_count = len(self.masters)
+        # Round-robin resumes after the master granted last; in uncontested
+        # periods that is the owner of the period's last transaction.
+        pointer, stepped = self._next, -1
+        bounds = np.concatenate((np.flatnonzero(idle), [count]))
+        for index in np.unique(period[1:][contested]).tolist():
+            low, high = int(bounds[index]), int(bounds[index + 1])
+            if low and stepped != index - 1:
+                pointer = (int(who[low - 1]) + 1) % masters_count
+            pointer = self._step(
+                int(ordered_start[low]), pointer,
+                issue[low:high].tolist(), who[low:high].tolist(), work[low:high].tolist(),
+                ordered_start[low:high], ordered_finish[low:high],
+            )
+            stepped = index
+        self._next = pointer if stepped == period[-1] else (int(who[-1]) + 1) % masters_count
+        start[order] = ordered_start
+        finish[order] = ordered_finish
+        delay = finish - cycles - beats
+
+        self.busy_until = max(self.busy_until, int(ordered_finish.max()))
+        np.add.at(self.transactions, masters, 1)
+        np.add.at(self.beats, masters, beats)
+        np.add.at(self.queueing_delay, masters, delay)
+        return ArbitrationResult(masters, start, finish, delay)
+
+    def _step(self, now, pointer, issue, who, work, starts, finishes) -> int:
+        """Grant one contested busy period burst by burst; returns the next round-robin pointer."""
+        count = len(self.masters)
+        queues = [deque() for _ in range(count)]
+        remaining = list(work)
+        arrived = done = 0
+        total = len(issue)
+        priority = self.policy == "priority"
+        while done < total:
+            while arrived < total and issue[arrived] <= now:
+                queues[who[arrived]].append(arrived)
+                arrived += 1
+            if priority:
+                master = next(index for index in range(count) if queues[index])
+            else:
+                master = next(
+                    index % count for index in range(pointer, pointer + count) if queues[index % count]
+                )
+            pointer = (master + 1) % count
+            transaction = queues[master][0]
+            if remaining[transaction] == work[transaction]:
+                starts[transaction] = now
+            grant = min(self.burst, remaining[transaction])
+            now += grant
+            remaining[transaction] -= grant
+            if not remaining[transaction]:
+                finishes[transaction] = now
+                queues[master].popleft()
+                done += 1
+        return pointer
+
+    def stats(self) -> dict:
+        """Return ``{master: {"transactions", "beats", "queueing_delay"}}``."""
+        return {
+            name: {
+                "transactions": int(self.transactions[index]),
+                "beats": int(self.beats[index]),
+                "queueing_delay": int(self.queueing_delay[index]),
+            }
+            for index, name in enumerate(self.masters)
+        }
+
+    def snapshot(self) -> ArbiterState:
+        """Capture the arbitration state; transactions still pending are not part of it."""
+        return ArbiterState(
+            self.busy_until,
+            self._next,
+            tuple(self.transactions.tolist()),
+            tuple(self.beats.tolist()),
+            tuple(self.queueing_delay.tolist()),
+        )
+
+    def restore(self, state: ArbiterState) -> None:
+        """Return to ``state``, dropping pending transactions."""
+        self.busy_until = state.busy_until
+        self._next = state.next_master
+        self._pending = ([], [], [])
+        self.transactions[:] = state.transactions
+        self.beats[:] = state.beats
+        self.queueing_delay[:] = state.queueing_delay
+
+    def rebase(self, origin: int) -> None:
+        """Restart arbitration at cycle ``origin``, e.g. when the simulator restarts its clock.
+
+        Later cycles count from ``origin`` and round-robin starts over from
+        the first master; pending transactions and statistics are kept.
+        """
+        self.busy_until = max(self.busy_until - origin, 0)
+        self._next = 0
+
+    def reset(self) -> None:
+        self.busy_until = 0
+        self._next = 0
+        self._pending = ([], [], [])
+        self.transactions.fill(0)
+        self.beats.fill(0)
+        self.queueing_delay.fill(0)
+
+
+__all__ = [
+    "ARBITRATION_POLICIES",
+    "ArbitrationResult",
+    "ArbiterState",
+    "BusArbiter",
+]
@@ -5,8 +5,11 @@ import logging
 import sys
 import time
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
 
 # Ensure repository root is on sys.path when executed directly.
 if __package__ is None:
@@ -15,19 +18,60 @@ if __package__ is None:
     if project_root_str not in sys.path:
         sys.path.insert(0, project_root_str)
 
-from src.risc_v.engine import RISCVEngine
+from src.risc_v.engine import RISCVEngine, StopReason
+from src.simulator.dma import DMA_REGISTER_SPACE, DMAEngine, DMAState
+from src.simulator.fast_forward import LoopFastForwarder
 from src.simulator.hooks import TimingHookSystem
+from src.simulator.interconnect import ArbiterState, BusArbiter
 from src.npu.model import NPU
-from src.simulator.memory import SPM, Bus
+from src.simulator.memory import SPM, Bus, PagedMemory
+from src.simulator.parallel import run_parallel_simulation
+from src.simulator.sampling import SampledSimulationReport, run_sampled_simulation
 from src.simulator.mmio import MMIO
 
 # Define memory map
 DRAM_BASE = 0x00000000
-DRAM_SIZE = 1024 * 1024  # 1MB
+DRAM_SIZE = 1024 * 1024  # 1MB default; pages are allocated on first write
 SPM_BASE = 0x10000000
+MAX_DRAM_SIZE = SPM_BASE - DRAM_BASE
 SPM_SIZE_KB = 64
 MMIO_BASE = 0x20000000
 MMIO_SIZE = 0x10000  # 64KB
+# Device register blocks inside the MMIO window.
+NPU_MMIO_BASE = MMIO_BASE
+NPU_MMIO_SIZE = 0x1000
+DMA_BASE = MMIO_BASE + 0x1000
+
+# Instructions executed per RISCVEngine.run() call inside run_simulation.
+RUN_SLICE_INSTRUCTIONS = 65536
+# Words converted per bus write when load_program consumes an iterator.
+LOAD_CHUNK_WORDS = 65536
+# Bytes the CPU moves over the interconnect per instruction fetch or data access.
+FETCH_BYTES = 4
+
+
+def program_chunks(instructions) -> Iterator[memoryview]:
+    """Yield ``instructions`` as little-endian byte buffers ready for :meth:`Bus.write`.
+
+    Byte strings and arrays are passed through as a single buffer, sequences
+    are converted in one step and other iterables in ``LOAD_CHUNK_WORDS``
+    chunks.
+    """
+    if isinstance(instructions, (bytes, bytearray, memoryview)):
+        data = memoryview(instructions).cast("B")
+        if len(data) % 4:
+            raise ValueError(f"Program image size must be a multiple of 4 bytes: {len(data)}")
+        yield data
+        return
+    if isinstance(instructions, (np.ndarray, list, tuple)):
+        yield memoryview(np.ascontiguousarray(instructions, dtype="<u4")).cast("B")
+        return
+    iterator = iter(instructions)
+    while True:
+        words = np.fromiter(islice(iterator, LOAD_CHUNK_WORDS), dtype="<u4")
+        if not len(words):
+            return
+        yield memoryview(words).cast("B")
 
 
 @dataclass(slots=True)
@@ -46,6 +90,54 @@ class SimulationReport:
         return (self.instructions / 1_000_000) / self.elapsed_seconds
 
 
+@dataclass(frozen=True, slots=True)
+class SimulatorSnapshot:
+    """Architectural and timing state captured by :meth:`AdaptiveSimulator.snapshot`."""
+
+    pc: int
+    registers: tuple
+    instruction_count: int
+    dram_pages: dict
+    dram_images: tuple
+    spm: bytes
+    npu_registers: dict
+    npu_status: str
+    dma: DMAState
+    interconnect: Optional[ArbiterState]
+    timing_models: Optional[dict]
+    hook_counters: dict
+    sim_time: int
+    halt: bool
+
+
+@dataclass(frozen=True, slots=True)
+class SimulatorConfig:
+    """The options that define a simulated machine; see :class:`AdaptiveSimulator`.
+
+    Picklable (given picklable hooks), so worker processes can rebuild the
+    same machine. Tracing and logging are per process and not part of it.
+    """
+
+    timing_hooks: Optional[TimingHookSystem] = None
+    register_backend: str = "int"
+    fast_forward_loops: bool = False
+    dram_size: int = DRAM_SIZE
+    interconnect: Optional[BusArbiter] = None
+    device_timing: bool = False
+
+    def build(self, **options) -> "AdaptiveSimulator":
+        """Return a new simulator with this configuration; ``options`` add e.g. ``trace``."""
+        return AdaptiveSimulator(
+            timing_hooks=self.timing_hooks,
+            register_backend=self.register_backend,
+            fast_forward_loops=self.fast_forward_loops,
+            dram_size=self.dram_size,
+            interconnect=self.interconnect,
+            device_timing=self.device_timing,
+            **options,
+        )
+
+
 class AdaptiveSimulator:
     """Primary integration point for CPU, NPU, and shared memory models."""
 
@@ -54,59 +146,249 @@ class AdaptiveSimulator:
         *,
         timing_hooks: Optional[TimingHookSystem] = None,
         logger: Optional[logging.Logger] = None,
+        register_backend: str = "int",
+        fast_forward_loops: bool = False,
+        trace=None,
+        dram_size: int = DRAM_SIZE,
+        interconnect: Optional[BusArbiter] = None,
+        device_timing: bool = False,
     ) -> None:
-        self.bus = Bus()
-        self.dram = bytearray(DRAM_SIZE)
+        if not 0 < dram_size <= MAX_DRAM_SIZE:
+            raise ValueError(f"DRAM size must be between 1 and {MAX_DRAM_SIZE:#x} bytes: {dram_size}")
+        # With an interconnect, CPU fetches compete with the NPU/DMA transfers
+        # submitted to it and their queueing delay is added to sim_time.
+        self.interconnect = interconnect
+        self._cpu_master = interconnect.index("cpu") if interconnect is not None else None
+        self.timing_hooks = timing_hooks or TimingHookSystem()
+        # A DRAM model refreshes on simulated time, so its accesses are issued
+        # at now() and the hooks are given the cycle.
+        self._dram_model = getattr(self.timing_hooks, "dram_model", None)
+        # Devices that run alongside the CPU (the DMA engine, DRAM refresh)
+        # read the clock mid-slice; keeping it current costs a Python call
+        # per instruction, so it is only done when one of them needs it.
+        self.device_timing = device_timing or interconnect is not None or self._dram_model is not None
+        self._slice_latency = 0
+        self.trace = trace
+        self.bus = Bus(trace=trace)
+        self.dram = PagedMemory(dram_size)
         self.spm = SPM(SPM_SIZE_KB)
         self.npu = NPU()
-        self.mmio = MMIO(self.npu)
+        self.mmio = MMIO(self.npu, self.bus)
 
-        # Connect devices to the bus
-        self.bus.add_device("dram", self.dram, DRAM_BASE, DRAM_BASE + DRAM_SIZE - 1)
+        # Connect devices to the bus; the DRAM timing model, if any, rides on the dram device.
+        self.bus.add_device(
+            "dram", self.dram, DRAM_BASE, DRAM_BASE + dram_size - 1,
+            timing=getattr(self.timing_hooks, "dram", None),
+        )
         self.bus.add_device("spm", self.spm, SPM_BASE, SPM_BASE + (SPM_SIZE_KB * 1024) - 1)
-        self.bus.add_device("mmio", self.mmio, MMIO_BASE, MMIO_BASE + MMIO_SIZE - 1)
+        self.bus.add_device("mmio", self.mmio, NPU_MMIO_BASE, NPU_MMIO_BASE + NPU_MMIO_SIZE - 1)
+        self.dma = DMAEngine(
+            self.bus, clock=self.now if self.device_timing else None, interconnect=interconnect
+        )
+        self.bus.add_device("dma", self.dma, DMA_BASE, DMA_BASE + DMA_REGISTER_SPACE - 1)
 
-        self.risc_v_engine = RISCVEngine(self.bus)
-        self.timing_hooks = timing_hooks or TimingHookSystem()
+        self.risc_v_engine = RISCVEngine(self.bus, register_backend=register_backend, trace=trace)
+        self._record_issue = None
+        # Only DRAM is cached; the SPM and device registers cost a fixed latency.
+        self._dram_end = DRAM_BASE + dram_size
+        self._uncached_latency = getattr(
+            self.timing_hooks, "UNCACHED_ACCESS_LATENCY", TimingHookSystem.UNCACHED_ACCESS_LATENCY
+        )
+        # Loads and stores to DRAM are charged through memory_hook (caches,
+        # DRAM or the flat latency); hooks without one leave data accesses untimed.
+        if getattr(self.timing_hooks, "memory_hook", None) is not None:
+            self.risc_v_engine.set_data_hook(self._data_access_hook)
+        # Skipped iterations are charged like the hot-loop fetches they replace.
+        self.loop_fast_forwarder = (
+            LoopFastForwarder(
+                self.risc_v_engine,
+                fetch_latency=getattr(
+                    self.timing_hooks, "fetch_hit_latency", TimingHookSystem.ICACHE_HIT_LATENCY
+                ),
+            )
+            if fast_forward_loops else None
+        )
         # self.event_system = EventBasedSystem() # This will be implemented later
         # self.fidelity_controller = FidelityController() # This will be implemented later
         self.halt = False
         self.sim_time = 0
         self.logger = logger or logging.getLogger(__name__)
+        self._spm_snapshot = b""
+
+    def config(self) -> SimulatorConfig:
+        """Return the configuration this simulator was built with."""
+        return SimulatorConfig(
+            timing_hooks=self.timing_hooks,
+            register_backend=self.risc_v_engine.register_backend,
+            fast_forward_loops=self.loop_fast_forwarder is not None,
+            dram_size=self.dram.size,
+            interconnect=self.interconnect,
+            device_timing=self.device_timing,
+        )
 
     def load_program(
         self,
-        instructions: Iterable[int],
+        instructions: Iterable[int] | np.ndarray | bytes,
         *,
         base_address: int = DRAM_BASE,
     ) -> None:
+        """Write ``instructions`` at ``base_address`` and start execution there.
+
+        Accepts a ``np.uint32`` array, little-endian bytes or any iterable of
+        words; see :func:`program_chunks`. Each chunk is one bounds-checked
+        bus write.
+        """
         addr = base_address
         self.risc_v_engine.pc = base_address
-        for inst in instructions:
-            self.bus.write(addr, int(inst).to_bytes(4, "little", signed=False))
-            addr += 4
+        for data in program_chunks(instructions):
+            self.bus.write(addr, data)
+            addr += len(data)
+
+    def load_image(self, path, address: int) -> None:
+        """Place the raw binary file at ``path`` in memory at ``address``.
+
+        Page-aligned images in DRAM are mapped with ``mmap`` (see
+        :meth:`PagedMemory.map_file`), so even large images load in constant
+        time; anything else is copied through the bus.
+        """
+        path = Path(path)
+        dram_offset = address - DRAM_BASE
+        if 0 <= dram_offset < self.dram.size and dram_offset % self.dram.page_size == 0:
+            self.dram.map_file(dram_offset, path)
+            # Memory changed behind the bus, so cached decodes may be stale.
+            self.risc_v_engine.invalidate_decode_cache()
+            if self.loop_fast_forwarder is not None:
+                self.loop_fast_forwarder.invalidate_cache()
+        else:
+            self.bus.write(address, path.read_bytes())
+
+    def snapshot(self) -> SimulatorSnapshot:
+        """Capture the full simulator state.
+
+        DRAM pages are shared copy-on-write with the snapshot, so the cost is
+        independent of DRAM size; the 64KB SPM image is copied only when it
+        changed since the previous snapshot. A snapshot can be restored any
+        number of times to fork what-if continuations.
+        """
+        engine = self.risc_v_engine
+        if self.spm.memory != self._spm_snapshot:
+            self._spm_snapshot = bytes(self.spm.memory)
+        # Cache and DRAM models are captured when the hooks expose their state.
+        snapshot_timing_models = getattr(self.timing_hooks, "snapshot", None)
+        return SimulatorSnapshot(
+            pc=engine.pc,
+            registers=tuple(int(value) for value in engine.registers),
+            instruction_count=engine.instruction_count,
+            dram_pages=self.dram.snapshot(),
+            dram_images=self.dram.images,
+            spm=self._spm_snapshot,
+            npu_registers=dict(self.npu.internal_registers),
+            npu_status=self.npu.execution_status,
+            dma=self.dma.snapshot(),
+            interconnect=self.interconnect.snapshot() if self.interconnect is not None else None,
+            timing_models=snapshot_timing_models() if snapshot_timing_models is not None else None,
+            hook_counters=dict(self.timing_hooks.counters),
+            sim_time=self.sim_time,
+            halt=self.halt,
+        )
+
+    def restore(self, snapshot: SimulatorSnapshot) -> None:
+        """Return to the state captured by :meth:`snapshot`."""
+        engine = self.risc_v_engine
+        engine.pc = snapshot.pc
+        engine.registers[:] = snapshot.registers
+        engine.instruction_count = snapshot.instruction_count
+        # Images are file mappings, not copies: remap the snapshot's in order,
+        # dropping any mapped since. A fresh simulator (e.g. a parallel
+        # worker) maps the same files again.
+        if self.dram.images != snapshot.dram_images:
+            self.dram.close()
+            for image in snapshot.dram_images:
+                self.dram.map_file(image.address, image.path, image.offset, image.length)
+        self.dram.restore(snapshot.dram_pages)
+        self.spm.memory[:] = snapshot.spm
+        self.npu.internal_registers = dict(snapshot.npu_registers)
+        self.npu.execution_status = snapshot.npu_status
+        self.dma.restore(snapshot.dma)
+        if self.interconnect is not None and snapshot.interconnect is not None:
+            self.interconnect.restore(snapshot.interconnect)
+        if snapshot.timing_models is not None:
+            self.timing_hooks.restore(snapshot.timing_models)
+        self.timing_hooks.counters.update(snapshot.hook_counters)
+        self.sim_time = snapshot.sim_time
+        self.halt = snapshot.halt
+        # Memory changed behind the bus, so cached decodes may be stale.
+        engine.invalidate_decode_cache()
+        if self.loop_fast_forwarder is not None:
+            self.loop_fast_forwarder.invalidate_cache()
 
     async def run_simulation(self, max_cycles: int = 0) -> SimulationReport:
+        return self.simulate(max_cycles)
+
+    def simulate(self, max_cycles: int = 0) -> SimulationReport:
+        """Synchronous :meth:`run_simulation`, for callers that may already be inside an event loop."""
         self.halt = False
-        self.sim_time = 0
+        self._restart_clock()
         self.risc_v_engine.instruction_count = 0
         cycles = 0
         reason = "completed"
         start_time = time.perf_counter()
 
+        engine = self.risc_v_engine
+        fetch_hook = self.timing_hooks.fetch_hook if self._dram_model is None else self._dram_fetch_hook
+        fast_forwarder = self.loop_fast_forwarder
+        interconnect = self.interconnect
+        cycles_per_instruction = 1.0
         while not self.halt:
-            if max_cycles > 0 and cycles >= max_cycles:
-                reason = "max_cycles_reached"
-                break
-            status = self.risc_v_engine.execute_instruction()
-            if status == "halt":
+            budget = RUN_SLICE_INSTRUCTIONS
+            if max_cycles > 0:
+                if cycles >= max_cycles:
+                    reason = "max_cycles_reached"
+                    break
+                budget = min(budget, max_cycles - cycles)
+            if fast_forwarder is not None:
+                # Skipped iterations count against max_cycles too.
+                if max_cycles > 0:
+                    fast_forwarder.instruction_allowance = max_cycles - cycles - budget
+                skipped = fast_forwarder.skipped_instructions
+                skipped_latency = fast_forwarder.skipped_latency
+            if self.dma.busy:
+                # End the slice around the transfer's completion so it is
+                # retired (and its interrupt raised) promptly; the remaining
+                # cycles are converted to instructions at the last slice's rate.
+                remaining = self.dma.busy_until - self.sim_time
+                budget = min(budget, max(1, int(remaining / cycles_per_instruction)))
+            if interconnect is not None:
+                issued = []
+                self._record_issue = issued.append
+                try:
+                    result = engine.run(budget, self._clocked_fetch_hook(fetch_hook, issued.append))
+                finally:
+                    self._record_issue = None
+                interconnect.submit_batch("cpu", issued, FETCH_BYTES)
+                self.sim_time += interconnect.drain().master_delay(self._cpu_master)
+            elif self.device_timing:
+                result = engine.run(budget, self._clocked_fetch_hook(fetch_hook))
+            else:
+                result = engine.run(budget, fetch_hook)
+            self._slice_latency = 0
+            if result.executed:
+                # Floor at one cycle per slice so untimed runs don't divide by zero.
+                cycles_per_instruction = max(result.latency, 1) / result.executed
+            cycles += result.executed
+            self.sim_time += result.latency
+            if fast_forwarder is not None:
+                cycles += fast_forwarder.skipped_instructions - skipped
+                self.sim_time += fast_forwarder.skipped_latency - skipped_latency
+            self.dma.advance(self.sim_time)
+            if result.reason is StopReason.HALT:
                 self.halt = True
                 reason = "halt"
                 break
-            latency = self.timing_hooks.fetch_hook(self.risc_v_engine.pc, 0)
-            self.sim_time += latency
-            cycles += 1
 
+        flush_trace = getattr(self.trace, "flush", None)
+        if flush_trace is not None:
+            flush_trace()
         elapsed = time.perf_counter() - start_time
         return SimulationReport(
             cycles=cycles,
@@ -117,6 +399,66 @@ class AdaptiveSimulator:
             elapsed_seconds=elapsed,
         )
 
+    def _restart_clock(self) -> None:
+        """Start ``sim_time`` from 0, moving timed device state along with it."""
+        self.dma.rebase(self.sim_time)
+        if self._dram_model is not None:
+            self._dram_model.rebase(self.sim_time)
+        if self.interconnect is not None:
+            self.interconnect.rebase(self.sim_time)
+        self.sim_time = 0
+
+    def now(self) -> int:
+        """Current simulated time, including the running slice when device timing is on."""
+        return self.sim_time + self._slice_latency
+
+    def _clocked_fetch_hook(self, fetch_hook, record=None):
+        """Wrap ``fetch_hook`` to keep :meth:`now` current, passing each fetch's issue time to ``record``."""
+        self._slice_latency = 0
+
+        def hook(pc, inst_bits):
+            if record is not None:
+                record(self.sim_time + self._slice_latency)
+            latency = fetch_hook(pc, inst_bits)
+            self._slice_latency += latency
+            return latency
+
+        return hook
+
+    def _dram_fetch_hook(self, pc, inst_bits):
+        """``fetch_hook`` issuing cache misses to the DRAM model at :meth:`now`."""
+        return self.timing_hooks.fetch_hook(pc, inst_bits, self.now())
+
+    def _data_access_hook(self, address, size, is_write):
+        """Charge a load or store through ``memory_hook`` (DRAM only), keeping :meth:`now` current."""
+        if self._record_issue is not None:
+            self._record_issue(self.now())
+        if not DRAM_BASE <= address < self._dram_end:
+            latency = self._uncached_latency
+        elif self._dram_model is not None:
+            latency = self.timing_hooks.memory_hook(address, size, is_write, self.now())
+        else:
+            latency = self.timing_hooks.memory_hook(address, size, is_write)
+        if self.device_timing:
+            self._slice_latency += latency
+        return latency
+
+    async def run_sampled_simulation(
+        self, max_cycles: int = 0, **options
+    ) -> SampledSimulationReport:
+        """Estimate :meth:`run_simulation` timing from sampled intervals.
+
+        ``options`` are forwarded to :func:`src.simulator.sampling.run_sampled_simulation`.
+        """
+        return run_sampled_simulation(self, max_cycles, **options)
+
+    async def run_parallel_simulation(self, max_cycles: int = 0, **options) -> SimulationReport:
+        """Run :meth:`run_simulation` interval by interval across worker processes.
+
+        ``options`` are forwarded to :func:`src.simulator.parallel.run_parallel_simulation`.
+        """
+        return run_parallel_simulation(self, max_cycles, **options)
+
 
 async def demo(max_cycles: int = 200_000) -> SimulationReport:
     """Run a minimal ADD program. Intended for manual experimentation."""
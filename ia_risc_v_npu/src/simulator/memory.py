@@ -1,8 +1,23 @@
 import logging
+import mmap
+import struct
+from bisect import bisect_right
+from pathlib import Path
+from typing import NamedTuple
 
+import numpy as np
+
+from src.risc_v.tracing import TRACE_BUS_READ, TRACE_BUS_WRITE, access_value
 
 LOGGER = logging.getLogger(__name__)
 
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+
+# Little-endian word codecs for the typed ``read_u32``/``write_u32`` accessors.
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
 
 class SPM:
     """Scratchpad Memory (SPM)"""
@@ -15,34 +30,343 @@ class SPM:
             raise IndexError(f"SPM read out of bounds: address={address}, size={size}, SPM size={self.size}")
         return self.memory[address:address+size]
 
+    def read_view(self, address, size):
+        """Return a read-only memoryview of SPM storage; it reflects later writes."""
+        if not (0 <= address < self.size and 0 <= address + size <= self.size):
+            raise IndexError(f"SPM read out of bounds: address={address}, size={size}, SPM size={self.size}")
+        return memoryview(self.memory)[address:address+size].toreadonly()
+
     def write(self, address, data):
         if not (0 <= address < self.size and 0 <= address + len(data) <= self.size):
             raise IndexError(f"SPM write out of bounds: address={address}, data_len={len(data)}, SPM size={self.size}")
         self.memory[address:address+len(data)] = data
 
+    def _read_word(self, address, codec):
+        if not (0 <= address and address + codec.size <= self.size):
+            raise IndexError(f"SPM read out of bounds: address={address}, size={codec.size}, SPM size={self.size}")
+        return codec.unpack_from(self.memory, address)[0]
+
+    def _write_word(self, address, value, codec):
+        if not (0 <= address and address + codec.size <= self.size):
+            raise IndexError(f"SPM write out of bounds: address={address}, data_len={codec.size}, SPM size={self.size}")
+        codec.pack_into(self.memory, address, value)
+
+    def read_u32(self, address):
+        return self._read_word(address, U32)
+
+    def read_u64(self, address):
+        return self._read_word(address, U64)
+
+    def write_u32(self, address, value):
+        self._write_word(address, value, U32)
+
+    def write_u64(self, address, value):
+        self._write_word(address, value, U64)
+
+class MappedImage(NamedTuple):
+    """A file mapped into a :class:`PagedMemory` by :meth:`PagedMemory.map_file`."""
+
+    address: int
+    path: Path
+    offset: int
+    length: int
+
+
+class _PageTable(dict):
+    """Page dict that resolves missing pages from mapped images, else zeros."""
+
+    def __init__(self, memory, pages=()):
+        super().__init__(pages)
+        self.memory = memory
+
+    def __missing__(self, index):
+        return self.memory._missing_page(index)
+
+
+class PagedMemory:
+    """Byte-addressable memory stored as fixed-size pages with copy-on-write snapshots.
+
+    Pages are allocated on their first write; untouched pages read as zero,
+    so a memory of several GB costs only the pages a program actually uses.
+    :meth:`map_file` backs a range with a read-only ``mmap`` of a file, whose
+    pages are read in when first touched.
+
+    :meth:`snapshot` shares every page with the returned snapshot instead of
+    copying it; a page is duplicated the first time it is written afterwards.
+    Taking or restoring a snapshot therefore copies no page data, and the
+    cost of diverging from one is proportional to the pages actually dirtied.
+    """
+    def __init__(self, size, page_size=PAGE_SIZE):
+        if size <= 0 or size % page_size:
+            raise ValueError(f"Memory size must be a positive multiple of the page size ({page_size}): {size}")
+        self.size = size
+        self.page_size = page_size
+        self._pages = _PageTable(self)
+        self._owned = set()
+        # Stands in for every unallocated page; only ever read.
+        self._zero_page = bytearray(page_size)
+        self._images = {}  # MappedImage -> mmap
+
+    @property
+    def images(self):
+        """The mapped images, in mapping order; where they overlap the latest wins."""
+        return tuple(self._images)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def allocated_pages(self):
+        """Number of pages held in memory: written ones and those read in from images."""
+        return len(self._pages)
+
+    @property
+    def copied_pages(self):
+        """Number of pages this memory owns exclusively since the last snapshot or restore."""
+        return len(self._owned)
+
+    def read(self, address, size):
+        if not (0 <= address < self.size and 0 <= address + size <= self.size):
+            raise IndexError(f"Memory read out of bounds: address={address}, size={size}, memory size={self.size}")
+        index, offset = divmod(address, self.page_size)
+        pages = self._pages
+        if offset + size <= self.page_size:
+            return pages[index][offset:offset + size]
+        data = bytearray()
+        while size > 0:
+            chunk = min(size, self.page_size - offset)
+            data += pages[index][offset:offset + chunk]
+            size -= chunk
+            index += 1
+            offset = 0
+        return data
+
+    def read_view(self, address, size):
+        """Return a read-only memoryview of ``size`` bytes at ``address``.
+
+        Reads within one page share its storage; reads spanning pages are
+        copied. A view is only valid until the next write to this memory,
+        which may replace a shared page with a private copy.
+        """
+        if not (0 <= address < self.size and 0 <= address + size <= self.size):
+            raise IndexError(f"Memory read out of bounds: address={address}, size={size}, memory size={self.size}")
+        index, offset = divmod(address, self.page_size)
+        if offset + size <= self.page_size:
+            return memoryview(self._pages[index])[offset:offset + size].toreadonly()
+        return memoryview(self.read(address, size)).toreadonly()
+
+    def write(self, address, data):
+        if not (0 <= address < self.size and 0 <= address + len(data) <= self.size):
+            raise IndexError(f"Memory write out of bounds: address={address}, data_len={len(data)}, memory size={self.size}")
+        index, offset = divmod(address, self.page_size)
+        if offset + len(data) <= self.page_size:
+            self._writable_page(index)[offset:offset + len(data)] = data
+            return
+        view = memoryview(data)
+        while view:
+            chunk = min(len(view), self.page_size - offset)
+            self._writable_page(index)[offset:offset + chunk] = view[:chunk]
+            view = view[chunk:]
+            index += 1
+            offset = 0
+
+    def _read_word(self, address, codec):
+        index, offset = divmod(address, self.page_size)
+        if 0 <= address and offset + codec.size <= self.page_size and address < self.size:
+            return codec.unpack_from(self._pages[index], offset)[0]
+        return codec.unpack(self.read(address, codec.size))[0]
+
+    def _write_word(self, address, value, codec):
+        index, offset = divmod(address, self.page_size)
+        if 0 <= address and offset + codec.size <= self.page_size and address < self.size:
+            codec.pack_into(self._writable_page(index), offset, value)
+        else:
+            self.write(address, codec.pack(value))
+
+    def read_u32(self, address):
+        return self._read_word(address, U32)
+
+    def read_u64(self, address):
+        return self._read_word(address, U64)
+
+    def write_u32(self, address, value):
+        self._write_word(address, value, U32)
+
+    def write_u64(self, address, value):
+        self._write_word(address, value, U64)
+
+    def _writable_page(self, index):
+        if index not in self._owned:
+            self._pages[index] = bytearray(self._pages[index])
+            self._owned.add(index)
+        return self._pages[index]
+
+    def _missing_page(self, index):
+        start = index * self.page_size
+        for image, mapping in reversed(self._images.items()):
+            if image.address <= start < image.address + image.length:
+                begin = image.offset + start - image.address
+                end = image.offset + min(image.length, start - image.address + self.page_size)
+                page = mapping[begin:end]
+                if len(page) < self.page_size:
+                    page += bytes(self.page_size - len(page))
+                # Shared like a snapshot page: the first write copies it.
+                self._pages[index] = page
+                return page
+        return self._zero_page
+
+    def map_file(self, address, path, offset=0, length=None):
+        """Back ``length`` bytes at ``address`` with the file at ``path`` from ``offset``.
+
+        The file is mapped read-only and never modified; pages are read in
+        on first access and copied on first write like any shared page.
+        ``address`` must be page aligned. Data previously stored in the
+        covered pages is discarded, including older images, which are
+        unmapped once fully covered; the tail of a partial last page reads as
+        zero. Returns the :class:`MappedImage`.
+        """
+        path = Path(path)
+        if address % self.page_size:
+            raise ValueError(f"Image address must be aligned to the page size ({self.page_size}): {address:#x}")
+        with path.open("rb") as handle:
+            file_size = handle.seek(0, 2)
+            if length is None:
+                length = file_size - offset
+            if not (0 <= offset and 0 < length and offset + length <= file_size):
+                raise ValueError(f"Image range offset={offset}, length={length} outside {path} ({file_size} bytes)")
+            if address + length > self.size:
+                raise IndexError(f"Memory write out of bounds: address={address}, data_len={length}, memory size={self.size}")
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        image = MappedImage(address, path, offset, length)
+        covered = [
+            older for older in self._images
+            if address <= older.address and older.address + older.length <= address + length
+        ]
+        for older in covered:
+            self._images.pop(older).close()
+        self._images[image] = mapping
+        first = address // self.page_size
+        last = first + -(-length // self.page_size)
+        for index in [index for index in self._pages if first <= index < last]:
+            del self._pages[index]
+            self._owned.discard(index)
+        return image
+
+    def close(self):
+        """Unmap every mapped image; their unread pages then read as zero."""
+        for mapping in self._images.values():
+            mapping.close()
+        self._images = {}
+
+    def snapshot(self):
+        """Return a ``{page index: page}`` dict sharing all allocated pages with this memory.
+
+        Treat the snapshot as read-only; it costs one entry per allocated page.
+        """
+        self._owned = set()
+        return dict(self._pages)
+
+    def restore(self, snapshot):
+        """Return to the contents captured by :meth:`snapshot`; the snapshot stays reusable."""
+        page_count = self.size // self.page_size
+        if snapshot and max(snapshot) >= page_count:
+            raise ValueError(f"Snapshot has page {max(snapshot)}, memory has {page_count} pages")
+        self._pages = _PageTable(self, snapshot)
+        self._owned = set()
+
+
 class Bus:
-    """A simple memory bus that routes requests to the appropriate device."""
-    def __init__(self):
+    """A simple memory bus that routes requests to the appropriate device.
+
+    Devices occupy disjoint address regions. Routing bisects the sorted
+    region starts and remembers the last region hit, so consecutive accesses
+    to one device (the common case) cost a single range check.
+
+    With a ``trace`` sink (see :mod:`src.risc_v.tracing`) every read and
+    write is recorded; untraced buses run without any tracing code.
+
+    A device may carry a ``timing`` model (such as
+    :class:`src.simulator.dram.DRAMController`) that :meth:`access_latency`
+    charges with device-local addresses; routing itself stays untimed.
+    """
+    def __init__(self, trace=None):
         self.devices = {}
+        self._region_starts = []
+        self._regions = []
+        self._last_region = (1, 0, None)  # (start, end, device); matches nothing
+        self._timed_regions = []
+        self._write_observers = []
+        self.trace = trace
+        if trace is not None:
+            self.read = self._traced_read
+            self.read_view = self._traced_read_view
+            self.write = self._traced_write
+            self.read_u32 = self._traced_read_u32
+            self.read_u64 = self._traced_read_u64
+            self.write_u32 = self._traced_write_u32
+            self.write_u64 = self._traced_write_u64
 
-    def add_device(self, name, device, start_addr, end_addr):
+    def add_device(self, name, device, start_addr, end_addr, timing=None):
+        if end_addr < start_addr:
+            raise ValueError(f"Device {name} ends before it starts: {start_addr:#x}-{end_addr:#x}")
+        for other, info in self.devices.items():
+            if other != name and start_addr <= info["end_addr"] and info["start_addr"] <= end_addr:
+                raise ValueError(f"Device {name} overlaps device {other}")
         self.devices[name] = {
             "device": device,
             "start_addr": start_addr,
-            "end_addr": end_addr
+            "end_addr": end_addr,
+            "timing": timing,
         }
+        self._build_address_map()
+
+    def _build_address_map(self):
+        self._regions = sorted(
+            (info["start_addr"], info["end_addr"], info["device"]) for info in self.devices.values()
+        )
+        self._region_starts = [region[0] for region in self._regions]
+        self._last_region = (1, 0, None)
+        self._timed_regions = [
+            (info["start_addr"], info["end_addr"], info["timing"])
+            for info in self.devices.values() if info["timing"] is not None
+        ]
+
+    def access_latency(self, address, cycle=None):
+        """Latency the timing model of the device at ``address`` charges; 0 for untimed devices."""
+        for start, end, timing in self._timed_regions:
+            if start <= address <= end:
+                return timing.access(address - start, cycle)
+        return 0
+
+    def access_latency_batch(self, addresses, cycles=None):
+        """Vectorised :meth:`access_latency` over ``addresses``, in order within each device."""
+        addresses = np.asarray(addresses, dtype=np.int64)
+        latencies = np.zeros(len(addresses), dtype=np.int64)
+        for start, end, timing in self._timed_regions:
+            inside = np.flatnonzero((addresses >= start) & (addresses <= end))
+            if len(inside):
+                latencies[inside] = timing.access_batch(
+                    addresses[inside] - start, None if cycles is None else np.asarray(cycles)[inside]
+                )
+        return latencies
+
+    def add_write_observer(self, callback):
+        """Register ``callback(address, size)`` to be notified after every write."""
+        self._write_observers.append(callback)
 
     def _find_device(self, address, size):
-        LOGGER.debug("bus lookup: address=%s size=%s", address, size)
-        for name, info in self.devices.items():
-            start = info["start_addr"]
-            end = info["end_addr"]
-            LOGGER.debug("  checking %s: start=%s end=%s", name, start, end)
-            if start <= address and address + size - 1 <= end:
-                LOGGER.debug("  device %s selected", name)
-                return info["device"], address - start
-        LOGGER.debug("  no device for address=%s size=%s", address, size)
-        return None, None
+        start, end, device = self._last_region
+        if start <= address and address + size - 1 <= end:
+            return device, address - start
+        index = bisect_right(self._region_starts, address) - 1
+        if index < 0:
+            return None, None
+        region = self._regions[index]
+        start, end, device = region
+        if address + size - 1 > end:
+            return None, None
+        self._last_region = region
+        return device, address - start
 
     def read(self, address, size):
         device, local_addr = self._find_device(address, size)
@@ -54,6 +378,60 @@ class Bus:
         else:
             raise MemoryError(f"No device found or access out of bounds for address {address} with size {size}")
 
+    def read_view(self, address, size):
+        """Like :meth:`read`, but return a read-only memoryview without copying where possible.
+
+        Bulk consumers that only read (tensor loads, DMA sources) should use
+        this; use :meth:`read` when the result is modified.
+        """
+        device, local_addr = self._find_device(address, size)
+        if not device:
+            raise MemoryError(f"No device found or access out of bounds for address {address} with size {size}")
+        if hasattr(device, 'read_view'):
+            return device.read_view(local_addr, size)
+        if hasattr(device, 'read'):
+            return memoryview(device.read(local_addr, size)).toreadonly()
+        return memoryview(device)[local_addr:local_addr+size].toreadonly()
+
+    def _read_word(self, address, codec, accessor):
+        device, local_addr = self._find_device(address, codec.size)
+        if not device:
+            raise MemoryError(f"No device found or access out of bounds for address {address} with size {codec.size}")
+        read_word = getattr(device, accessor, None)
+        if read_word is not None:
+            return read_word(local_addr)
+        if hasattr(device, 'read'):
+            return codec.unpack(device.read(local_addr, codec.size))[0]
+        return codec.unpack_from(device, local_addr)[0]
+
+    def _write_word(self, address, value, codec, accessor):
+        device, local_addr = self._find_device(address, codec.size)
+        if not device:
+            raise MemoryError(f"No device found or access out of bounds for address {address} with size {codec.size}")
+        write_word = getattr(device, accessor, None)
+        if write_word is not None:
+            write_word(local_addr, value)
+        elif hasattr(device, 'write'):
+            device.write(local_addr, codec.pack(value))
+        else:
+            codec.pack_into(device, local_addr, value)
+        for observer in self._write_observers:
+            observer(address, codec.size)
+
+    def read_u32(self, address):
+        """Read a little-endian 32-bit word without building an intermediate bytes object."""
+        return self._read_word(address, U32, 'read_u32')
+
+    def read_u64(self, address):
+        return self._read_word(address, U64, 'read_u64')
+
+    def write_u32(self, address, value):
+        """Write ``value`` as a little-endian 32-bit word; observers see a 4-byte write."""
+        self._write_word(address, value, U32, 'write_u32')
+
+    def write_u64(self, address, value):
+        self._write_word(address, value, U64, 'write_u64')
+
     def write(self, address, data):
         device, local_addr = self._find_device(address, len(data))
         if not device:
@@ -63,3 +441,38 @@ class Bus:
             device.write(local_addr, data)
         else:
             device[local_addr:local_addr+len(data)] = data
+
+        for observer in self._write_observers:
+            observer(address, len(data))
+
+    def _traced_read(self, address, size):
+        data = Bus.read(self, address, size)
+        self.trace.record(TRACE_BUS_READ, address, access_value(data), size)
+        return data
+
+    def _traced_read_view(self, address, size):
+        data = Bus.read_view(self, address, size)
+        self.trace.record(TRACE_BUS_READ, address, access_value(data), size)
+        return data
+
+    def _traced_write(self, address, data):
+        self.trace.record(TRACE_BUS_WRITE, address, access_value(data), len(data))
+        Bus.write(self, address, data)
+
+    def _traced_read_u32(self, address):
+        value = Bus._read_word(self, address, U32, 'read_u32')
+        self.trace.record(TRACE_BUS_READ, address, value, 4)
+        return value
+
+    def _traced_read_u64(self, address):
+        value = Bus._read_word(self, address, U64, 'read_u64')
+        self.trace.record(TRACE_BUS_READ, address, value, 8)
+        return value
+
+    def _traced_write_u32(self, address, value):
+        self.trace.record(TRACE_BUS_WRITE, address, int(value), 4)
+        Bus._write_word(self, address, value, U32, 'write_u32')
+
+    def _traced_write_u64(self, address, value):
+        self.trace.record(TRACE_BUS_WRITE, address, int(value), 8)
+        Bus._write_word(self, address, value, U64, 'write_u64')
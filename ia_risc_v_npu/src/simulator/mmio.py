@@ -1,14 +1,150 @@
-class MMIO:
-    def __init__(self, npu):
+"""Memory-mapped register interface of the NPU.
+
+The CPU drives the NPU through a command queue: it writes descriptors into a
+ring in memory (usually SPM), advances ``QUEUE_TAIL`` and writes the
+doorbell. The NPU then drains every descriptor between ``QUEUE_HEAD`` and
+``QUEUE_TAIL`` in one batch: the ring is read with a single bulk view,
+operands are read as zero-copy ``float32`` views of bus memory, and each
+result is computed into a reused scratch buffer and written back with one
+bulk bus write. ``QUEUE_HEAD``, ``STATUS`` and ``COMPLETED`` are updated
+when the batch finishes.
+
+Register map (byte offsets, 32-bit registers)::
+
+    0x00 QUEUE_BASE   0x04 QUEUE_SIZE (entries)   0x08 QUEUE_HEAD
+    0x0C QUEUE_TAIL   0x10 DOORBELL               0x14 STATUS
+    0x18 COMPLETED
+
+``STATUS`` bits ``DONE`` and ``ERROR`` are cleared by writing 1s. A failing
+descriptor stops the batch with ``ERROR`` set and ``QUEUE_HEAD`` left on
+it. Other offsets are plain scratch registers.
+
+Descriptors are eight little-endian words: opcode (an index into
+``NPU_OPCODES``), the bus addresses of operand A, operand B and the
+destination, then rows and columns of the ``float32`` tensors and two
+reserved words.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from src.simulator.memory import U32
+
+NPU_QUEUE_BASE = 0x00
+NPU_QUEUE_SIZE = 0x04
+NPU_QUEUE_HEAD = 0x08
+NPU_QUEUE_TAIL = 0x0C
+NPU_DOORBELL = 0x10
+NPU_STATUS = 0x14
+NPU_COMPLETED = 0x18
+
+NPU_STATUS_DONE = 1 << 1
+NPU_STATUS_ERROR = 1 << 2
+
+NPU_OPCODES = ("v_add", "v_sub", "v_mul", "v_div")
+
+NPU_DESCRIPTOR_DTYPE = np.dtype([
+    ("opcode", "<u4"),
+    ("src_a", "<u4"),
+    ("src_b", "<u4"),
+    ("dst", "<u4"),
+    ("rows", "<u4"),
+    ("cols", "<u4"),
+    ("reserved", "<u4", (2,)),
+])
+NPU_DESCRIPTOR_SIZE = NPU_DESCRIPTOR_DTYPE.itemsize
+
+
+class RegisterBlock:
+    """Bus ``read``/``write`` for devices made of 32-bit registers.
+
+    Subclasses implement ``read_u32(offset)`` and ``write_u32(offset, value)``;
+    byte accesses must be word-aligned and are split into register accesses.
+    """
+
+    def read(self, address, size):
+        _check_word_access(address, size)
+        return b"".join(U32.pack(self.read_u32(offset)) for offset in range(address, address + size, 4))
+
+    def write(self, address, data):
+        _check_word_access(address, len(data))
+        for index, (value,) in enumerate(U32.iter_unpack(data)):
+            self.write_u32(address + 4 * index, value)
+
+
+def _check_word_access(address, size):
+    if address % 4 or size % 4 or not size:
+        raise MemoryError(f"Device registers need aligned 32-bit accesses: address={address:#x}, size={size}")
+
+
+class MMIO(RegisterBlock):
+    """NPU command-queue registers; register values live in ``npu.internal_registers``."""
+
+    def __init__(self, npu, bus=None):
         self.npu = npu
+        self.bus = bus
+        self._scratch = bytearray()
+
+    def read_u32(self, address):
+        return self.npu.internal_registers.get(address, 0)
+
+    def write_u32(self, address, value):
+        registers = self.npu.internal_registers
+        if address == NPU_DOORBELL:
+            if value:
+                self.drain()
+        elif address == NPU_STATUS:
+            registers[address] = registers.get(address, 0) & ~value
+        elif address != NPU_COMPLETED:
+            registers[address] = value
 
-    def read(self, address):
-        # This is a simplified MMIO read for now.
-        # In a real implementation, this would be more complex.
-        if address in self.npu.internal_registers:
-            return self.npu.internal_registers[address]
-        return 0
+    def drain(self):
+        """Execute every queued descriptor; returns how many completed."""
+        registers = self.npu.internal_registers
+        size = registers.get(NPU_QUEUE_SIZE, 0)
+        head = registers.get(NPU_QUEUE_HEAD, 0)
+        tail = registers.get(NPU_QUEUE_TAIL, 0)
+        status = registers.get(NPU_STATUS, 0)
+        if not size or head >= size or tail >= size or self.bus is None:
+            registers[NPU_STATUS] = status | NPU_STATUS_ERROR
+            self.npu.execution_status = "error"
+            return 0
+        pending = (tail - head) % size
+        done = 0
+        try:
+            ring = np.frombuffer(
+                self.bus.read_view(registers.get(NPU_QUEUE_BASE, 0), size * NPU_DESCRIPTOR_SIZE),
+                dtype=NPU_DESCRIPTOR_DTYPE,
+            )
+            batch = ring[(head + np.arange(pending)) % size]
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                for opcode, src_a, src_b, dst, rows, cols, _ in batch.tolist():
+                    self._execute(opcode, src_a, src_b, dst, rows, cols)
+                    done += 1
+        except (MemoryError, IndexError, ValueError):
+            status |= NPU_STATUS_ERROR
+            self.npu.execution_status = "error"
+        else:
+            status |= NPU_STATUS_DONE
+            self.npu.execution_status = "done"
+        registers[NPU_QUEUE_HEAD] = (head + done) % size
+        registers[NPU_COMPLETED] = (registers.get(NPU_COMPLETED, 0) + done) & 0xFFFFFFFF
+        registers[NPU_STATUS] = status
+        return done
 
-    def write(self, address, value):
-        # This is a simplified MMIO write for now.
-        self.npu.internal_registers[address] = value
+    def _execute(self, opcode, src_a, src_b, dst, rows, cols):
+        if opcode >= len(NPU_OPCODES):
+            raise ValueError(f"Unknown NPU opcode: {opcode}")
+        count = rows * cols
+        if not count:
+            return
+        nbytes = count * 4
+        bus = self.bus
+        a = np.frombuffer(bus.read_view(src_a, nbytes), dtype="<f4").reshape(rows, cols)
+        b = np.frombuffer(bus.read_view(src_b, nbytes), dtype="<f4").reshape(rows, cols)
+        if len(self._scratch) < nbytes:
+            self._scratch = bytearray(nbytes)
+        out = np.frombuffer(self._scratch, dtype="<f4", count=count).reshape(rows, cols)
+        self.npu.execute_into(NPU_OPCODES[opcode], a, b, out)
+        bus.write(dst, memoryview(self._scratch)[:nbytes])
@@ -0,0 +1,126 @@
+"""Parallel detailed simulation of program intervals.
+
+A functional pass (see :mod:`src.simulator.sampling`) splits a run into
+intervals and records a snapshot at every interval start. Each interval is
+then simulated in detail by a ``ProcessPoolExecutor`` worker that rebuilds an
+``AdaptiveSimulator`` from the pickled snapshot, and the per-interval
+``SimulationReport``s are merged into one.
+
+Workers rebuild the caller's machine from its pickled
+:class:`src.simulator.main.SimulatorConfig` (timing hooks, interconnect,
+loop fast-forwarding, ...), so hook models must be picklable
+(``TimingHookSystem`` is).
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from src.simulator.sampling import DEFAULT_INTERVAL_INSTRUCTIONS, collect_intervals, run_interval
+
+
+def simulate_from_snapshot(snapshot, instructions: int, config=None):
+    """Run ``instructions`` instructions from ``snapshot`` on a fresh simulator.
+
+    The simulator is built from ``config`` (a ``SimulatorConfig``; defaults
+    when ``None``) and replayed with
+    :func:`src.simulator.sampling.run_interval`, like serial sampled
+    intervals. Returns the interval's ``SimulationReport``. This is the
+    worker entry point and must stay a module-level function so it can be
+    pickled.
+    """
+    # Imported here because main imports this module.
+    from src.simulator.main import SimulatorConfig
+
+    # run_simulation resets the counters, so the report covers just this interval.
+    return run_interval((config or SimulatorConfig()).build(), snapshot, instructions)
+
+
+def run_intervals(
+    intervals: Iterable[Tuple[object, int]],
+    *,
+    config=None,
+    max_workers: Optional[int] = None,
+) -> List:
+    """Simulate ``(snapshot, instructions)`` pairs in a process pool, in order."""
+    intervals = list(intervals)
+    if not intervals:
+        return []
+    snapshots, lengths = zip(*intervals)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            simulate_from_snapshot, snapshots, lengths, [config] * len(intervals)
+        ))
+
+
+def merge_reports(reports: Sequence, elapsed_seconds: Optional[float] = None):
+    """Combine consecutive interval reports into one ``SimulationReport``.
+
+    Counts and ``sim_time`` are summed; halt state and reason come from the
+    last interval. ``elapsed_seconds`` defaults to the summed worker time.
+    """
+    from src.simulator.main import SimulationReport
+
+    if not reports:
+        raise ValueError("merge_reports requires at least one report")
+    last = reports[-1]
+    return SimulationReport(
+        cycles=sum(report.cycles for report in reports),
+        instructions=sum(report.instructions for report in reports),
+        halted=last.halted,
+        reason=last.reason,
+        sim_time=sum(report.sim_time for report in reports),
+        elapsed_seconds=(
+            sum(report.elapsed_seconds for report in reports)
+            if elapsed_seconds is None else elapsed_seconds
+        ),
+    )
+
+
+def run_parallel_simulation(
+    simulator,
+    max_cycles: int = 0,
+    *,
+    interval_size: int = DEFAULT_INTERVAL_INSTRUCTIONS,
+    max_workers: Optional[int] = None,
+):
+    """Simulate every interval of the program in parallel and merge the reports.
+
+    ``simulator`` runs the functional pass and is left in its final state
+    with ``sim_time`` set to the merged total.
+    """
+    start_time = time.perf_counter()
+    simulator.halt = False
+    simulator.sim_time = 0
+    simulator.risc_v_engine.instruction_count = 0
+    intervals, reason = collect_intervals(simulator, interval_size, max_cycles)
+    reports = run_intervals(
+        [(interval.snapshot, interval.instructions) for interval in intervals],
+        config=simulator.config(),
+        max_workers=max_workers,
+    )
+    elapsed = time.perf_counter() - start_time
+    if not reports:
+        from src.simulator.main import SimulationReport
+
+        return SimulationReport(
+            cycles=0,
+            instructions=simulator.risc_v_engine.instruction_count,
+            halted=simulator.halt,
+            reason=reason,
+            sim_time=0,
+            elapsed_seconds=elapsed,
+        )
+    merged = merge_reports(reports, elapsed)
+    # Instruction counts and the stop reason are exact from the functional
+    # pass, which also sees a halt that lands right after an interval.
+    merged.instructions = simulator.risc_v_engine.instruction_count
+    merged.halted = simulator.halt
+    merged.reason = reason
+    simulator.sim_time = merged.sim_time
+    return merged
+
+
+__all__ = ["simulate_from_snapshot", "run_intervals", "merge_reports", "run_parallel_simulation"]
@@ -0,0 +1,410 @@
+"""Trace-driven timing replay.
+
+Re-times an execution trace recorded with
+:class:`src.risc_v.trace_file.ExecutionTraceWriter` without re-executing the
+program. Every timing model is applied to the whole trace in NumPy passes:
+
+* the ``TimingHookSystem`` fetch and data access models (random misses,
+  caches, DRAM), which yield exactly the ``sim_time`` ``run_simulation``
+  reports for the same run (the DRAM model is replayed on its own clock
+  rather than at each access's live issue cycle, so runs long enough to
+  refresh can differ),
+* ``LATENCY_TABLE`` execute latencies per mnemonic,
+* an optional in-order :class:`PipelineModel` (load-use and taken-branch
+  stalls).
+
+:func:`retime_trace` prices one trace under many :class:`LatencyConfig`s at
+once: the trace is reduced to a per-interval event histogram (hits, misses,
+memory accesses and executions per mnemonic) which is multiplied by a latency
+matrix with one column per configuration. A configuration's total adds fetch,
+execute and memory latency; ``run_simulation`` charges no execute latency, so
+configurations with ``charge_execute=False`` price the trace the way the live
+run does.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.risc_v.engine import (
+    HALT_JAL_INSTRUCTION,
+    OPCODE_B_TYPE,
+    OPCODE_I_TYPE_JALR,
+    OPCODE_I_TYPE_LOAD,
+    OPCODE_J_TYPE_JAL,
+    OPCODE_R4_TYPE_FMADD,
+    OPCODE_R_TYPE,
+    OPCODE_S_TYPE_STORE,
+    lookup_instruction,
+)
+from src.simulator.fast_forward import DEFAULT_INSTRUCTION_LATENCY
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.latency import LATENCY_TABLE
+from src.simulator.main import DRAM_BASE, MAX_DRAM_SIZE
+
+HALT_MNEMONIC = "HALT"
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineModel:
+    """Stall cycles of a simple in-order pipeline."""
+
+    load_use_penalty: int = 1
+    taken_branch_penalty: int = 2
+
+
+@dataclass(frozen=True, slots=True)
+class LatencyConfig:
+    """One point of a latency sweep; ``latency_table`` defaults to ``LATENCY_TABLE``.
+
+    Without ``charge_execute`` the ``latency_table`` is ignored and only
+    fetches and memory accesses are charged, as in ``run_simulation``: the
+    default hook system's ``sim_time`` is then exactly the total of
+    ``LatencyConfig(charge_execute=False)``.
+    """
+
+    latency_table: Optional[Dict[str, int]] = None
+    icache_hit_latency: int = TimingHookSystem.ICACHE_HIT_LATENCY
+    icache_miss_latency: int = TimingHookSystem.ICACHE_MISS_LATENCY
+    memory_access_latency: int = TimingHookSystem.MEMORY_ACCESS_LATENCY
+    charge_execute: bool = True
+
+
+@dataclass(slots=True)
+class TraceHistogram:
+    """Event counts of a trace, one row per interval.
+
+    ``mnemonics[i]`` is the mnemonic counted in column ``i`` of ``executed``.
+    """
+
+    mnemonics: List[str]
+    executed: np.ndarray
+    icache_misses: np.ndarray
+    memory_accesses: np.ndarray
+
+    @property
+    def instructions(self) -> np.ndarray:
+        return self.executed.sum(axis=1)
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    instructions: int
+    sim_time: int
+    icache_misses: int
+    execute_cycles: int
+    memory_accesses: int
+    memory_cycles: int
+    pipeline_stalls: int
+
+
+def instruction_mnemonics(instructions) -> Tuple[List[str], np.ndarray]:
+    """Decode a word array into ``(names, index)`` with ``names[index[i]]`` per word.
+
+    Only distinct words are decoded. Halt sentinels map to ``HALT_MNEMONIC``.
+    """
+    words, inverse = np.unique(np.asarray(instructions, dtype=np.uint32), return_inverse=True)
+    names: List[str] = []
+    codes = np.empty(len(words), dtype=np.int64)
+    for position, word in enumerate(words.tolist()):
+        if word == 0 or word == HALT_JAL_INSTRUCTION:
+            name = HALT_MNEMONIC
+        else:
+            name = lookup_instruction(word).mnemonic
+        if name not in names:
+            names.append(name)
+        codes[position] = names.index(name)
+    return names, codes[inverse]
+
+
+def _fetch_hit_latency(timing_hooks: TimingHookSystem) -> int:
+    caches = timing_hooks.caches
+    return timing_hooks.ICACHE_HIT_LATENCY if caches is None else caches.l1i.hit_latency
+
+
+def icache_misses(count: int, timing_hooks: TimingHookSystem, fetch_counter: int = 0, pcs=None) -> np.ndarray:
+    """Miss flags of the next ``count`` ``timing_hooks.fetch_hook`` calls.
+
+    ``fetch_counter`` is the hook's fetch counter before the first call.
+    Hooks with a cache model need the fetched ``pcs``; see :func:`fetch_latencies`.
+    """
+    if timing_hooks.caches is not None:
+        return fetch_latencies(count, timing_hooks, fetch_counter, pcs) > _fetch_hit_latency(timing_hooks)
+    calls = np.arange(fetch_counter, fetch_counter + count)
+    recorded = calls < timing_hooks.buffer_size
+    misses = np.zeros(count, dtype=bool)
+    misses[recorded] = timing_hooks.random_choices[calls[recorded]]
+    return misses
+
+
+def fetch_latencies(count: int, timing_hooks: TimingHookSystem, fetch_counter: int = 0, pcs=None) -> np.ndarray:
+    """Latencies ``timing_hooks.fetch_hook`` returns for its next ``count`` calls.
+
+    With a cache model the latencies depend on the fetched ``pcs``; they are
+    run through a copy of ``timing_hooks.caches``, which is left untouched.
+    """
+    caches = timing_hooks.caches
+    if caches is not None:
+        if pcs is None:
+            raise ValueError("Replaying a cache model requires the fetched PCs")
+        return copy.deepcopy(caches).fetch_batch(np.asarray(pcs)[:count])
+    return np.where(
+        icache_misses(count, timing_hooks, fetch_counter),
+        timing_hooks.ICACHE_MISS_LATENCY,
+        timing_hooks.ICACHE_HIT_LATENCY,
+    ).astype(np.int64)
+
+
+def access_latencies(
+    timing_hooks: TimingHookSystem, pcs, addresses, accessed, fetch_counter: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Latencies of the hook calls of a live run: ``(fetch, memory)`` per instruction.
+
+    Instruction ``i`` makes a data access to ``addresses[i]`` if
+    ``accessed[i]``, then the fetch from ``pcs[i]``, in the order
+    ``fetch_hook`` and ``memory_hook`` see them. Cache and DRAM models are run
+    on copies, which are left untouched. Accesses outside DRAM (the SPM and
+    device registers) bypass them at ``UNCACHED_ACCESS_LATENCY``.
+    """
+    pcs = np.asarray(pcs, dtype=np.int64)
+    addresses = np.asarray(addresses, dtype=np.int64)
+    accessed = np.asarray(accessed, dtype=bool)
+    count = len(pcs)
+    memory = np.zeros(count, dtype=np.int64)
+    uncached = accessed & ((addresses < DRAM_BASE) | (addresses >= DRAM_BASE + MAX_DRAM_SIZE))
+    memory[uncached] = timing_hooks.UNCACHED_ACCESS_LATENCY
+    accessed = accessed & ~uncached
+    caches = timing_hooks.caches
+    if caches is not None:
+        # Interleave both streams: the fetches share the L2 and DRAM with the data accesses.
+        fetch_slots = np.arange(count) + np.cumsum(accessed)
+        data_slots = fetch_slots[accessed] - 1
+        stream = np.empty(count + len(data_slots), dtype=np.int64)
+        is_data = np.zeros(len(stream), dtype=bool)
+        stream[fetch_slots] = pcs
+        stream[data_slots] = addresses[accessed]
+        is_data[data_slots] = True
+        latencies = copy.deepcopy(caches).access_batch(stream, is_data)
+        memory[accessed] = latencies[data_slots]
+        return latencies[fetch_slots], memory
+    if timing_hooks.dram is not None:
+        memory[accessed] = copy.deepcopy(timing_hooks.dram).access_batch(addresses[accessed])
+    else:
+        memory[accessed] = timing_hooks.MEMORY_ACCESS_LATENCY
+    return fetch_latencies(count, timing_hooks, fetch_counter), memory
+
+
+def mnemonic_latencies(names: List[str], latency_table: Dict[str, int]) -> np.ndarray:
+    """Per-mnemonic latency vector for ``names``; halts cost nothing."""
+    return np.array([
+        0 if name == HALT_MNEMONIC else latency_table.get(name, DEFAULT_INSTRUCTION_LATENCY)
+        for name in names
+    ], dtype=np.int64)
+
+
+def pipeline_stalls(records, pipeline: PipelineModel) -> int:
+    """Stall cycles of ``pipeline`` over consecutive trace records."""
+    if len(records) < 2:
+        return 0
+    words = np.asarray(records["instruction"], dtype=np.uint32)
+    pcs = np.asarray(records["pc"], dtype=np.int64)
+    opcodes = words & 0x7F
+    rd = (words >> 7) & 0x1F
+    rs1 = (words >> 15) & 0x1F
+    rs2 = (words >> 20) & 0x1F
+
+    current, following = slice(None, -1), slice(1, None)
+    reads_rs1 = opcodes[following] != OPCODE_J_TYPE_JAL
+    reads_rs2 = np.isin(
+        opcodes[following], (OPCODE_R_TYPE, OPCODE_S_TYPE_STORE, OPCODE_B_TYPE, OPCODE_R4_TYPE_FMADD)
+    )
+    load_rd = rd[current]
+    load_use = (
+        (opcodes[current] == OPCODE_I_TYPE_LOAD)
+        & (load_rd != 0)
+        & ((reads_rs1 & (rs1[following] == load_rd)) | (reads_rs2 & (rs2[following] == load_rd)))
+    )
+    redirects = (
+        np.isin(opcodes[current], (OPCODE_B_TYPE, OPCODE_J_TYPE_JAL, OPCODE_I_TYPE_JALR))
+        & (pcs[following] != pcs[current] + 4)
+    )
+    return int(
+        load_use.sum() * pipeline.load_use_penalty
+        + redirects.sum() * pipeline.taken_branch_penalty
+    )
+
+
+def fetched_pcs(records, executed) -> np.ndarray:
+    """PCs the live run fetches after each executed instruction, in order.
+
+    ``run_simulation`` charges the fetch of the *next* PC once an instruction
+    retires, so instruction ``i`` pays for the fetch from the PC of record
+    ``i + 1``. A trace cut off mid-run has no successor for its last record,
+    which is assumed to fall through.
+    """
+    pcs = np.asarray(records["pc"], dtype=np.int64)
+    following = np.empty_like(pcs)
+    following[:-1] = pcs[1:]
+    following[-1:] = pcs[-1:] + 4
+    return following[executed]
+
+
+def replay_trace(
+    records,
+    *,
+    timing_hooks: Optional[TimingHookSystem] = None,
+    latency_table: Optional[Dict[str, int]] = None,
+    pipeline: Optional[PipelineModel] = None,
+    fetch_counter: int = 0,
+) -> ReplayResult:
+    """Re-time ``records`` (an ``EXECUTION_TRACE_DTYPE`` array or memmap).
+
+    ``timing_hooks`` must be in the state the live run's hooks started in
+    (the same ``random_choices``, or caches holding the same lines) for
+    ``sim_time`` to match it; ``fetch_counter`` is that system's fetch
+    counter when the trace started.
+    """
+    timing_hooks = timing_hooks or TimingHookSystem()
+    latency_table = LATENCY_TABLE if latency_table is None else latency_table
+
+    names, codes = instruction_mnemonics(records["instruction"])
+    halt_code = names.index(HALT_MNEMONIC) if HALT_MNEMONIC in names else -1
+    # The fetch hook runs once per executed instruction, never for a halt.
+    executed = codes != halt_code
+    instructions = int(np.count_nonzero(executed))
+
+    accessed = np.asarray(records["mem_size"])[executed] != 0
+    fetch, memory = access_latencies(
+        timing_hooks,
+        fetched_pcs(records, executed),
+        np.asarray(records["mem_address"])[executed],
+        accessed,
+        fetch_counter,
+    )
+    miss_count = int(np.count_nonzero(fetch > _fetch_hit_latency(timing_hooks)))
+    execute_cycles = int(np.bincount(codes, minlength=len(names)) @ mnemonic_latencies(names, latency_table))
+    memory_cycles = int(memory.sum())
+
+    return ReplayResult(
+        instructions=instructions,
+        sim_time=int(fetch.sum()) + memory_cycles,
+        icache_misses=miss_count,
+        execute_cycles=execute_cycles,
+        memory_accesses=int(np.count_nonzero(accessed)),
+        memory_cycles=memory_cycles,
+        pipeline_stalls=pipeline_stalls(records, pipeline) if pipeline is not None else 0,
+    )
+
+
+def trace_histogram(
+    records,
+    *,
+    timing_hooks: Optional[TimingHookSystem] = None,
+    fetch_counter: int = 0,
+    interval_size: int = 0,
+) -> TraceHistogram:
+    """Count the timing events of ``records`` per ``interval_size`` executed instructions.
+
+    With ``interval_size`` 0 the whole trace is one interval. Cache misses
+    follow ``timing_hooks`` as in :func:`replay_trace`.
+    """
+    if interval_size < 0:
+        raise ValueError(f"interval_size must not be negative: {interval_size}")
+    timing_hooks = timing_hooks or TimingHookSystem()
+    names, codes = instruction_mnemonics(records["instruction"])
+    executed = codes != (names.index(HALT_MNEMONIC) if HALT_MNEMONIC in names else -1)
+    codes = codes[executed]
+    count = len(codes)
+
+    size = interval_size or max(count, 1)
+    intervals = max(-(-count // size), 1)
+    interval = np.arange(count) // size
+    accesses = np.asarray(records["mem_size"])[executed] != 0
+    if timing_hooks.caches is not None:
+        fetch, _ = access_latencies(
+            timing_hooks,
+            fetched_pcs(records, executed),
+            np.asarray(records["mem_address"])[executed],
+            accesses,
+        )
+        misses = fetch > _fetch_hit_latency(timing_hooks)
+    else:
+        misses = icache_misses(count, timing_hooks, fetch_counter)
+    return TraceHistogram(
+        mnemonics=names,
+        executed=np.bincount(
+            interval * len(names) + codes, minlength=intervals * len(names)
+        ).reshape(intervals, len(names)),
+        icache_misses=np.bincount(interval, weights=misses, minlength=intervals).astype(np.int64),
+        memory_accesses=np.bincount(interval, weights=accesses, minlength=intervals).astype(np.int64),
+    )
+
+
+def latency_matrix(mnemonics: List[str], configs: Sequence[LatencyConfig]) -> np.ndarray:
+    """Return the ``(len(mnemonics) + 2, K)`` latency matrix of ``configs``.
+
+    Rows are the per-mnemonic execute-plus-hit latencies, then the extra cost
+    of an instruction-cache miss, then the memory access latency; see
+    :func:`retime`.
+    """
+    matrix = np.empty((len(mnemonics) + 2, len(configs)), dtype=np.int64)
+    for column, config in enumerate(configs):
+        matrix[:-2, column] = config.icache_hit_latency
+        if config.charge_execute:
+            table = LATENCY_TABLE if config.latency_table is None else config.latency_table
+            matrix[:-2, column] += mnemonic_latencies(mnemonics, table)
+        matrix[-2, column] = config.icache_miss_latency - config.icache_hit_latency
+        matrix[-1, column] = config.memory_access_latency
+    return matrix
+
+
+def retime(histogram: TraceHistogram, configs: Sequence[LatencyConfig]) -> np.ndarray:
+    """Per-interval totals of ``histogram`` under every config, shape ``(intervals, K)``.
+
+    A config's total is fetch latency (hits and misses) plus execute latency
+    (unless ``charge_execute`` is off) plus memory access latency. Misses
+    follow the histogram, but every miss and memory access costs the config's
+    fixed latency, so cache and DRAM models are only approximated.
+    """
+    events = np.column_stack((histogram.executed, histogram.icache_misses, histogram.memory_accesses))
+    return events @ latency_matrix(histogram.mnemonics, configs)
+
+
+def retime_trace(
+    records,
+    configs: Sequence[LatencyConfig],
+    *,
+    timing_hooks: Optional[TimingHookSystem] = None,
+    fetch_counter: int = 0,
+) -> np.ndarray:
+    """Total latency of ``records`` under each of ``configs``, shape ``(K,)``.
+
+    See :func:`retime` for the cost model.
+    """
+    histogram = trace_histogram(records, timing_hooks=timing_hooks, fetch_counter=fetch_counter)
+    return retime(histogram, configs).sum(axis=0)
+
+
+__all__ = [
+    "HALT_MNEMONIC",
+    "PipelineModel",
+    "LatencyConfig",
+    "TraceHistogram",
+    "ReplayResult",
+    "instruction_mnemonics",
+    "icache_misses",
+    "fetch_latencies",
+    "access_latencies",
+    "fetched_pcs",
+    "mnemonic_latencies",
+    "pipeline_stalls",
+    "replay_trace",
+    "trace_histogram",
+    "latency_matrix",
+    "retime",
+    "retime_trace",
+]
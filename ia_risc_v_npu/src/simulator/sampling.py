@@ -0,0 +1,367 @@
+"""SimPoint-style sampled simulation.
+
+The program is first run on the functional path only (no timing hooks, so
+loads and stores leave the cache and DRAM models untouched), split into
+fixed-size instruction intervals. Loop fast-forwarding is
+suspended while intervals are collected and replayed, so every interval
+holds exactly the instructions it reports. For every interval a basic-block
+vector (BBV) is collected and a copy-on-write snapshot of the simulator is
+kept at the interval start. BBVs are counted per instruction address, which
+is the per-block count weighted by block size used by SimPoint, split back
+into its instructions.
+
+The normalised vectors are randomly projected to a few dimensions and
+clustered with k-means. Only a few intervals of every cluster are then
+replayed from their snapshots on the detailed timing path; each cluster's
+cycles-per-instruction is extrapolated to all of its instructions, and the
+spread between the sampled intervals of a cluster gives a stratified-sampling
+error estimate for the total ``sim_time``.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.risc_v.engine import StopReason
+
+DEFAULT_INTERVAL_INSTRUCTIONS = 100_000
+DEFAULT_MAX_CLUSTERS = 8
+DEFAULT_SAMPLES_PER_CLUSTER = 2
+# Smallest k whose k-means distortion is at most this fraction of k=1's wins.
+DEFAULT_CLUSTER_TOLERANCE = 0.1
+PROJECTION_DIMENSIONS = 15
+KMEANS_ITERATIONS = 100
+CONFIDENCE_Z = 1.96  # 95% two-sided
+
+
+@dataclass(slots=True)
+class Interval:
+    index: int
+    start_instruction: int
+    instructions: int
+    snapshot: object
+    bbv: Dict[int, int]
+
+
+@dataclass(slots=True)
+class SampledSimulationReport:
+    cycles: int
+    instructions: int
+    halted: bool
+    reason: str
+    sim_time: int
+    sim_time_error: float
+    intervals: int
+    clusters: int
+    detailed_instructions: int
+    elapsed_seconds: float
+
+    @property
+    def mips(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return (self.instructions / 1_000_000) / self.elapsed_seconds
+
+    @property
+    def relative_error(self) -> float:
+        return self.sim_time_error / self.sim_time if self.sim_time else 0.0
+
+
+@contextmanager
+def interpreting_loops(simulator):
+    """Suspend ``simulator``'s loop fast-forwarding for the ``with`` block."""
+    fast_forwarder = getattr(simulator, "loop_fast_forwarder", None)
+    if fast_forwarder is None:
+        yield
+        return
+    fast_forwarder.detach()
+    try:
+        yield
+    finally:
+        fast_forwarder.attach()
+
+
+@contextmanager
+def _untimed_data_accesses(simulator):
+    engine = simulator.risc_v_engine
+    data_hook = engine.data_hook
+    if data_hook is None:
+        yield
+        return
+    engine.set_data_hook(None)
+    try:
+        yield
+    finally:
+        engine.set_data_hook(data_hook)
+
+
+def collect_intervals(simulator, interval_size: int, max_instructions: int = 0):
+    """Run ``simulator`` functionally and return ``(intervals, reason)``."""
+    if interval_size <= 0:
+        raise ValueError(f"interval_size must be positive: {interval_size}")
+    with interpreting_loops(simulator), _untimed_data_accesses(simulator):
+        return _collect_intervals(simulator, interval_size, max_instructions)
+
+
+def _collect_intervals(simulator, interval_size, max_instructions):
+    engine = simulator.risc_v_engine
+    intervals: List[Interval] = []
+    executed = 0
+    # The timing path calls the fetch hook once per executed instruction;
+    # advance the recorded counter so replays see the hook state a full run
+    # would have at the interval start.
+    fetch_base = simulator.timing_hooks.counters.get('fetch', 0)
+    # Devices running alongside the CPU (the DMA engine) still need a clock,
+    # so with device timing it ticks once per instruction; otherwise polling
+    # a transfer's STATUS would never see it complete.
+    tick = 1 if simulator.device_timing else 0
+    reason = "completed"
+    while True:
+        budget = interval_size
+        if max_instructions > 0:
+            if executed >= max_instructions:
+                reason = "max_cycles_reached"
+                break
+            budget = min(budget, max_instructions - executed)
+
+        snapshot = simulator.snapshot()
+        snapshot = replace(
+            snapshot, hook_counters={**snapshot.hook_counters, 'fetch': fetch_base + executed}
+        )
+        counts: Dict[int, int] = {}
+
+        def count_fetch(pc, _inst_bits, counts=counts):
+            counts[pc] = counts.get(pc, 0) + 1
+            return tick
+
+        if simulator.device_timing:
+            result = engine.run(budget, simulator._clocked_fetch_hook(count_fetch))
+            simulator.sim_time += result.latency
+            simulator.dma.advance(simulator.sim_time)
+        else:
+            result = engine.run(budget, count_fetch)
+        if result.executed:
+            intervals.append(Interval(len(intervals), executed, result.executed, snapshot, counts))
+        executed += result.executed
+        if result.reason is StopReason.HALT:
+            simulator.halt = True
+            reason = "halt"
+            break
+    return intervals, reason
+
+
+def project_vectors(intervals: List[Interval], rng, dimensions: int = PROJECTION_DIMENSIONS):
+    """Return the normalised BBVs randomly projected to ``dimensions`` columns."""
+    columns = {pc: column for column, pc in enumerate(sorted({pc for i in intervals for pc in i.bbv}))}
+    vectors = np.zeros((len(intervals), len(columns)))
+    for row, interval in enumerate(intervals):
+        for pc, count in interval.bbv.items():
+            vectors[row, columns[pc]] = count
+        vectors[row] /= interval.instructions
+    if len(columns) <= dimensions:
+        return vectors
+    return vectors @ rng.uniform(-1.0, 1.0, size=(len(columns), dimensions))
+
+
+def kmeans(points, k: int, rng, iterations: int = KMEANS_ITERATIONS):
+    """Cluster ``points`` with k-means++ seeding; returns ``(labels, distances, sse)``.
+
+    ``distances`` holds each point's squared distance to its centroid.
+    """
+    centroids = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        nearest = ((points[:, None, :] - np.array(centroids)[None]) ** 2).sum(-1).min(1)
+        if nearest.sum() == 0:
+            break
+        centroids.append(points[rng.choice(len(points), p=nearest / nearest.sum())])
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        labels = ((points[:, None, :] - centroids[None]) ** 2).sum(-1).argmin(1)
+        updated = np.array([
+            points[labels == cluster].mean(0) if (labels == cluster).any() else centroids[cluster]
+            for cluster in range(len(centroids))
+        ])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    distances = ((points[:, None, :] - centroids[None]) ** 2).sum(-1)
+    labels = distances.argmin(1)
+    nearest = distances[np.arange(len(points)), labels]
+    return labels, nearest, float(nearest.sum())
+
+
+def choose_clusters(points, max_clusters: int, rng, tolerance: float = DEFAULT_CLUSTER_TOLERANCE):
+    """Return ``(labels, distances)`` for the smallest adequate number of clusters."""
+    labels, distances, baseline = kmeans(points, 1, rng)
+    for k in range(2, min(max_clusters, len(points)) + 1):
+        if baseline == 0 or distances.sum() <= tolerance * baseline:
+            break
+        labels, distances, _ = kmeans(points, k, rng)
+    # Renumber to 0..n-1; k-means may leave clusters empty.
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels, distances
+
+
+def pick_samples(labels, distances, samples_per_cluster: int, rng) -> Dict[int, List[int]]:
+    """Choose the representative intervals to simulate in detail per cluster.
+
+    The interval closest to the centroid always comes first; the rest are
+    drawn at random from the cluster to estimate its spread.
+    """
+    samples = {}
+    for cluster in range(labels.max() + 1):
+        members = np.flatnonzero(labels == cluster)
+        representative = int(members[distances[members].argmin()])
+        others = members[members != representative]
+        extra = rng.choice(others, size=min(samples_per_cluster - 1, len(others)), replace=False)
+        samples[cluster] = [representative] + sorted(int(index) for index in extra)
+    return samples
+
+
+def run_interval(simulator, snapshot, instructions: int):
+    """Simulate ``instructions`` instructions from ``snapshot`` in detail; returns the ``SimulationReport``.
+
+    The one detailed-interval routine behind serial and worker replays, so
+    both see the interconnect, DMA and data-access timing of ``run_simulation``.
+    """
+    simulator.restore(snapshot)
+    with interpreting_loops(simulator):
+        return simulator.simulate(max_cycles=instructions)
+
+
+def simulate_interval(simulator, interval: Interval) -> int:
+    """Replay ``interval`` from its snapshot on the timing path; returns its latency."""
+    return run_interval(simulator, interval.snapshot, interval.instructions).sim_time
+
+
+def estimate_sim_time(intervals: List[Interval], labels, latencies: Dict[int, int]):
+    """Extrapolate the total latency from the detailed ``latencies`` of sampled intervals.
+
+    Returns ``(estimate, error)`` where ``error`` is the 95% confidence
+    half-width of a stratified estimate over the clusters.
+    """
+    estimate = 0.0
+    variance = 0.0
+    unsampled_spread = []  # (cluster instructions, sampled, members) without a variance
+    cluster_variances = []
+    for cluster in range(labels.max() + 1):
+        members = [intervals[index] for index in np.flatnonzero(labels == cluster)]
+        instructions = sum(interval.instructions for interval in members)
+        cpis = np.array([
+            latencies[interval.index] / interval.instructions
+            for interval in members if interval.index in latencies
+        ])
+        estimate += instructions * cpis.mean()
+        if len(cpis) >= len(members):
+            continue  # fully simulated, no sampling error
+        if len(cpis) >= 2:
+            spread = cpis.var(ddof=1)
+            cluster_variances.append(spread)
+            variance += instructions ** 2 * spread / len(cpis) * (1 - len(cpis) / len(members))
+        else:
+            unsampled_spread.append((instructions, len(cpis), len(members)))
+    if unsampled_spread and cluster_variances:
+        pooled = float(np.mean(cluster_variances))
+        for instructions, sampled, members in unsampled_spread:
+            variance += instructions ** 2 * pooled / sampled * (1 - sampled / members)
+    return estimate, CONFIDENCE_Z * variance ** 0.5
+
+
+def run_sampled_simulation(
+    simulator,
+    max_cycles: int = 0,
+    *,
+    interval_size: int = DEFAULT_INTERVAL_INSTRUCTIONS,
+    max_clusters: int = DEFAULT_MAX_CLUSTERS,
+    samples_per_cluster: int = DEFAULT_SAMPLES_PER_CLUSTER,
+    seed: Optional[int] = 0,
+    max_workers: Optional[int] = None,
+) -> SampledSimulationReport:
+    """Estimate ``run_simulation`` results by detailed simulation of sampled intervals.
+
+    With ``max_workers`` the sampled intervals are simulated in a process
+    pool (see :mod:`src.simulator.parallel`). The simulator is left in the
+    state reached by the functional pass.
+    """
+    if samples_per_cluster <= 0:
+        raise ValueError(f"samples_per_cluster must be positive: {samples_per_cluster}")
+    rng = np.random.default_rng(seed)
+    start_time = time.perf_counter()
+    simulator.halt = False
+    simulator.sim_time = 0
+    simulator.risc_v_engine.instruction_count = 0
+
+    intervals, reason = collect_intervals(simulator, interval_size, max_cycles)
+    cycles = sum(interval.instructions for interval in intervals)
+    if not intervals:
+        return SampledSimulationReport(
+            cycles=0,
+            instructions=simulator.risc_v_engine.instruction_count,
+            halted=simulator.halt,
+            reason=reason,
+            sim_time=0,
+            sim_time_error=0.0,
+            intervals=0,
+            clusters=0,
+            detailed_instructions=0,
+            elapsed_seconds=time.perf_counter() - start_time,
+        )
+
+    final_state = simulator.snapshot()
+    labels, distances = choose_clusters(project_vectors(intervals, rng), max_clusters, rng)
+    samples = pick_samples(labels, distances, samples_per_cluster, rng)
+    sampled = [index for indices in samples.values() for index in indices]
+    if max_workers is None:
+        latencies = {index: simulate_interval(simulator, intervals[index]) for index in sampled}
+    else:
+        # Imported here because the parallel runner builds on this module.
+        from src.simulator.parallel import run_intervals
+
+        reports = run_intervals(
+            [(intervals[index].snapshot, intervals[index].instructions) for index in sampled],
+            config=simulator.config(),
+            max_workers=max_workers,
+        )
+        latencies = {index: report.sim_time for index, report in zip(sampled, reports)}
+    simulator.restore(final_state)
+
+    sim_time, error = estimate_sim_time(intervals, labels, latencies)
+    simulator.sim_time = int(round(sim_time))
+    return SampledSimulationReport(
+        cycles=cycles,
+        instructions=simulator.risc_v_engine.instruction_count,
+        halted=simulator.halt,
+        reason=reason,
+        sim_time=simulator.sim_time,
+        sim_time_error=error,
+        intervals=len(intervals),
+        clusters=len(samples),
+        detailed_instructions=sum(intervals[index].instructions for index in latencies),
+        elapsed_seconds=time.perf_counter() - start_time,
+    )
+
+
+__all__ = [
+    "DEFAULT_INTERVAL_INSTRUCTIONS",
+    "DEFAULT_MAX_CLUSTERS",
+    "DEFAULT_SAMPLES_PER_CLUSTER",
+    "Interval",
+    "SampledSimulationReport",
+    "interpreting_loops",
+    "collect_intervals",
+    "project_vectors",
+    "kmeans",
+    "choose_clusters",
+    "pick_samples",
+    "run_interval",
+    "simulate_interval",
+    "estimate_sim_time",
+    "run_sampled_simulation",
+]
@@ -0,0 +1,50 @@
+"""Encoders for the RV32 instruction formats used by the tests."""
+
+
+def assemble_r_type(funct7, rs2, rs1, funct3, rd):
+    return (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | 0b0110011
+
+
+def assemble_b_type(funct3, rs1, rs2, imm):
+    imm = imm & 0x1FFE  # Ensure imm is 13 bits and 2-byte aligned
+
+    # imm[12] is inst[31]
+    # imm[11] is inst[7]
+    # imm[10:5] is inst[30:25]
+    # imm[4:1] is inst[11:8]
+
+    return (((imm >> 12) & 0x1) << 31) | \
+           (((imm >> 11) & 0x1) << 7)  | \
+           (((imm >> 5) & 0x3F) << 25) | \
+           (((imm >> 1) & 0xF) << 8)   | \
+           (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | 0b1100011
+
+
+def assemble_j_type(rd, imm):
+    imm = imm & 0x1FFFFF  # Ensure imm is 21 bits
+    imm20 = (imm >> 20) & 1
+    imm19_12 = (imm >> 12) & 0xFF
+    imm11 = (imm >> 11) & 1
+    imm10_1 = (imm >> 1) & 0x3FF
+
+    return (imm20 << 31) | (imm19_12 << 12) | (imm11 << 20) | (imm10_1 << 21) | (rd << 7) | 0b1101111
+
+
+def assemble_jalr(rd, rs1, imm):
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (rd << 7) | 0b1100111
+
+
+def assemble_lw(rd, rs1, imm):
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (0b010 << 12) | (rd << 7) | 0b0000011
+
+
+def assemble_sw(rs2, rs1, imm):
+    return ((imm >> 5) << 25) | (rs2 << 20) | (rs1 << 15) | (0b010 << 12) | ((imm & 0x1F) << 7) | 0b0100011
+
+
+def add(rd, rs1, rs2):
+    return assemble_r_type(0, rs2, rs1, 0b000, rd)
+
+
+def mul(rd, rs1, rs2):
+    return assemble_r_type(1, rs2, rs1, 0b000, rd)
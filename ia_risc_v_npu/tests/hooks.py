@@ -0,0 +1,12 @@
+"""Timing hooks with predictable latencies for the tests."""
+
+
+class FixedLatencyHooks:
+    """Charges ``latency`` cycles per instruction fetch and leaves data accesses untimed."""
+
+    def __init__(self, latency=1):
+        self.latency = latency
+        self.counters = {'fetch': 0, 'memory': 0}
+
+    def fetch_hook(self, pc, inst_bits):
+        return self.latency
@@ -0,0 +1,107 @@
+import asyncio
+import pickle
+
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.interconnect import BusArbiter
+from src.simulator.main import AdaptiveSimulator, SimulationReport
+from src.simulator.parallel import merge_reports
+from tests.assembler import add, assemble_b_type
+
+
+LOOP_PROGRAM = [
+    add(8, 8, 5),                        # 0x00: x8 += x5
+    add(5, 5, 6),                        # 0x04: x5 += 1
+    assemble_b_type(0b001, 5, 7, -8),    # 0x08: bne x5, x7, loop
+    0,
+]
+
+
+class PairedLatencyHooks:
+    """Fetch latencies alternating 1, 3 by fetch count, so every second fetch queues."""
+
+    def __init__(self):
+        self.counters = {'fetch': 0, 'memory': 0}
+
+    def fetch_hook(self, pc, inst_bits):
+        self.counters['fetch'] += 1
+        return 1 if self.counters['fetch'] % 2 else 3
+
+
+def make_simulator(hooks, **options):
+    simulator = AdaptiveSimulator(timing_hooks=pickle.loads(pickle.dumps(hooks)), **options)
+    simulator.load_program(LOOP_PROGRAM)
+    simulator.risc_v_engine.registers[6] = 1
+    simulator.risc_v_engine.registers[7] = 5000
+    return simulator
+
+
+def test_parallel_simulation_matches_serial_run():
+    hooks = TimingHookSystem(buffer_size=20_000)
+    reference = make_simulator(hooks)
+    serial = asyncio.run(reference.run_simulation())
+
+    simulator = make_simulator(hooks)
+    merged = asyncio.run(simulator.run_parallel_simulation(interval_size=3000, max_workers=2))
+
+    assert merged.halted and merged.reason == "halt"
+    assert merged.cycles == serial.cycles
+    assert merged.instructions == serial.instructions
+    assert merged.sim_time == serial.sim_time
+    assert simulator.risc_v_engine.registers == reference.risc_v_engine.registers
+
+
+def test_parallel_workers_simulate_the_configured_machine():
+    # Two-byte bus: a fetch takes two beats, so the fetch issued one cycle
+    # after its predecessor waits a cycle for the bus.
+    def machine():
+        return make_simulator(PairedLatencyHooks(), interconnect=BusArbiter(width=2, burst=1))
+
+    serial = asyncio.run(machine().run_simulation())
+    merged = asyncio.run(machine().run_parallel_simulation(interval_size=3000, max_workers=2))
+
+    assert serial.sim_time == 2 * serial.cycles + serial.cycles // 2
+    assert merged.sim_time == serial.sim_time
+
+
+def test_parallel_simulation_honours_max_cycles():
+    simulator = make_simulator(TimingHookSystem())
+    merged = asyncio.run(
+        simulator.run_parallel_simulation(4_000, interval_size=1500, max_workers=2)
+    )
+
+    assert merged.reason == "max_cycles_reached"
+    assert merged.cycles == merged.instructions == 4_000
+
+
+def test_sampled_intervals_run_in_workers():
+    hooks = TimingHookSystem()
+    serial = asyncio.run(make_simulator(hooks).run_sampled_simulation(interval_size=1000))
+    pooled = asyncio.run(
+        make_simulator(hooks).run_sampled_simulation(interval_size=1000, max_workers=2)
+    )
+
+    assert pooled.sim_time == serial.sim_time
+    assert pooled.detailed_instructions == serial.detailed_instructions
+
+
+def test_serial_and_pooled_samples_see_the_interconnect():
+    def machine():
+        return make_simulator(PairedLatencyHooks(), interconnect=BusArbiter(width=2, burst=1))
+
+    full = asyncio.run(machine().run_simulation())
+    serial = asyncio.run(machine().run_sampled_simulation(interval_size=1000))
+    pooled = asyncio.run(machine().run_sampled_simulation(interval_size=1000, max_workers=2))
+
+    assert serial.sim_time == pooled.sim_time == full.sim_time
+
+
+def test_merge_reports_sums_intervals():
+    reports = [
+        SimulationReport(10, 10, False, "max_cycles_reached", 30, 0.5),
+        SimulationReport(4, 5, True, "halt", 8, 0.25),
+    ]
+    merged = merge_reports(reports)
+
+    assert (merged.cycles, merged.instructions, merged.sim_time) == (14, 15, 38)
+    assert merged.halted and merged.reason == "halt"
+    assert merged.elapsed_seconds == 0.75
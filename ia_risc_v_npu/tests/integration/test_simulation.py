@@ -1,6 +1,12 @@
 import asyncio
 
-from src.simulator.main import AdaptiveSimulator
+import numpy as np
+import pytest
+
+from src.simulator.dram import DRAMController
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.main import DRAM_SIZE, AdaptiveSimulator
+from tests.assembler import assemble_lw, assemble_sw
 
 
 def test_end_to_end_add_instruction():
@@ -24,3 +30,78 @@ def test_end_to_end_add_instruction():
         assert report.elapsed_seconds >= 0
 
     asyncio.run(scenario())
+
+
+def test_loads_and_stores_are_timed_by_dram():
+    def run(hooks):
+        # Every fetch hits, so sim_time is 4 fetches plus the data accesses.
+        hooks.random_choices[:] = False
+        simulator = AdaptiveSimulator(timing_hooks=hooks)
+        simulator.load_program([
+            assemble_sw(2, 9, 0),       # bank 0, row 0: closed
+            assemble_lw(1, 9, 4),       # same row: hit
+            assemble_lw(3, 10, 0),      # bank 0, row 1: conflict
+            assemble_sw(1, 9, 8),       # back to row 0: conflict
+            0,
+        ])
+        registers = simulator.risc_v_engine.registers
+        registers[9], registers[10] = 0x400, 0x400 + 8 * 2048
+        return asyncio.run(simulator.run_simulation())
+
+    dram = DRAMController(t_rcd=3, t_cas=2, t_rp=5)
+    timed = run(TimingHookSystem(dram=dram))
+    flat = run(TimingHookSystem())
+
+    assert (dram.row_hits, dram.row_empties, dram.row_conflicts) == (1, 1, 2)
+    assert timed.sim_time == 4 + 5 + 2 + 10 + 10
+    assert flat.sim_time == 4 + 4 * TimingHookSystem.MEMORY_ACCESS_LATENCY
+
+
+def test_dram_refresh_follows_simulated_time():
+    dram = DRAMController(t_rcd=3, t_cas=2, t_rp=5, t_refi=100, t_rfc=10)
+    hooks = TimingHookSystem(dram=dram)
+    hooks.random_choices[:] = False
+    simulator = AdaptiveSimulator(timing_hooks=hooks)
+    simulator.risc_v_engine.registers[9] = 0x400
+
+    reports = []
+    for _ in range(2):
+        simulator.load_program([0x003100B3] * 103 + [assemble_lw(1, 9, 0), 0])
+        reports.append(asyncio.run(simulator.run_simulation()))
+
+    # The load issues at cycle 103, three cycles into the first refresh.
+    assert dram.refreshes == 2 and dram.refresh_stall_cycles == 2 * 7
+    assert reports[0].sim_time == reports[1].sim_time == 104 + 7 + 3 + 2
+
+
+def test_load_program_accepts_arrays_bytes_and_iterators():
+    program = [0x003100B3, 0x002080B3, 0]
+    expected = b"".join(word.to_bytes(4, "little") for word in program)
+    sources = [
+        program,
+        np.array(program, dtype=np.uint32),
+        expected,
+        iter(program),
+        (word for word in program),
+    ]
+    for source in sources:
+        simulator = AdaptiveSimulator()
+        simulator.load_program(source, base_address=0x100)
+        assert simulator.bus.read(0x100, len(expected)) == expected
+        assert simulator.risc_v_engine.pc == 0x100
+
+
+def test_load_program_chunks_iterators(monkeypatch):
+    monkeypatch.setattr("src.simulator.main.LOAD_CHUNK_WORDS", 4)
+    simulator = AdaptiveSimulator()
+    writes = []
+    simulator.bus.add_write_observer(lambda address, size: writes.append((address, size)))
+
+    simulator.load_program(iter(range(10)))
+
+    assert writes == [(0, 16), (16, 16), (32, 8)]
+    assert simulator.bus.read_u32(36) == 9
+    with pytest.raises(ValueError, match="multiple of 4"):
+        simulator.load_program(b"\x00" * 6)
+    with pytest.raises(MemoryError):
+        simulator.load_program(np.zeros(4, dtype=np.uint32), base_address=DRAM_SIZE - 8)
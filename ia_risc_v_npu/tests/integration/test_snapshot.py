@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from src.simulator.cache import CacheHierarchy, SetAssociativeCache
+from src.simulator.dram import DRAMController
+from src.simulator.dma import DMA_COMPLETED, DMA_DOORBELL, DMA_DST, DMA_LENGTH, DMA_SRC, DMA_STATUS
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.main import DMA_BASE, DRAM_SIZE, SPM_BASE, AdaptiveSimulator
+from tests.assembler import assemble_sw
+
+
+ADD_X1_X1_X2 = 0x002080B3  # add x1, x1, x2
+
+
+def test_restore_forks_from_warm_state():
+    simulator = AdaptiveSimulator()
+    simulator.load_program([ADD_X1_X1_X2] * 8 + [assemble_sw(1, 0, 0x400)])
+    simulator.risc_v_engine.registers[2] = 1
+    asyncio.run(simulator.run_simulation(max_cycles=4))
+    simulator.spm.write(0, b'warm')
+    simulator.npu.internal_registers[0x10] = 7
+
+    snapshot = simulator.snapshot()
+    fetches = simulator.timing_hooks.counters['fetch']
+
+    outcomes = []
+    for step in (1, 5):
+        simulator.restore(snapshot)
+        assert simulator.risc_v_engine.pc == 16
+        assert simulator.timing_hooks.counters['fetch'] == fetches
+        simulator.risc_v_engine.registers[2] = step
+        asyncio.run(simulator.run_simulation())
+        simulator.spm.write(0, b'cold')
+        simulator.npu.internal_registers[0x10] = step
+        outcomes.append(int.from_bytes(simulator.bus.read(0x400, 4), 'little'))
+
+    assert outcomes == [8, 4 + 4 * 5]
+
+    simulator.restore(snapshot)
+    assert simulator.bus.read(0x400, 4) == bytes(4)
+    assert simulator.bus.read(SPM_BASE, 4) == b'warm'
+    assert simulator.npu.internal_registers == {0x10: 7}
+    assert int(simulator.risc_v_engine.registers[1]) == 4
+
+
+def test_snapshot_does_not_copy_dram():
+    simulator = AdaptiveSimulator()
+    snapshot = simulator.snapshot()
+    simulator.bus.write(0x100, b'\x01')
+
+    assert simulator.dram.copied_pages == 1
+    assert simulator.dram.copied_pages * simulator.dram.page_size < DRAM_SIZE
+    simulator.restore(snapshot)
+    assert simulator.bus.read(0x100, 1) == b'\x00'
+
+
+def test_restore_discards_stale_decodes():
+    simulator = AdaptiveSimulator()
+    simulator.load_program([ADD_X1_X1_X2, 0])
+    snapshot = simulator.snapshot()
+    simulator.load_program([0, 0])
+    asyncio.run(simulator.run_simulation())
+
+    simulator.restore(snapshot)
+    simulator.risc_v_engine.registers[2] = 3
+    asyncio.run(simulator.run_simulation())
+
+    assert int(simulator.risc_v_engine.registers[1]) == 3
+
+
+def test_configurable_dram_size():
+    simulator = AdaptiveSimulator(dram_size=64 * 1024 * 1024)
+    simulator.bus.write_u32(0x3FFFFFC, 0x12345678)
+
+    assert simulator.bus.read_u32(0x3FFFFFC) == 0x12345678
+    assert simulator.dram.allocated_pages == 1
+    with pytest.raises(ValueError, match="DRAM size"):
+        AdaptiveSimulator(dram_size=0x20000000)
+
+
+def test_restore_remaps_images_on_a_fresh_simulator(tmp_path):
+    image_path = tmp_path / "weights.bin"
+    image_path.write_bytes(bytes(range(64)) * 128)
+    simulator = AdaptiveSimulator()
+    simulator.load_image(image_path, 0x8000)
+    simulator.bus.write(0x8000, b'\xaa')
+    snapshot = simulator.snapshot()
+
+    fresh = AdaptiveSimulator()
+    fresh.restore(snapshot)
+
+    assert fresh.dram.images == simulator.dram.images
+    assert fresh.bus.read(0x8000, 4) == b'\xaa\x01\x02\x03'
+    assert fresh.bus.read(0x8000 + 4096 + 5, 1) == b'\x05'
+
+
+def test_restore_unmaps_images_mapped_after_the_snapshot(tmp_path):
+    first, second = tmp_path / "first.bin", tmp_path / "second.bin"
+    first.write_bytes(b"A" * 4096)
+    second.write_bytes(b"B" * 4096)
+    simulator = AdaptiveSimulator()
+    simulator.load_image(first, 0x8000)
+    simulator.bus.write(0x9000, b"\x11")
+    snapshot = simulator.snapshot()
+
+    simulator.load_image(second, 0x8000)
+    simulator.load_image(second, 0x9000)
+    assert simulator.bus.read(0x8000, 1) == b"B"
+    simulator.restore(snapshot)
+
+    assert simulator.dram.images == snapshot.dram_images
+    assert simulator.bus.read(0x8000, 2) == b"AA"
+    assert simulator.bus.read(0x9000, 2) == b"\x11\x00"
+
+
+def test_restore_undoes_a_dma_transfer():
+    simulator = AdaptiveSimulator(device_timing=True)
+    simulator.bus.write(0x8000, b"\x5a" * 4096)
+    snapshot = simulator.snapshot()
+
+    for offset, value in ((DMA_SRC, 0x8000), (DMA_DST, SPM_BASE), (DMA_LENGTH, 4096), (DMA_DOORBELL, 1)):
+        simulator.bus.write_u32(DMA_BASE + offset, value)
+    assert simulator.dma.busy and simulator.dma.busy_until > 0
+    assert simulator.bus.read(SPM_BASE, 4) == b"\x5a" * 4
+
+    simulator.restore(snapshot)
+
+    assert not simulator.dma.busy and simulator.dma.busy_until == 0
+    assert simulator.bus.read_u32(DMA_BASE + DMA_SRC) == 0
+    assert simulator.bus.read_u32(DMA_BASE + DMA_STATUS) == 0
+    assert simulator.bus.read_u32(DMA_BASE + DMA_COMPLETED) == 0
+    assert simulator.dma.bytes_transferred == 0
+    assert simulator.bus.read(SPM_BASE, 4) == bytes(4)
+    # The restored snapshot is still reusable after the engine ran again.
+    simulator.bus.write_u32(DMA_BASE + DMA_DOORBELL, 1)
+    assert snapshot.dma.in_flight == ()
+
+
+def test_restore_rewinds_cache_state():
+    hooks = TimingHookSystem(caches=CacheHierarchy(l1i=SetAssociativeCache(policy="plru")))
+    simulator = AdaptiveSimulator(timing_hooks=hooks)
+    simulator.load_program([ADD_X1_X1_X2] * 16 + [assemble_sw(1, 0, 0x400), 0])
+    snapshot = simulator.snapshot()
+
+    first = asyncio.run(simulator.run_simulation())
+    stats = hooks.caches.stats()
+    simulator.restore(snapshot)
+    second = asyncio.run(simulator.run_simulation())
+
+    assert second.sim_time == first.sim_time
+    assert hooks.caches.stats() == stats
+
+
+def test_restore_rewinds_dram_state():
+    hooks = TimingHookSystem(dram=DRAMController(t_rcd=3, t_cas=2, t_rp=5))
+    hooks.random_choices[:] = False
+    simulator = AdaptiveSimulator(timing_hooks=hooks)
+    simulator.load_program([assemble_sw(1, 9, 0), assemble_sw(1, 10, 0), 0])
+    registers = simulator.risc_v_engine.registers
+    registers[9], registers[10] = 0x400, 0x400 + 8 * 2048  # bank 0, rows 0 and 1
+    snapshot = simulator.snapshot()
+
+    first = asyncio.run(simulator.run_simulation())
+    stats = hooks.dram.stats()
+    simulator.restore(snapshot)
+    second = asyncio.run(simulator.run_simulation())
+
+    assert second.sim_time == first.sim_time
+    assert hooks.dram.stats() == stats
@@ -62,3 +62,9 @@ def test_jalr():
     # Jump and link register
     assert jalr(state, 10, 20) == 30
     assert state.pc == 4
+
+def test_signed_branches_on_unsigned_register_values():
+    # Register files hold raw 32-bit patterns; 0xFFFFFFF6 is -10.
+    assert blt(0xFFFFFFF6, 3) == True
+    assert bge(3, 0xFFFFFFF6) == True
+    assert bge(0x80000000, 0x7FFFFFFF) == False
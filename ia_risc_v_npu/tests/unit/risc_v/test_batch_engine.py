@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from src.risc_v.batch_engine import BatchEngine
+from src.risc_v.engine import RISCVEngine
+from src.simulator.memory import Bus
+from tests.assembler import add, assemble_b_type, assemble_lw, assemble_r_type, assemble_sw
+
+
+MEMORY_SIZE = 4096
+DATA_ADDR = 0x800
+
+# Sums the x7 words at DATA_ADDR into x8. Negative sums are negated through
+# a signed branch, then x8 / x12 is stored after the data.
+SUM_PROGRAM = [
+    assemble_lw(10, 9, 0),                  # 0x00: x10 = mem[x9]
+    add(8, 8, 10),                          # 0x04: x8 += x10
+    add(9, 9, 11),                          # 0x08: x9 += 4
+    add(5, 5, 6),                           # 0x0c: x5 += 1
+    assemble_b_type(0b001, 5, 7, -16),      # 0x10: bne x5, x7, loop
+    assemble_b_type(0b101, 8, 0, 8),        # 0x14: bge x8, x0, +8
+    assemble_r_type(0x20, 8, 0, 0b000, 8),  # 0x18: x8 = 0 - x8
+    assemble_r_type(1, 12, 8, 0b100, 13),   # 0x1c: div x13, x8, x12
+    assemble_sw(13, 9, 0),                  # 0x20: mem[x9] = x13
+    0,
+]
+
+
+def initial_registers(trips):
+    registers = [0] * 32
+    registers[6] = 1
+    registers[7] = trips
+    registers[9] = DATA_ADDR
+    registers[11] = 4
+    registers[12] = 3
+    return registers
+
+
+def run_reference(trips, data):
+    dram = bytearray(MEMORY_SIZE)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, MEMORY_SIZE - 1)
+    engine = RISCVEngine(bus, register_backend="int")
+    engine.registers = initial_registers(trips)
+    for index, word in enumerate(SUM_PROGRAM):
+        bus.write(index * 4, word.to_bytes(4, 'little'))
+    bus.write(DATA_ADDR, data.astype('<u4').tobytes())
+    while engine.execute_instruction() != "halt":
+        pass
+    return engine, dram
+
+
+@pytest.fixture
+def workloads():
+    rng = np.random.default_rng(1234)
+    trips = [1, 3, 5, 8, 8, 2, 7, 4]
+    data = [rng.integers(-1000, 1000, size=8).astype(np.int32).view(np.uint32) for _ in trips]
+    return trips, data
+
+
+def test_batch_matches_individual_runs(workloads):
+    trips, data = workloads
+    batch = BatchEngine(len(trips), memory_size=MEMORY_SIZE)
+    batch.load_program(SUM_PROGRAM)
+    batch.registers[:] = [initial_registers(count) for count in trips]
+    batch.write_memory(DATA_ADDR, np.stack(data).astype('<u4').view(np.uint8))
+
+    batch.run()
+
+    assert batch.halted.all()
+    for instance, (count, values) in enumerate(zip(trips, data)):
+        reference, reference_dram = run_reference(count, values)
+        np.testing.assert_array_equal(batch.registers[instance], reference.registers)
+        assert batch.pc[instance] == reference.pc
+        assert batch.instruction_count[instance] == reference.instruction_count
+        assert bytes(batch.memory[instance]) == bytes(reference_dram)
+
+
+def test_divergent_instances_reconverge():
+    batch = BatchEngine(2, memory_size=MEMORY_SIZE)
+    batch.load_program(SUM_PROGRAM)
+    batch.registers[:] = [initial_registers(1), initial_registers(1)]
+    batch.write_memory(DATA_ADDR, np.array([[5, 0, 0, 0], [0xFB, 0xFF, 0xFF, 0xFF]]))  # 5 and -5
+
+    batch.run(max_steps=6)
+    # Instance 0 skipped the negation, so it waits at 0x1c for instance 1.
+    assert list(batch.pc) == [0x1C, 0x18]
+
+    batch.step()
+    assert list(batch.pc) == [0x1C, 0x1C]
+
+    batch.run()
+    np.testing.assert_array_equal(batch.read_words(DATA_ADDR + 4, 1)[:, 0], [1, 1])
+
+
+def test_out_of_bounds_access_raises():
+    batch = BatchEngine(2, memory_size=MEMORY_SIZE)
+    batch.load_program([assemble_lw(1, 2, 0), 0])
+    batch.registers[1, 2] = MEMORY_SIZE
+    with pytest.raises(MemoryError, match="out of bounds"):
+        batch.run()
+
+
+def test_requires_instances():
+    with pytest.raises(ValueError):
+        BatchEngine(0)
@@ -0,0 +1,130 @@
+import pytest
+from src.risc_v.block_engine import BlockEngine, MAX_BLOCK_INSTRUCTIONS
+from src.risc_v.engine import RISCVEngine, StopReason
+from src.simulator.memory import Bus
+from tests.assembler import add, assemble_b_type, assemble_r_type, assemble_sw
+
+
+# x5 counts up by x6 until it equals x7, accumulating into x8; the sum is
+# stored at 0(x9) before halting.
+LOOP_PROGRAM = [
+    add(5, 5, 6),
+    add(8, 8, 5),
+    assemble_b_type(0b001, 5, 7, -8),
+    assemble_sw(8, 9, 0),
+    0,
+]
+
+
+def make_engine(engine_cls, program):
+    dram = bytearray(8192)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    engine = engine_cls(bus)
+    for index, word in enumerate(program):
+        bus.write(index * 4, word.to_bytes(4, 'little'))
+    engine.registers[6] = 1
+    engine.registers[7] = 100
+    engine.registers[9] = 0x1000
+    return engine, dram
+
+
+def run_reference(program):
+    engine, dram = make_engine(RISCVEngine, program)
+    while engine.execute_instruction() != "halt":
+        pass
+    return engine, dram
+
+
+def test_loop_matches_interpreter():
+    reference, reference_dram = run_reference(LOOP_PROGRAM)
+    engine, dram = make_engine(BlockEngine, LOOP_PROGRAM)
+
+    result = engine.run()
+    assert result.reason is StopReason.HALT
+    assert result.executed == reference.instruction_count - 1
+
+    assert engine.registers == [int(value) for value in reference.registers]
+    assert engine.pc == reference.pc
+    assert engine.instruction_count == reference.instruction_count
+    assert dram == reference_dram
+    assert int.from_bytes(dram[0x1000:0x1004], 'little') == sum(range(1, 101))
+
+
+def test_blocks_are_cached_and_chained():
+    engine, _ = make_engine(BlockEngine, LOOP_PROGRAM)
+    engine.run()
+
+    loop_block = engine._blocks[0]
+    assert loop_block.length == 3
+    assert loop_block.exits[0] is loop_block
+    assert loop_block.exits[12] is engine._blocks[12]
+
+
+def test_max_instructions_stops_mid_block():
+    engine, _ = make_engine(BlockEngine, LOOP_PROGRAM)
+
+    result = engine.run(max_instructions=7)
+    assert result.reason is StopReason.LIMIT
+    assert result.executed == 7
+    assert engine.instruction_count == 7
+    assert engine.pc == 4
+    assert engine.registers[5] == 3
+
+
+def test_signed_branch_on_negative_values():
+    # blt x10, x11, +8 jumps over the ADD when x10 is negative.
+    program = [
+        assemble_b_type(0b100, 10, 11, 8),
+        add(12, 6, 6),
+        0,
+    ]
+    engine, _ = make_engine(BlockEngine, program)
+    engine.registers[10] = (-5) & 0xFFFFFFFF
+    engine.registers[11] = 3
+
+    engine.run()
+    assert engine.registers[12] == 0
+    assert engine.pc == 8
+
+
+def test_store_into_translated_code_invalidates_block():
+    # The loop rewrites its first instruction to ADD x5, x5, x12 via SW.
+    program = [
+        add(5, 5, 6),
+        assemble_sw(10, 11, 0),
+        assemble_b_type(0b001, 5, 7, -8),
+        0,
+    ]
+    engine, _ = make_engine(BlockEngine, program)
+    engine.registers[7] = 3
+    engine.registers[10] = add(5, 5, 12)
+    engine.registers[11] = 0
+    engine.registers[12] = 2
+
+    engine.run()
+    reference, _ = make_engine(RISCVEngine, program)
+    reference.registers[7] = 3
+    reference.registers[10] = add(5, 5, 12)
+    reference.registers[11] = 0
+    reference.registers[12] = 2
+    while reference.execute_instruction() != "halt":
+        pass
+
+    assert engine.registers[5] == reference.registers[5] == 3
+    assert engine.instruction_count == reference.instruction_count
+
+
+def test_long_straight_line_code_is_split():
+    program = [add(1, 1, 6)] * (MAX_BLOCK_INSTRUCTIONS + 10) + [0]
+    engine, _ = make_engine(BlockEngine, program)
+
+    engine.run()
+    assert engine.registers[1] == MAX_BLOCK_INSTRUCTIONS + 10
+    assert engine._blocks[0].length == MAX_BLOCK_INSTRUCTIONS
+
+
+def test_unsupported_instruction_falls_back_to_interpreter():
+    engine, _ = make_engine(BlockEngine, [assemble_r_type(0, 3, 2, 0b001, 1)])  # SLL
+    with pytest.raises(ValueError, match="Unsupported ALU instruction"):
+        engine.run()
@@ -3,31 +3,7 @@ import pytest
 import numpy as np
 from src.risc_v.engine import RISCVEngine
 from src.simulator.memory import SPM
-
-# Helper function to assemble B-type instructions
-def assemble_b_type(funct3, rs1, rs2, imm):
-    imm = imm & 0x1FFE # Ensure imm is 13 bits and 2-byte aligned
-
-    # imm[12] is inst[31]
-    # imm[11] is inst[7]
-    # imm[10:5] is inst[30:25]
-    # imm[4:1] is inst[11:8]
-
-    return (((imm >> 12) & 0x1) << 31) | \
-           (((imm >> 11) & 0x1) << 7)  | \
-           (((imm >> 5) & 0x3F) << 25) | \
-           (((imm >> 1) & 0xF) << 8)   | \
-           (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | 0b1100011
-
-# Helper function to assemble J-type instructions
-def assemble_j_type(rd, imm):
-    imm = imm & 0x1FFFFF  # Ensure imm is 21 bits
-    imm20 = (imm >> 20) & 1
-    imm19_12 = (imm >> 12) & 0xFF
-    imm11 = (imm >> 11) & 1
-    imm10_1 = (imm >> 1) & 0x3FF
-
-    return (imm20 << 31) | (imm19_12 << 12) | (imm11 << 20) | (imm10_1 << 21) | (rd << 7) | 0b1101111
+from tests.assembler import assemble_b_type, assemble_j_type
 
 
 @pytest.fixture
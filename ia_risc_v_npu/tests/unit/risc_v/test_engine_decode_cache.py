@@ -0,0 +1,101 @@
+import pytest
+from src.risc_v.engine import RISCVEngine
+from src.simulator.memory import SPM, Bus
+
+ADD_X1_X2_X3 = 0x003100B3  # add x1, x2, x3
+SUB_X1_X2_X3 = 0x403100B3  # sub x1, x2, x3
+SW_X6_0_X7 = 0x0063A023    # sw x6, 0(x7)
+
+
+@pytest.fixture
+def dram():
+    return bytearray(4096)
+
+
+@pytest.fixture
+def engine(dram):
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    return RISCVEngine(bus)
+
+
+def test_cached_instruction_skips_fetch(engine, dram):
+    engine.bus.write(0, ADD_X1_X2_X3.to_bytes(4, 'little'))
+    engine.execute_instruction()
+    assert engine.registers[1] == 30
+
+    # Modify code behind the bus's back: the predecoded ADD is still used.
+    dram[0:4] = SUB_X1_X2_X3.to_bytes(4, 'little')
+    engine.pc = 0
+    engine.execute_instruction()
+    assert engine.registers[1] == 30
+
+    engine.invalidate_decode_cache()
+    engine.pc = 0
+    engine.execute_instruction()
+    assert engine.registers[1] == (10 - 20) & 0xFFFFFFFF
+
+
+def test_bus_write_invalidates_cached_instruction(engine):
+    engine.bus.write(0, ADD_X1_X2_X3.to_bytes(4, 'little'))
+    engine.execute_instruction()
+
+    engine.bus.write(0, SUB_X1_X2_X3.to_bytes(4, 'little'))
+    engine.pc = 0
+    engine.execute_instruction()
+    assert engine.registers[1] == (10 - 20) & 0xFFFFFFFF
+
+
+def test_store_into_code_page_invalidates(engine):
+    # sw x6, 0(x7) overwrites the instruction at 0x8 with SUB.
+    engine.bus.write(0, SW_X6_0_X7.to_bytes(4, 'little'))
+    engine.bus.write(8, ADD_X1_X2_X3.to_bytes(4, 'little'))
+    engine.pc = 8
+    engine.execute_instruction()
+    assert engine.registers[1] == 30
+
+    engine.registers[6] = SUB_X1_X2_X3
+    engine.registers[7] = 8
+    engine.pc = 0
+    engine.execute_instruction()
+
+    engine.pc = 8
+    engine.execute_instruction()
+    assert engine.registers[1] == (10 - 20) & 0xFFFFFFFF
+
+
+def test_data_write_keeps_unrelated_entries(engine):
+    engine.bus.write(0, ADD_X1_X2_X3.to_bytes(4, 'little'))
+    engine.execute_instruction()
+
+    engine.bus.write(0x100, b'\xff' * 4)
+    assert 0 in engine._decode_cache
+
+    engine.bus.write(0, b'\x00' * 256)
+    assert 0 not in engine._decode_cache
+
+
+def test_cache_disabled_without_write_notifications():
+    spm = SPM(size_kb=4)
+    engine = RISCVEngine(spm)
+    spm.write(0, ADD_X1_X2_X3.to_bytes(4, 'little'))
+    engine.execute_instruction()
+    assert engine._decode_cache == {}
+
+    spm.write(0, SUB_X1_X2_X3.to_bytes(4, 'little'))
+    engine.pc = 0
+    engine.execute_instruction()
+    assert engine.registers[1] == (10 - 20) & 0xFFFFFFFF
+
+
+def test_repeated_words_decode_once_and_keep_their_pc(engine):
+    jal_x1_8 = (4 << 21) | (1 << 7) | 0b1101111  # jal x1, 8
+    for pc in (0, 0x10):
+        engine.bus.write(pc, jal_x1_8.to_bytes(4, 'little'))
+
+    engine.execute_instruction()
+    assert (engine.pc, engine.registers[1]) == (8, 4)
+    engine.pc = 0x10
+    engine.execute_instruction()
+    assert (engine.pc, engine.registers[1]) == (0x18, 0x14)
+    assert list(engine._decoded_words) == [jal_x1_8]
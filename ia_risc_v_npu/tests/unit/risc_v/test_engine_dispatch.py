@@ -0,0 +1,92 @@
+import pytest
+from src.risc_v.engine import (
+    DISPATCH_TABLE,
+    INSTRUCTIONS_BY_MNEMONIC,
+    InstructionSpec,
+    OPCODE_R_TYPE,
+    RISCVEngine,
+    _build_dispatch_table,
+    lookup_instruction,
+)
+from src.simulator.memory import Bus
+from tests.assembler import assemble_jalr, assemble_r_type
+
+
+@pytest.fixture
+def engine():
+    dram = bytearray(4096)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    return RISCVEngine(bus, register_backend="int")
+
+
+def load(engine, *words):
+    for index, word in enumerate(words):
+        engine.bus.write(index * 4, word.to_bytes(4, 'little'))
+
+
+@pytest.mark.parametrize(
+    "word, mnemonic",
+    [
+        (0x003100B3, "ADD"),
+        (0x403100B3, "SUB"),
+        (assemble_r_type(1, 3, 2, 0b000, 1), "MUL"),
+        (assemble_r_type(1, 3, 2, 0b100, 1), "DIV"),
+        (0x00812203, "LW"),
+        (0x0063A623, "SW"),
+        (0x014000EF, "JAL"),
+        (assemble_jalr(1, 2, 0), "JALR"),
+        (0x0000C863, "BLT"),
+    ],
+)
+def test_lookup_instruction(word, mnemonic):
+    assert lookup_instruction(word).mnemonic == mnemonic
+
+
+def test_dispatch_table_covers_every_registered_handler():
+    assert len(DISPATCH_TABLE) == len(INSTRUCTIONS_BY_MNEMONIC)
+    for spec in DISPATCH_TABLE.values():
+        assert callable(getattr(RISCVEngine, spec.handler))
+
+
+def test_lookup_rejects_unknown_encodings():
+    with pytest.raises(ValueError, match="Unsupported opcode"):
+        lookup_instruction(0x7F)
+    with pytest.raises(ValueError, match="Unsupported ALU instruction"):
+        lookup_instruction(assemble_r_type(0, 3, 2, 0b001, 1))  # SLL
+    with pytest.raises(ValueError, match="Unsupported branch instruction"):
+        lookup_instruction(0x00002063)  # funct3=0b010 is reserved
+
+
+def test_duplicate_encodings_are_rejected():
+    spec = InstructionSpec("ADD", OPCODE_R_TYPE, "R", "_execute_add", 0, 0)
+    with pytest.raises(ValueError, match="Duplicate instruction encoding"):
+        _build_dispatch_table([spec, spec])
+
+
+def test_mul_and_div(engine):
+    load(
+        engine,
+        assemble_r_type(1, 3, 2, 0b000, 1),  # mul x1, x2, x3
+        assemble_r_type(1, 5, 4, 0b100, 6),  # div x6, x4, x5
+        assemble_r_type(1, 0, 4, 0b100, 7),  # div x7, x4, x0
+    )
+    engine.registers[4] = (-7) & 0xFFFFFFFF
+    engine.registers[5] = 2
+
+    for _ in range(3):
+        engine.execute_instruction()
+
+    assert engine.registers[1] == 200
+    assert engine.registers[6] == (-3) & 0xFFFFFFFF  # truncates toward zero
+    assert engine.registers[7] == 0xFFFFFFFF  # division by zero yields -1
+
+
+def test_jalr_links_and_clears_low_bit(engine):
+    load(engine, assemble_jalr(1, 4, 5))
+    engine.registers[4] = 0x100
+
+    engine.execute_instruction()
+
+    assert engine.pc == 0x104
+    assert engine.registers[1] == 4
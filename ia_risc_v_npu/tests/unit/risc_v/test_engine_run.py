@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+from src.risc_v.engine import RISCVEngine, StopReason
+from src.risc_v.tracing import TraceBuffer
+from src.simulator.memory import Bus
+from tests.assembler import assemble_lw, assemble_sw
+
+ADD_X1_X1_X2 = 0x002080B3  # add x1, x1, x2
+
+
+@pytest.fixture
+def engine():
+    dram = bytearray(4096)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    engine = RISCVEngine(bus)
+    for index in range(10):
+        bus.write(index * 4, ADD_X1_X1_X2.to_bytes(4, 'little'))
+    engine.registers[2] = 1
+    return engine
+
+
+def test_run_until_halt(engine):
+    result = engine.run()
+
+    assert result.reason is StopReason.HALT
+    assert result.executed == 10
+    assert result.pc == engine.pc == 40
+    assert engine.instruction_count == 11  # includes the halt instruction
+    assert engine.registers[1] == 10
+
+
+def test_run_stops_at_limit_and_resumes(engine):
+    result = engine.run(4)
+    assert result.reason is StopReason.LIMIT
+    assert result.executed == 4
+    assert engine.pc == 16
+    assert engine.instruction_count == 4
+
+    result = engine.run(100)
+    assert result.reason is StopReason.HALT
+    assert result.executed == 6
+    assert engine.registers[1] == 10
+
+
+def test_run_sums_fetch_hook_latency(engine):
+    seen = []
+
+    def fetch_hook(pc, inst_bits):
+        seen.append(pc)
+        return 3
+
+    result = engine.run(fetch_hook=fetch_hook)
+    assert result.latency == 30
+    assert seen == [4 * (index + 1) for index in range(10)]
+
+
+@pytest.mark.parametrize("trace", [None, TraceBuffer()], ids=["plain", "traced"])
+def test_run_charges_data_hook_latency(trace):
+    dram = bytearray(4096)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    engine = RISCVEngine(bus, trace=trace)
+    engine.registers[4] = 0x200
+    program = [
+        assemble_sw(2, 0, 0x100),   # mem[0x100] = x2
+        assemble_lw(1, 0, 0x100),
+        assemble_lw(0, 0, 0x100),   # load into x0: no access
+        assemble_lw(4, 4, -0x100),  # base register overwritten by the load
+        0,
+    ]
+    for index, word in enumerate(program):
+        bus.write_u32(index * 4, word)
+    accesses = []
+
+    def data_hook(address, size, is_write):
+        accesses.append((address, size, is_write))
+        return 5
+
+    engine.set_data_hook(data_hook)
+    result = engine.run(fetch_hook=lambda pc, inst_bits: 1)
+
+    assert accesses == [(0x100, 4, True), (0x100, 4, False), (0x100, 4, False)]
+    assert result.latency == 4 + 3 * 5
+    assert engine.data_latency == 0
+    assert engine.registers[1] == engine.registers[4] == 10
+
+
+def test_run_with_debug_logging_matches(engine, caplog):
+    with caplog.at_level(logging.DEBUG, logger="src.risc_v.engine"):
+        result = engine.run()
+
+    assert result.reason is StopReason.HALT
+    assert result.executed == 10
+    assert engine.instruction_count == 11
+    assert "pc=0x00000024" in caplog.text
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from src.risc_v.engine import RISCVEngine
+from src.risc_v.registers import create_register_file, register_array
+from src.simulator.memory import Bus
+
+SUB_X1_X2_X3 = 0x403100B3  # sub x1, x2, x3
+BLT_X1_X0_16 = 0x0000C863  # blt x1, x0, 16
+
+
+def test_create_register_file_backends():
+    numpy_registers = create_register_file("numpy")
+    assert isinstance(numpy_registers, np.ndarray)
+    assert numpy_registers.dtype == np.uint32
+    assert create_register_file("int") == [0] * 32
+
+    with pytest.raises(ValueError, match="Unknown register backend"):
+        create_register_file("float")
+
+
+def test_register_array_views_numpy_and_copies_list():
+    numpy_registers = create_register_file("numpy")
+    assert register_array(numpy_registers) is numpy_registers
+
+    int_registers = create_register_file("int")
+    int_registers[5] = 0xFFFFFFFF
+    snapshot = register_array(int_registers)
+    assert snapshot.dtype == np.uint32
+    assert snapshot[5] == 0xFFFFFFFF
+    snapshot[5] = 0
+    assert int_registers[5] == 0xFFFFFFFF
+
+
+@pytest.mark.parametrize("backend", ["numpy", "int"])
+def test_backends_execute_identically(backend):
+    dram = bytearray(64)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    bus.write(0, SUB_X1_X2_X3.to_bytes(4, 'little'))
+    bus.write(4, BLT_X1_X0_16.to_bytes(4, 'little'))
+    engine = RISCVEngine(bus, register_backend=backend)
+    assert engine.register_backend == backend
+
+    engine.execute_instruction()  # x1 = 10 - 20 wraps to 0xFFFFFFF6
+    engine.execute_instruction()  # signed -10 < 0 takes the branch
+
+    assert engine.registers[1] == 0xFFFFFFF6
+    assert engine.pc == 20
+    np.testing.assert_array_equal(engine.register_array()[:4], [0, 0xFFFFFFF6, 10, 20])
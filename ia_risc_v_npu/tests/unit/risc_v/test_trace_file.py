@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pytest
+from src.risc_v.engine import RISCVEngine
+from src.risc_v.trace_file import (
+    EXECUTION_TRACE_DTYPE,
+    ExecutionTraceWriter,
+    read_execution_trace,
+)
+from src.simulator.main import AdaptiveSimulator
+from src.simulator.memory import Bus
+from tests.assembler import assemble_b_type, assemble_lw, assemble_sw
+
+
+ADD_X5_X5_X6 = 0x006282B3  # add x5, x5, x6
+
+PROGRAM = [
+    assemble_lw(8, 9, 0),                  # 0x00: x8 = mem[x9]
+    ADD_X5_X5_X6,                          # 0x04
+    assemble_sw(5, 9, 4),                  # 0x08: mem[x9 + 4] = x5
+    assemble_b_type(0b001, 5, 7, -12),     # 0x0c: bne x5, x7, -12
+    0,                                     # 0x10
+]
+
+
+def make_engine(trace):
+    dram = bytearray(4096)
+    bus = Bus(trace=trace)
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    for index, word in enumerate(PROGRAM):
+        bus.write(index * 4, word.to_bytes(4, 'little'))
+    engine = RISCVEngine(bus, register_backend="int", trace=trace)
+    engine.registers[6] = 1
+    engine.registers[7] = 3
+    engine.registers[9] = 0x200
+    return engine
+
+
+def test_records_one_entry_per_instruction(tmp_path):
+    path = tmp_path / "run.trace"
+    with ExecutionTraceWriter(path, chunk_records=5) as writer:
+        engine = make_engine(writer)
+        engine.run()
+
+    records = read_execution_trace(path)
+    assert isinstance(records, np.memmap)
+    assert records.dtype == EXECUTION_TRACE_DTYPE
+    assert len(records) == engine.instruction_count == 13
+    assert list(records["pc"][:5]) == [0x00, 0x04, 0x08, 0x0C, 0x00]
+    assert records["instruction"][1] == ADD_X5_X5_X6
+    assert records["pc"][-1] == 0x10 and records["instruction"][-1] == 0
+
+    loads = records[records["pc"] == 0x00]
+    stores = records[records["pc"] == 0x08]
+    assert list(loads["mem_address"]) == [0x200] * 3 and not loads["is_write"].any()
+    assert list(stores["mem_address"]) == [0x204] * 3 and stores["is_write"].all()
+    assert set(stores["mem_size"]) == {4}
+    others = records[(records["pc"] == 0x04) | (records["pc"] == 0x0C)]
+    assert not others["mem_size"].any()
+
+
+def test_load_into_x0_records_no_access(tmp_path):
+    path = tmp_path / "x0.trace"
+    with ExecutionTraceWriter(path) as writer:
+        engine = make_engine(writer)
+        # The load is skipped; the bus read that follows fetches the ADD.
+        engine.bus.write(0, assemble_lw(0, 9, 0).to_bytes(4, 'little'))
+        engine.bus.write(4, assemble_lw(8, 9, 0).to_bytes(4, 'little'))
+        engine.run(2)
+
+    records = read_execution_trace(path)
+    assert list(records["mem_size"]) == [0, 4]
+    assert records["mem_address"][1] == 0x200
+
+
+def test_run_simulation_flushes_trace(tmp_path):
+    path = tmp_path / "sim.trace"
+    writer = ExecutionTraceWriter(path)
+    simulator = AdaptiveSimulator(trace=writer)
+    simulator.load_program([ADD_X5_X5_X6] * 3)
+
+    asyncio.run(simulator.run_simulation())
+
+    records = read_execution_trace(path)
+    assert list(records["pc"]) == [0, 4, 8, 12]
+    writer.close()
+
+
+def test_reader_rejects_foreign_files(tmp_path):
+    path = tmp_path / "bogus.trace"
+    path.write_bytes(b"not a trace at all")
+    with pytest.raises(ValueError, match="bad magic"):
+        read_execution_trace(path)
+
+    empty = tmp_path / "empty.trace"
+    ExecutionTraceWriter(empty).close()
+    assert len(read_execution_trace(empty)) == 0
+
+    with empty.open("ab") as handle:
+        handle.write(b"\x00" * 3)
+    with pytest.raises(ValueError, match="partial record"):
+        read_execution_trace(empty)
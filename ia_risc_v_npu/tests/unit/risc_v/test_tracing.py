@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from src.risc_v.engine import RISCVEngine
+from src.risc_v.tracing import (
+    TRACE_BUS_READ,
+    TRACE_BUS_WRITE,
+    TRACE_CONTROL,
+    TRACE_INSTRUCTION,
+    TraceBuffer,
+)
+from src.simulator.memory import Bus
+from tests.assembler import assemble_b_type, assemble_sw
+
+
+ADD_X5_X5_X6 = 0x006282B3  # add x5, x5, x6
+
+PROGRAM = [
+    ADD_X5_X5_X6,                          # 0x00
+    assemble_b_type(0b001, 5, 7, -4),      # 0x04: bne x5, x7, -4
+    assemble_sw(5, 0, 0x100),              # 0x08: mem[0x100] = x5
+    0,                                     # 0x0c
+]
+
+
+def make_engine(trace=None):
+    dram = bytearray(4096)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    for index, word in enumerate(PROGRAM):
+        bus.write(index * 4, word.to_bytes(4, 'little'))
+    engine = RISCVEngine(bus, register_backend="int", trace=trace)
+    engine.registers[6] = 1
+    engine.registers[7] = 3
+    return engine
+
+
+def test_untraced_engine_keeps_lean_loops():
+    engine = make_engine()
+    assert "run" not in vars(engine)
+    assert "execute_instruction" not in vars(engine)
+    assert engine.bus.trace is None and "read" not in vars(engine.bus)
+
+
+def test_traced_run_records_instructions_and_jumps():
+    trace = TraceBuffer()
+    engine = make_engine(trace)
+    reference = make_engine()
+
+    result = engine.run()
+    reference_result = reference.run()
+
+    assert result == reference_result
+    assert engine.registers == reference.registers
+    records = trace.records()
+    instructions = records[records["kind"] == TRACE_INSTRUCTION]
+    assert list(instructions["address"]) == [0, 4, 0, 4, 0, 4, 8, 12]
+    assert instructions["value"][0] == ADD_X5_X5_X6
+    jumps = records[records["kind"] == TRACE_CONTROL]
+    assert [tuple(row) for row in jumps[["address", "value"]].tolist()] == [(4, 0), (4, 0)]
+
+
+def test_execute_instruction_traces_too():
+    trace = TraceBuffer()
+    engine = make_engine(trace)
+    while engine.execute_instruction() != "halt":
+        pass
+
+    lines = list(trace.lines())
+    assert lines[0] == "pc=0x00000000 instruction=0x006282b3"
+    assert "jump: 0x00000004 -> 0x00000000" in lines
+    assert lines[-1] == "pc=0x0000000c instruction=0x00000000"
+
+
+def test_traced_bus_records_accesses():
+    trace = TraceBuffer()
+    bus = Bus(trace=trace)
+    bus.add_device("dram", bytearray(64), 0, 63)
+
+    bus.write(8, b'\x78\x56\x34\x12')
+    assert bus.read(8, 4) == b'\x78\x56\x34\x12'
+
+    records = trace.records().tolist()
+    assert records == [(TRACE_BUS_WRITE, 8, 0x12345678, 4), (TRACE_BUS_READ, 8, 0x12345678, 4)]
+
+
+def test_traced_bus_records_word_accesses():
+    trace = TraceBuffer()
+    bus = Bus(trace=trace)
+    bus.add_device("dram", bytearray(64), 0, 63)
+
+    bus.write_u32(8, 0x12345678)
+    assert bus.read_u32(8) == 0x12345678
+    bus.write_u64(16, 0x0123456789ABCDEF)
+    assert bus.read_u64(16) == 0x0123456789ABCDEF
+
+    assert trace.records().tolist() == [
+        (TRACE_BUS_WRITE, 8, 0x12345678, 4),
+        (TRACE_BUS_READ, 8, 0x12345678, 4),
+        (TRACE_BUS_WRITE, 16, 0x0123456789ABCDEF, 8),
+        (TRACE_BUS_READ, 16, 0x0123456789ABCDEF, 8),
+    ]
+
+
+def test_trace_buffer_chunks_and_bounds():
+    trace = TraceBuffer(chunk_records=4, max_records=8)
+    for index in range(21):
+        trace.record(TRACE_INSTRUCTION, index * 4, index)
+
+    records = trace.records()
+    assert len(records) == len(trace) <= 12
+    assert trace.dropped + len(records) == 21
+    assert records["value"][-1] == 20
+    np.testing.assert_array_equal(np.diff(records["value"]), 1)
+
+    with pytest.raises(ValueError):
+        TraceBuffer(chunk_records=0)
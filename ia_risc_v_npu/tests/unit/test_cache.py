@@ -0,0 +1,140 @@
+import asyncio
+import copy
+
+import numpy as np
+import pytest
+
+from src.simulator.cache import CacheHierarchy, SetAssociativeCache
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.main import AdaptiveSimulator
+from tests.assembler import assemble_lw, assemble_sw
+
+
+def line(cache, index, set_index=0):
+    """Address of the ``index``-th distinct line mapping to ``set_index``."""
+    return (index * cache.sets + set_index) * cache.line_size
+
+
+def test_lru_evicts_least_recently_used_line():
+    cache = SetAssociativeCache(size=4 * 64 * 2, line_size=64, ways=2, policy="lru")
+    a, b, c = (line(cache, index) for index in range(3))
+
+    assert [cache.access(address) for address in (a, b, a, c)] == [False, False, True, False]
+    assert cache.access(a)        # a was touched after b, so c evicted b
+    assert not cache.access(b)
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_plru_follows_tree_bits():
+    cache = SetAssociativeCache(size=4 * 64, line_size=64, ways=4, policy="plru")
+    lines = [line(cache, index) for index in range(5)]
+    for address in lines[:4]:
+        cache.access(address)
+    cache.access(lines[0])
+
+    # The tree points away from way 0 (most recent) and way 3 (recent half): way 2 goes.
+    assert not cache.access(lines[4])
+    assert cache.tags[0].tolist() == [0, 1, 4, 3]
+
+
+def test_same_line_repeats_are_hits():
+    cache = SetAssociativeCache()
+    hits = [cache.access(address) for address in range(0, 64, 4)]
+    assert hits == [False] + [True] * 15
+
+
+@pytest.mark.parametrize("policy", ["lru", "plru"])
+@pytest.mark.parametrize("ways", [1, 2, 8])
+def test_batch_matches_sequential_accesses(policy, ways):
+    rng = np.random.default_rng(ways)
+    addresses = np.concatenate([
+        rng.integers(0, 1 << 16, 2000),
+        np.repeat(rng.integers(0, 1 << 14, 300), 3),
+        np.arange(0, 16384, 4),
+    ])
+    sequential = SetAssociativeCache(size=4096, ways=ways, policy=policy)
+    batched = copy.deepcopy(sequential)
+
+    expected = [sequential.access(int(address)) for address in addresses]
+    hits = np.concatenate([batched.access_batch(addresses[:777]), batched.access_batch(addresses[777:])])
+
+    assert hits.tolist() == expected
+    assert np.array_equal(batched.tags, sequential.tags)
+    assert (batched.hits, batched.misses) == (sequential.hits, sequential.misses)
+    # Both paths leave the same replacement state for later accesses.
+    follow_up = rng.integers(0, 1 << 16, 500)
+    assert batched.access_batch(follow_up).tolist() == [sequential.access(int(a)) for a in follow_up]
+
+
+def test_hierarchy_latencies():
+    caches = CacheHierarchy(memory_latency=40)
+    assert caches.fetch(0x1000) == 1 + 8 + 40
+    assert caches.fetch(0x1004) == 1
+    assert caches.data(0x1000) == 1 + 8  # L1D miss, shared L2 hit
+    assert caches.data_batch([0x1000, 0x9000]).tolist() == [1, 1 + 8 + 40]
+    assert caches.stats()["l2"] == {"hits": 1, "misses": 2, "miss_rate": 2 / 3}
+
+
+def test_mixed_batch_matches_fetch_and_data_calls():
+    rng = np.random.default_rng(0)
+    addresses = rng.integers(0, 1 << 20, 3000) & ~3
+    data = rng.random(3000) < 0.3
+    sequential = CacheHierarchy(
+        l1i=SetAssociativeCache(size=1024, ways=2),
+        l1d=SetAssociativeCache(size=1024, ways=2),
+        l2=SetAssociativeCache(size=8192, ways=4, hit_latency=8),
+    )
+    batched = copy.deepcopy(sequential)
+
+    expected = [
+        sequential.data(int(address)) if is_data else sequential.fetch(int(address))
+        for address, is_data in zip(addresses, data)
+    ]
+
+    assert batched.access_batch(addresses, data).tolist() == expected
+    assert batched.stats() == sequential.stats()
+
+
+def test_hierarchy_from_config():
+    caches = CacheHierarchy.from_config({
+        "l1i": {"size": 4096, "ways": 2, "policy": "plru"},
+        "l2": None,
+        "memory_latency": 20,
+    })
+    assert (caches.l1i.sets, caches.l1i.policy) == (32, "plru")
+    assert caches.l2 is None
+    assert caches.fetch(0) == 21
+    with pytest.raises(ValueError, match="Unknown cache options"):
+        CacheHierarchy.from_config({"l3": {}})
+    with pytest.raises(ValueError, match="power-of-two"):
+        CacheHierarchy.from_config({"l1d": {"size": 3000}})
+
+
+def test_timing_hooks_use_cache_model():
+    hooks = TimingHookSystem(buffer_size=4, caches=CacheHierarchy())
+    loop = [0x100, 0x104, 0x108, 0x100, 0x104, 0x108]
+
+    latencies = [hooks.fetch_hook(pc, 0) for pc in loop]
+
+    assert latencies == [49, 1, 1, 1, 1, 1]
+    assert hooks.counters['fetch'] == 4
+    assert hooks.hook_stats['fetch']['cache_miss'].tolist() == [True, False, False, False]
+    assert hooks.memory_hook(0x8000, 4, False) == 49
+    assert hooks.memory_hook(0x8000, 4, True) == 1
+
+
+def test_simulator_charges_loads_and_stores_through_l1d():
+    hooks = TimingHookSystem(caches=CacheHierarchy())
+    expected_caches = copy.deepcopy(hooks.caches)
+    simulator = AdaptiveSimulator(timing_hooks=hooks)
+    simulator.load_program([assemble_sw(2, 0, 0x400), assemble_lw(1, 0, 0x400), 0])
+
+    report = asyncio.run(simulator.run_simulation())
+
+    expected = (
+        expected_caches.data(0x400) + expected_caches.fetch(4)
+        + expected_caches.data(0x400) + expected_caches.fetch(8)
+    )
+    assert report.sim_time == expected
+    assert hooks.caches.stats()["l1d"] == {"hits": 1, "misses": 1, "miss_rate": 0.5}
+    assert hooks.counters["memory"] == 2
@@ -6,11 +6,14 @@ import pytest
 from src.simulator.cli import (
     CLIError,
     ProgramImage,
+    build_parser,
     load_config,
     load_program_image,
     run_benchmark,
     run_simulate,
 )
+from src.simulator.main import AdaptiveSimulator
+from tests.assembler import add, assemble_b_type, assemble_r_type
 
 
 class FakeSection:
@@ -63,7 +66,7 @@ def test_load_program_image_uses_text_section(tmp_path, monkeypatch):
     monkeypatch.setattr("src.simulator.cli.ELFFile", lambda _: fake_elf)
 
     image = load_program_image(elf_path)
-    assert image.instructions == words
+    assert image.instructions.tolist() == words
     assert image.text_size == len(data)
 
 
@@ -102,6 +105,56 @@ def test_run_simulate_writes_summary(tmp_path, monkeypatch):
     assert summary["instructions_executed"] == 1
 
 
+def test_run_simulate_sampling_mode(tmp_path, monkeypatch):
+    elf_path = tmp_path / "program.elf"
+    elf_path.write_bytes(b"ELF")
+    output_path = tmp_path / "summary.json"
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"sampling": {"interval_size": 16}}), encoding="utf-8")
+
+    program_image = ProgramImage(instructions=[0x003100B3] * 64 + [0], text_size=260)
+    monkeypatch.setattr("src.simulator.cli.load_program_image", lambda _: program_image)
+
+    args = argparse.Namespace(elf_file=elf_path, config=config_path, output=output_path, verbose=False)
+
+    assert run_simulate(args) == 0
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    assert summary["reason"] == "halt"
+    assert summary["cycles"] == 64
+    assert summary["intervals"] == 4
+    assert summary["sim_time_error"] >= 0
+
+
+def test_run_simulate_samples_fast_forwarded_loops_in_full(tmp_path, monkeypatch):
+    elf_path = tmp_path / "program.elf"
+    elf_path.write_bytes(b"ELF")
+    output_path = tmp_path / "summary.json"
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps({"fast_forward_loops": True, "sampling": {"interval_size": 100}}), encoding="utf-8"
+    )
+
+    # x6 = 20 ** 3, then x5 counts up to it in steps of x2 = 10: 800 iterations.
+    program = [
+        assemble_r_type(1, 3, 3, 0b000, 6),
+        assemble_r_type(1, 3, 6, 0b000, 6),
+        add(5, 5, 2),
+        assemble_b_type(0b001, 5, 6, -4),
+        0,
+    ]
+    program_image = ProgramImage(instructions=program, text_size=20)
+    monkeypatch.setattr("src.simulator.cli.load_program_image", lambda _: program_image)
+
+    args = argparse.Namespace(elf_file=elf_path, config=config_path, output=output_path, verbose=False)
+
+    assert run_simulate(args) == 0
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    assert summary["cycles"] == 2 + 800 * 2
+    assert summary["intervals"] == 17
+
+
 def test_run_benchmark_synthetic(tmp_path):
     output_path = tmp_path / "benchmark.json"
 
@@ -122,3 +175,114 @@ def test_run_benchmark_synthetic(tmp_path):
     assert summary["instructions_executed"] >= args.instructions
     assert summary["mips"] > 0
     assert summary["elapsed_seconds"] > 0
+
+
+def test_run_benchmark_loop_workload(tmp_path):
+    output_path = tmp_path / "benchmark.json"
+    args = build_parser().parse_args(
+        ["benchmark", "--workload", "loop", "--instructions", "1000", "--output", str(output_path)]
+    )
+
+    assert run_benchmark(args) == 0
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    assert summary["halted"] is True
+    assert summary["cycles"] == 1 + 500 * 2
+
+
+def test_dram_size_config_bounds_synthetic_program(tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"dram_size": 8192}), encoding="utf-8")
+    args = argparse.Namespace(
+        elf_file=None,
+        instructions=3_000,
+        max_cycles=0,
+        config=config_path,
+        output=tmp_path / "benchmark.json",
+        verbose=False,
+    )
+
+    with pytest.raises(CLIError, match="2047 instructions"):
+        run_benchmark(args)
+
+    config_path.write_text(json.dumps({"dram_size": 1000}), encoding="utf-8")
+    with pytest.raises(CLIError, match="dram_size"):
+        run_benchmark(args)
+
+
+def test_run_simulate_loads_images(tmp_path, monkeypatch):
+    elf_path = tmp_path / "program.elf"
+    elf_path.write_bytes(b"ELF")
+    data_path = tmp_path / "data.bin"
+    data_path.write_bytes((0x2A).to_bytes(4, "little"))
+    output_path = tmp_path / "summary.json"
+
+    program_image = ProgramImage(instructions=[0], text_size=4)
+    monkeypatch.setattr("src.simulator.cli.load_program_image", lambda _: program_image)
+    loaded = []
+    original = AdaptiveSimulator.load_image
+
+    def load_image(simulator, path, address):
+        original(simulator, path, address)
+        loaded.append((simulator.bus.read_u32(address), simulator.dram.images))
+
+    monkeypatch.setattr(AdaptiveSimulator, "load_image", load_image)
+
+    args = build_parser().parse_args([
+        "simulate", str(elf_path), "--output", str(output_path),
+        "--image", f"{data_path}@0x1000", "--image", f"{data_path}@0x10000004",
+    ])
+    assert run_simulate(args) == 0
+
+    assert loaded[0][0] == 0x2A and len(loaded[0][1]) == 1  # mapped into DRAM
+    assert loaded[1][0] == 0x2A and len(loaded[1][1]) == 1  # copied into SPM
+    assert json.loads(output_path.read_text(encoding="utf-8"))["reason"] == "halt"
+
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["simulate", str(elf_path), "--image", "data.bin"])
+
+
+def test_run_simulate_reports_cache_statistics(tmp_path, monkeypatch):
+    elf_path = tmp_path / "program.elf"
+    elf_path.write_bytes(b"ELF")
+    output_path = tmp_path / "summary.json"
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"caches": {"l1i": {"size": 1024, "ways": 2}}}), encoding="utf-8")
+
+    program_image = ProgramImage(instructions=[0x003100B3] * 40 + [0], text_size=164)
+    monkeypatch.setattr("src.simulator.cli.load_program_image", lambda _: program_image)
+    args = argparse.Namespace(elf_file=elf_path, config=config_path, output=output_path, verbose=False)
+
+    assert run_simulate(args) == 0
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    assert summary["caches"]["l1i"] == {"hits": 37, "misses": 3, "miss_rate": 3 / 40}
+    assert summary["sim_time"] == 37 + 3 * (1 + 8 + 40)
+
+    config_path.write_text(json.dumps({"caches": {"l1i": {"ways": 3}}}), encoding="utf-8")
+    with pytest.raises(CLIError, match="Invalid cache configuration"):
+        run_simulate(args)
+
+
+def test_run_simulate_reports_dram_statistics(tmp_path, monkeypatch):
+    elf_path = tmp_path / "program.elf"
+    elf_path.write_bytes(b"ELF")
+    output_path = tmp_path / "summary.json"
+    config_path = tmp_path / "config.json"
+    config = {"caches": {"l2": None}, "dram": {"t_rcd": 3, "t_cas": 2, "t_rp": 5}}
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+
+    program_image = ProgramImage(instructions=[0x003100B3] * 40 + [0], text_size=164)
+    monkeypatch.setattr("src.simulator.cli.load_program_image", lambda _: program_image)
+    args = argparse.Namespace(elf_file=elf_path, config=config_path, output=output_path, verbose=False)
+
+    assert run_simulate(args) == 0
+
+    summary = json.loads(output_path.read_text(encoding="utf-8"))
+    # Three line fills from one DRAM row: the first opens it, the rest hit.
+    assert summary["dram"]["row_hits"] == 2 and summary["dram"]["row_empties"] == 1
+    assert summary["sim_time"] == 40 + (3 + 2) + 2 * 2
+
+    config_path.write_text(json.dumps({"dram": {"banks": 3}}), encoding="utf-8")
+    with pytest.raises(CLIError, match="Invalid DRAM configuration"):
+        run_simulate(args)
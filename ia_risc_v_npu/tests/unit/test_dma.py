@@ -0,0 +1,197 @@
+import asyncio
+
+import pytest
+
+from src.simulator.dma import (
+    CONTROL_IRQ_ENABLE,
+    DMA_CONTROL,
+    DMA_COMPLETED,
+    DMA_DOORBELL,
+    DMA_DST,
+    DMA_DST_STRIDE,
+    DMA_LENGTH,
+    DMA_ROWS,
+    DMA_SRC,
+    DMA_SRC_STRIDE,
+    DMA_STATUS,
+    STATUS_BUSY,
+    STATUS_DONE,
+    STATUS_ERROR,
+    STATUS_IRQ,
+    DMAEngine,
+)
+from src.simulator.interconnect import BusArbiter
+from src.simulator.main import DMA_BASE, SPM_BASE, AdaptiveSimulator
+from src.simulator.memory import SPM, Bus, PagedMemory
+from src.simulator.sampling import run_sampled_simulation
+from tests.assembler import add, assemble_b_type, assemble_lw, assemble_r_type, assemble_sw
+from tests.hooks import FixedLatencyHooks
+
+DMA_WINDOW = 0x3000
+
+
+class Clock:
+    def __init__(self):
+        self.cycle = 0
+
+    def __call__(self):
+        return self.cycle
+
+
+@pytest.fixture
+def system():
+    bus = Bus()
+    dram = PagedMemory(3 * 4096)
+    spm = SPM(size_kb=4)
+    bus.add_device("dram", dram, 0x0000, 0x2FFF)
+    bus.add_device("spm", spm, 0x4000, 0x4FFF)
+    return bus, dram, spm
+
+
+def program(bus, **registers):
+    offsets = {
+        "src": DMA_SRC, "dst": DMA_DST, "length": DMA_LENGTH, "rows": DMA_ROWS,
+        "src_stride": DMA_SRC_STRIDE, "dst_stride": DMA_DST_STRIDE, "control": DMA_CONTROL,
+    }
+    for name, value in registers.items():
+        bus.write_u32(DMA_WINDOW + offsets[name], value)
+    bus.write_u32(DMA_WINDOW + DMA_DOORBELL, 1)
+
+
+def test_copies_contiguous_and_strided_tiles(system):
+    bus, dram, spm = system
+    dma = DMAEngine(bus)
+    bus.add_device("dma", dma, DMA_WINDOW, DMA_WINDOW + 0xFF)
+    dram.write(0, bytes(range(256)))
+
+    program(bus, src=0, dst=0x4000, length=64)
+    assert spm.read(0, 64) == bytes(range(64))
+
+    # A 4x8 tile out of 32-byte DRAM rows, packed into SPM.
+    program(bus, src=4, dst=0x4100, length=8, rows=4, src_stride=32)
+    assert spm.read(0x100, 32) == b"".join(bytes(range(4 + 32 * row, 12 + 32 * row)) for row in range(4))
+
+    assert bus.read_u32(DMA_WINDOW + DMA_STATUS) == STATUS_DONE
+    assert bus.read_u32(DMA_WINDOW + DMA_COMPLETED) == 2
+    assert dma.bytes_transferred == 96
+    bus.write_u32(DMA_WINDOW + DMA_STATUS, STATUS_DONE)
+    assert bus.read_u32(DMA_WINDOW + DMA_STATUS) == 0
+
+
+def test_bad_addresses_set_error(system):
+    bus, _, _ = system
+    dma = DMAEngine(bus)
+    bus.add_device("dma", dma, DMA_WINDOW, DMA_WINDOW + 0xFF)
+    program(bus, src=0x4F00, dst=0, length=0x200)
+    assert bus.read_u32(DMA_WINDOW + DMA_STATUS) == STATUS_ERROR
+    assert dma.completed == 0
+    with pytest.raises(MemoryError, match="aligned"):
+        bus.read(DMA_WINDOW + DMA_STATUS, 2)
+
+
+def test_timed_transfers_overlap_and_interrupt(system):
+    bus, dram, spm = system
+    clock = Clock()
+    interrupts = []
+    dma = DMAEngine(bus, clock, bytes_per_cycle=8, setup_cycles=4, interrupt=interrupts.append)
+    bus.add_device("dma", dma, DMA_WINDOW, DMA_WINDOW + 0xFF)
+    dram.write(0, b"\x5a" * 128)
+
+    clock.cycle = 10
+    program(bus, src=0, dst=0x4000, length=64, control=CONTROL_IRQ_ENABLE)
+    program(bus, src=64, dst=0x4040, length=64)   # queued behind the first
+    assert spm.read(0, 128) == b"\x5a" * 128       # data is in place immediately
+    assert [(t.start, t.finish) for t in dma.in_flight] == [(10, 22), (22, 34)]
+
+    clock.cycle = 21
+    assert bus.read_u32(DMA_WINDOW + DMA_STATUS) == STATUS_BUSY
+    clock.cycle = 22
+    assert bus.read_u32(DMA_WINDOW + DMA_STATUS) == STATUS_BUSY | STATUS_DONE | STATUS_IRQ
+    dma.advance(40)
+    assert not dma.busy and dma.completed == 2
+    assert interrupts == [22, 34]
+
+
+# Copies 4KB from DRAM to the SPM, then polls STATUS until DONE.
+POLLING_PROGRAM = [
+    assemble_sw(1, 9, DMA_SRC),
+    assemble_sw(2, 9, DMA_DST),
+    assemble_sw(3, 9, DMA_LENGTH),
+    assemble_sw(4, 9, DMA_DOORBELL),
+    assemble_lw(8, 9, DMA_STATUS),                         # poll:
+    assemble_r_type(0, 7, 8, 0b111, 8),                    # and x8, x8, x7
+    assemble_b_type(0b000, 8, 0, -8),                      # beq x8, x0, poll
+    0,
+]
+
+
+def polling_simulator(**options):
+    simulator = AdaptiveSimulator(timing_hooks=FixedLatencyHooks(), **options)
+    simulator.load_program(POLLING_PROGRAM)
+    simulator.dram.write(0x8000, bytes(range(256)) * 16)
+    registers = simulator.risc_v_engine.registers
+    registers[1], registers[2], registers[3], registers[4] = 0x8000, SPM_BASE, 4096, 1
+    registers[7], registers[9] = STATUS_DONE, DMA_BASE
+    return simulator
+
+
+def test_simulator_program_polls_dma_while_it_runs():
+    dma_cycles = 16 + 4096 // 8
+
+    def run(**options):
+        simulator = polling_simulator(**options)
+        return simulator, asyncio.run(simulator.run_simulation())
+
+    functional, report = run()
+    assert functional.spm.read(0, 4096) == bytes(range(256)) * 16
+    assert report.instructions == 8  # completes at the doorbell, one poll
+
+    timed, report = run(device_timing=True)
+    assert timed.spm.read(0, 4096) == bytes(range(256)) * 16
+    assert report.halted and timed.dma.completed == 1
+    # One cycle per instruction: the doorbell rings after four, then the
+    # three-instruction poll loop spins until the transfer completes.
+    assert 4 + dma_cycles <= report.sim_time <= 4 + dma_cycles + 3
+    assert report.instructions == report.sim_time + 1
+
+    contended, _ = run(interconnect=BusArbiter())
+    assert contended.interconnect.stats()["dma"]["beats"] == 512
+
+
+def test_sampled_run_sees_polled_transfer_complete():
+    serial = asyncio.run(polling_simulator(device_timing=True).run_simulation())
+
+    simulator = polling_simulator(device_timing=True)
+    report = run_sampled_simulation(simulator, max_cycles=10 * serial.instructions, interval_size=64)
+
+    assert report.halted and report.reason == "halt"
+    assert report.instructions == serial.instructions
+    assert simulator.dma.completed == 1
+
+
+def test_run_simulation_retires_transfers_near_completion(monkeypatch):
+    monkeypatch.setattr("src.simulator.main.RUN_SLICE_INSTRUCTIONS", 64)
+    simulator = AdaptiveSimulator(timing_hooks=FixedLatencyHooks(latency=4), device_timing=True)
+    simulator.load_program([
+        add(5, 5, 6),                        # loop:
+        assemble_b_type(0b001, 5, 7, -4),    # bne x5, x7, loop
+        0,
+    ])
+    registers = simulator.risc_v_engine.registers
+    registers[6], registers[7] = 1, 1000
+    retired = []
+    simulator.dma.interrupt = lambda finish: retired.append((finish, simulator.sim_time))
+    registers_to_program = {
+        DMA_SRC: 0, DMA_DST: SPM_BASE, DMA_LENGTH: 4096, DMA_CONTROL: CONTROL_IRQ_ENABLE,
+    }
+    for offset, value in registers_to_program.items():
+        simulator.bus.write_u32(DMA_BASE + offset, value)
+    simulator.bus.write_u32(DMA_BASE + DMA_DOORBELL, 1)
+
+    report = asyncio.run(simulator.run_simulation())
+
+    assert report.halted
+    [(finish, sim_time)] = retired
+    # Slices are cut in instructions, so the transfer retires within one
+    # instruction (four cycles) of its completion, not a cycle-count's worth late.
+    assert finish <= sim_time <= finish + 4
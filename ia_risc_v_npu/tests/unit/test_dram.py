@@ -0,0 +1,117 @@
+import copy
+
+import numpy as np
+import pytest
+
+from src.simulator.cache import CacheHierarchy
+from src.simulator.dram import DRAMController
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.memory import Bus, PagedMemory
+
+
+def address(dram, bank, row, column=0):
+    return ((row * dram.banks + bank) * dram.row_size) + column
+
+
+def test_row_buffer_latencies():
+    dram = DRAMController(banks=4, row_size=1024, t_rcd=3, t_cas=2, t_rp=5)
+
+    assert dram.access(address(dram, 1, 7)) == 3 + 2          # bank closed
+    assert dram.access(address(dram, 1, 7, 512)) == 2         # open row
+    assert dram.access(address(dram, 2, 9)) == 3 + 2          # other bank untouched
+    assert dram.access(address(dram, 1, 8)) == 5 + 3 + 2      # row conflict
+    assert dram.open_rows.tolist() == [-1, 8, 9, -1]
+    assert (dram.row_hits, dram.row_empties, dram.row_conflicts) == (1, 2, 1)
+    assert dram.row_hit_rate == 0.25
+    assert dram.now == 5 + 2 + 5 + 10
+
+
+def test_refresh_closes_rows_and_stalls():
+    dram = DRAMController(t_rcd=3, t_cas=2, t_rp=5, t_refi=100, t_rfc=10)
+    dram.access(0)
+    assert dram.access(0, cycle=50) == 2
+    assert dram.access(0, cycle=104) == (10 - 4) + 3 + 2     # waits out the refresh, row was closed
+    assert dram.access(0, cycle=350) == 3 + 2                 # two refreshes passed, no stall
+    assert dram.stats() == {
+        "accesses": 4,
+        "row_hits": 1,
+        "row_empties": 3,
+        "row_conflicts": 0,
+        "row_hit_rate": 0.25,
+        "refreshes": 3,
+        "refresh_stall_cycles": 6,
+    }
+
+
+def traffic(seed):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([
+        rng.integers(0, 1 << 20, 1500),
+        np.arange(0, 1 << 16, 64),                 # streaming, mostly row hits
+        np.repeat(rng.integers(0, 1 << 18, 200), 4),
+    ])
+
+
+@pytest.mark.parametrize("timed", [False, True])
+def test_batch_matches_sequential_accesses(timed):
+    addresses = traffic(3)
+    cycles = np.cumsum(np.random.default_rng(4).integers(0, 60, len(addresses))) if timed else None
+    sequential = DRAMController(t_refi=1000, t_rfc=90)
+    batched = copy.deepcopy(sequential)
+
+    expected = [
+        sequential.access(int(a), None if cycles is None else int(cycles[i]))
+        for i, a in enumerate(addresses)
+    ]
+    split = 1234
+    latencies = np.concatenate([
+        batched.access_batch(addresses[:split], None if cycles is None else cycles[:split]),
+        batched.access_batch(addresses[split:], None if cycles is None else cycles[split:]),
+    ])
+
+    assert latencies.tolist() == expected
+    assert batched.stats() == sequential.stats()
+    assert sequential.refreshes > 10 and sequential.refresh_stall_cycles > 0
+    assert batched.now == sequential.now
+    assert np.array_equal(batched.open_rows, sequential.open_rows)
+
+
+def test_cache_misses_are_timed_by_dram():
+    dram = DRAMController(t_rcd=3, t_cas=2, t_rp=5)
+    caches = CacheHierarchy(l2=None, shared_l2=False, dram=dram)
+    batched = copy.deepcopy(caches)
+
+    pcs = [0x0, 0x40, 0x800, 0x40, 0x0, 0x8000]
+    expected = [caches.fetch(pc) for pc in pcs]
+
+    assert expected == [1 + 5, 1 + 2, 1 + 5, 1, 1, 1 + 10]
+    assert batched.fetch_batch(pcs).tolist() == expected
+    assert batched.dram.stats() == dram.stats()
+
+
+def test_bus_and_hooks_use_dram_timing():
+    dram = DRAMController(t_rcd=3, t_cas=2, t_rp=5)
+    bus = Bus()
+    bus.add_device("dram", PagedMemory(1 << 20), 0x8000_0000, 0x800F_FFFF, timing=dram)
+    bus.add_device("spm", bytearray(64), 0x1000, 0x103F)
+
+    assert bus.access_latency(0x8000_0000) == 5
+    assert bus.access_latency(0x1000) == 0
+    assert bus.access_latency_batch([0x8000_0004, 0x1000, 0x8000_0000 + 8 * 2048]).tolist() == [2, 0, 10]
+    assert dram.open_rows[0] == 1  # device-local addresses
+
+    hooks = TimingHookSystem(buffer_size=2, dram=DRAMController(t_rcd=3, t_cas=2, t_rp=5))
+    assert [hooks.memory_hook(a, 4, False) for a in (0, 4, 8 * 2048)] == [5, 2, 10]
+    assert hooks.counters["memory"] == 2
+    assert hooks.dram.row_conflicts == 1
+
+
+def test_from_config_validates_options():
+    dram = DRAMController.from_config({"banks": 16, "t_cas": 10})
+    assert (dram.banks, dram.t_cas) == (16, 10)
+    with pytest.raises(ValueError, match="Unknown DRAM options"):
+        DRAMController.from_config({"channels": 2})
+    with pytest.raises(ValueError, match="powers of two"):
+        DRAMController(banks=6)
+    with pytest.raises(ValueError, match="Refresh interval"):
+        DRAMController(t_refi=100, t_rfc=100)
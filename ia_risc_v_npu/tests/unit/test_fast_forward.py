@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+from src.risc_v.engine import RISCVEngine, StopReason
+from src.simulator.cache import CacheHierarchy
+from src.simulator.fast_forward import LoopFastForwarder
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.latency import LATENCY_TABLE
+from src.simulator.main import AdaptiveSimulator
+from src.simulator.memory import Bus
+from tests.assembler import add, assemble_b_type, assemble_sw, mul
+from tests.hooks import FixedLatencyHooks
+
+
+BEQ, BNE, BLT, BGE, BLTU, BGEU = 0b000, 0b001, 0b100, 0b101, 0b110, 0b111
+
+
+def counted_loop(funct3, rs1, rs2):
+    # x5 and x8 are induction variables, x9 a loop constant.
+    return [
+        add(8, 8, 7),                          # 0x00: x8 += x7
+        mul(9, 6, 7),                          # 0x04: x9 = x6 * x7
+        add(5, 5, 6),                          # 0x08: x5 += x6
+        assemble_b_type(funct3, rs1, rs2, -12),  # 0x0c
+        add(10, 5, 8),                         # 0x10: x10 = x5 + x8
+        0,
+    ]
+
+
+def make_engine(program, registers):
+    dram = bytearray(4096)
+    bus = Bus()
+    bus.add_device("dram", dram, 0, len(dram) - 1)
+    engine = RISCVEngine(bus, register_backend="int")
+    for index, word in enumerate(program):
+        bus.write(index * 4, word.to_bytes(4, 'little'))
+    for register, value in registers.items():
+        engine.registers[register] = value & 0xFFFFFFFF
+    return engine
+
+
+LOOP_CASES = [
+    # (branch, rs1, rs2, {register: value})
+    (BNE, 5, 11, {6: 1, 7: 3, 11: 1000}),
+    (BNE, 5, 11, {5: 7, 6: -3, 7: 1, 11: 7 - 3 * 400}),
+    (BNE, 11, 5, {6: 0x10, 7: 2, 11: 0x4000}),
+    (BLT, 5, 11, {5: -50, 6: 3, 7: 1, 11: 100}),
+    (BLT, 11, 5, {5: 100, 6: -7, 7: 1, 11: -20}),
+    (BGE, 5, 11, {5: 500, 6: -4, 7: 5, 11: 13}),
+    (BGE, 11, 5, {5: -9, 6: 2, 7: 1, 11: 200}),
+    (BLTU, 5, 11, {5: 3, 6: 5, 7: 1, 11: 0x1000}),
+    (BGEU, 5, 11, {5: 0x900, 6: -16, 7: 1, 11: 0x20}),
+    (BEQ, 5, 11, {5: 1, 6: 1, 7: 1, 11: 2}),
+]
+
+
+@pytest.mark.parametrize("branch, rs1, rs2, registers", LOOP_CASES)
+def test_fast_forward_matches_stepped_execution(branch, rs1, rs2, registers):
+    program = counted_loop(branch, rs1, rs2)
+    reference = make_engine(program, registers)
+    reference_result = reference.run()
+
+    engine = make_engine(program, registers)
+    fast_forwarder = LoopFastForwarder(engine)
+    result = engine.run()
+
+    assert result.reason is reference_result.reason is StopReason.HALT
+    assert engine.registers == reference.registers
+    assert engine.pc == reference.pc
+    assert engine.instruction_count == reference.instruction_count
+    assert result.executed + fast_forwarder.skipped_instructions == reference_result.executed
+
+
+def test_skipped_latency_follows_latency_table():
+    engine = make_engine(counted_loop(BNE, 5, 11), {6: 1, 7: 1, 11: 100})
+    fast_forwarder = LoopFastForwarder(engine)
+
+    engine.run()
+
+    per_iteration = LATENCY_TABLE["ADD"] * 2 + LATENCY_TABLE["MUL"] + LATENCY_TABLE["BNE"]
+    assert fast_forwarder.loops_fast_forwarded == 1
+    assert fast_forwarder.skipped_instructions == 99 * 4  # only the first iteration runs
+    assert fast_forwarder.skipped_latency == 99 * per_iteration
+
+
+def test_loops_with_memory_access_are_not_skipped():
+    program = [
+        assemble_sw(5, 0, 0x100),              # 0x00: mem[0x100] = x5
+        add(5, 5, 6),                          # 0x04
+        assemble_b_type(BNE, 5, 11, -8),       # 0x08
+        0,
+    ]
+    engine = make_engine(program, {6: 1, 11: 10})
+    fast_forwarder = LoopFastForwarder(engine)
+
+    engine.run()
+
+    assert fast_forwarder.skipped_instructions == 0
+    assert engine.registers[5] == 10
+    assert engine.bus.read(0x100, 4) == (9).to_bytes(4, 'little')
+
+
+def test_unsolvable_exit_runs_normally():
+    # x5 steps by 2 and never equals the odd bound, so the loop would spin
+    # forever; the fast-forwarder must not pretend it terminates.
+    engine = make_engine(counted_loop(BNE, 5, 11), {6: 2, 7: 1, 11: 7})
+    fast_forwarder = LoopFastForwarder(engine)
+
+    result = engine.run(1000)
+
+    assert result.reason is StopReason.LIMIT
+    assert fast_forwarder.skipped_instructions == 0
+
+
+def test_instruction_allowance_caps_skipping():
+    registers = {6: 1, 7: 1, 11: 1000}
+    engine = make_engine(counted_loop(BNE, 5, 11), registers)
+    fast_forwarder = LoopFastForwarder(engine)
+    fast_forwarder.instruction_allowance = 41
+
+    engine.run(20)
+
+    assert fast_forwarder.skipped_instructions == 40
+    assert fast_forwarder.instruction_allowance == 1
+    assert engine.pc == 0  # still inside the loop
+    assert engine.registers[5] == engine.instruction_count // 4
+
+
+def test_rewritten_loop_is_reanalysed():
+    engine = make_engine(counted_loop(BNE, 5, 11), {6: 1, 7: 1, 11: 10})
+    fast_forwarder = LoopFastForwarder(engine)
+    engine.run()
+    assert fast_forwarder.analyse(0x0C) is not None
+
+    engine.bus.write(0x00, assemble_sw(5, 0, 0x100).to_bytes(4, 'little'))
+
+    assert fast_forwarder.analyse(0x0C) is None
+
+
+def test_fetch_latency_charges_skipped_instructions():
+    engine = make_engine(counted_loop(BNE, 5, 11), {6: 1, 7: 1, 11: 100})
+    fast_forwarder = LoopFastForwarder(engine, fetch_latency=3)
+
+    engine.run()
+
+    assert fast_forwarder.skipped_latency == 3 * fast_forwarder.skipped_instructions
+
+
+@pytest.mark.parametrize(
+    "make_hooks",
+    [FixedLatencyHooks, lambda: TimingHookSystem(caches=CacheHierarchy())],
+    ids=["fixed", "caches"],
+)
+def test_simulator_credits_skipped_loops(make_hooks):
+    program = counted_loop(BNE, 5, 11)
+    registers = {6: 1, 7: 1, 11: 5000}
+
+    reports = []
+    for fast_forward_loops in (False, True):
+        simulator = AdaptiveSimulator(fast_forward_loops=fast_forward_loops, timing_hooks=make_hooks())
+        simulator.load_program(program)
+        for register, value in registers.items():
+            simulator.risc_v_engine.registers[register] = value
+        reports.append((simulator, asyncio.run(simulator.run_simulation())))
+
+    (plain, plain_report), (fast, fast_report) = reports
+    assert fast_report.halted
+    assert fast_report.cycles == plain_report.cycles
+    assert fast_report.instructions == plain_report.instructions
+    assert fast.risc_v_engine.registers == plain.risc_v_engine.registers
+    assert fast.loop_fast_forwarder.skipped_instructions > 0
+    # Skipped iterations cost what their (hot) fetches cost in the live run.
+    assert fast_report.sim_time == plain_report.sim_time
+
+
+def test_simulator_respects_max_cycles_with_fast_forward():
+    simulator = AdaptiveSimulator(fast_forward_loops=True)
+    simulator.load_program(counted_loop(BNE, 5, 11))
+    simulator.risc_v_engine.registers[6] = 1
+    simulator.risc_v_engine.registers[7] = 1
+    simulator.risc_v_engine.registers[11] = 10_000_000
+
+    report = asyncio.run(simulator.run_simulation(max_cycles=100_000))
+
+    assert report.reason == "max_cycles_reached"
+    assert report.cycles == 100_000
@@ -0,0 +1,139 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.simulator.interconnect import BusArbiter
+from src.simulator.main import AdaptiveSimulator
+from tests.hooks import FixedLatencyHooks
+
+ADD = 0x003100B3
+
+
+def reference_finish(masters, cycles, sizes, *, count, policy, width, burst):
+    """Grant bursts one at a time from cycle 0, idling when nobody is waiting."""
+    beats = [max(1, -(-size // width)) for size in sizes]
+    remaining = list(beats)
+    finish = [0] * len(cycles)
+    queues = [[] for _ in range(count)]
+    arrivals = sorted(range(len(cycles)), key=lambda index: cycles[index])
+    now = pointer = done = 0
+    while done < len(cycles):
+        while arrivals and cycles[arrivals[0]] <= now:
+            index = arrivals.pop(0)
+            queues[masters[index]].append(index)
+        waiting = [master for master in range(count) if queues[master]]
+        if not waiting:
+            now = cycles[arrivals[0]]
+            continue
+        if policy == "priority":
+            master = waiting[0]
+        else:
+            master = min(waiting, key=lambda m: (m - pointer) % count)
+        pointer = (master + 1) % count
+        index = queues[master][0]
+        grant = min(burst, remaining[index])
+        now += grant
+        remaining[index] -= grant
+        if not remaining[index]:
+            finish[index] = now
+            queues[master].pop(0)
+            done += 1
+    return finish
+
+
+def test_round_robin_interleaves_bursts():
+    arbiter = BusArbiter(masters=("cpu", "dma"), width=8, burst=2)
+    result = arbiter.arbitrate([1, 0], [0, 1], [64, 4])
+
+    # The DMA holds the bus for one burst, then the CPU fetch slips in.
+    assert result.start.tolist() == [0, 2]
+    assert result.finish.tolist() == [9, 3]
+    assert result.delay.tolist() == [1, 1]
+    assert result.master_delay(0) == 1
+    assert arbiter.stats()["dma"] == {"transactions": 1, "beats": 8, "queueing_delay": 1}
+
+
+def test_priority_lets_first_master_win():
+    arbiter = BusArbiter(masters=("dma", "cpu"), policy="priority", width=8, burst=2)
+    result = arbiter.arbitrate([0, 1], [0, 1], [64, 4])
+    assert result.finish.tolist() == [8, 9]
+    assert result.delay.tolist() == [0, 7]
+
+
+@pytest.mark.parametrize("policy", ["round_robin", "priority"])
+def test_batch_matches_reference(policy):
+    rng = np.random.default_rng(7)
+    count = 3000
+    masters = rng.integers(0, 3, count)
+    sizes = np.where(masters == 0, 4, rng.integers(1, 256, count))
+    cycles = np.sort(rng.integers(0, 40 * count, count))
+    rng.shuffle(cycles[:500])  # out-of-order submission is sorted internally
+
+    arbiter = BusArbiter(policy=policy, width=8, burst=4)
+    result = arbiter.arbitrate(masters, cycles, sizes)
+
+    expected = reference_finish(
+        masters.tolist(), cycles.tolist(), sizes.tolist(), count=3, policy=policy, width=8, burst=4
+    )
+    assert result.finish.tolist() == expected
+    assert (result.delay >= 0).all() and result.delay.sum() > 0
+    assert arbiter.busy_until == max(expected)
+    assert arbiter.queueing_delay.sum() == result.delay.sum()
+
+
+def test_drain_arbitrates_submitted_transactions():
+    arbiter = BusArbiter(width=4, burst=1)
+    arbiter.submit("dma", 0, 16)
+    arbiter.submit_batch("cpu", [1, 2], 4)
+
+    result = arbiter.drain()
+
+    assert result.masters.tolist() == [2, 0, 0]
+    assert result.finish.tolist() == [6, 2, 4]  # single-beat bursts alternate with the DMA
+    assert arbiter.drain().finish.size == 0
+    with pytest.raises(ValueError, match="Unknown bus master"):
+        arbiter.submit("gpu", 0, 4)
+    with pytest.raises(ValueError, match="Unknown interconnect options"):
+        BusArbiter.from_config({"lanes": 2})
+
+
+def test_simulator_adds_cpu_queueing_delay_to_sim_time():
+    program = [ADD] * 20 + [0]
+
+    baseline = AdaptiveSimulator(timing_hooks=FixedLatencyHooks(), interconnect=BusArbiter())
+    baseline.load_program(program)
+    quiet = asyncio.run(baseline.run_simulation())
+
+    contended = AdaptiveSimulator(timing_hooks=FixedLatencyHooks(), interconnect=BusArbiter(burst=4))
+    contended.interconnect.submit("dma", 0, 256)  # 32 beats in 8 bursts
+    contended.load_program(program)
+    report = asyncio.run(contended.run_simulation())
+
+    assert quiet.sim_time == 20
+    stats = contended.interconnect.stats()
+    assert stats["cpu"]["transactions"] == 20
+    assert report.sim_time == 20 + stats["cpu"]["queueing_delay"]
+    assert stats["cpu"]["queueing_delay"] > 0
+
+
+def test_repeated_runs_report_the_same_sim_time():
+    simulator = AdaptiveSimulator(timing_hooks=FixedLatencyHooks(), interconnect=BusArbiter(burst=4))
+    runs = []
+    for _ in range(2):
+        simulator.load_program([ADD] * 20 + [0])
+        simulator.interconnect.submit("dma", 0, 256)
+        runs.append(asyncio.run(simulator.run_simulation()).sim_time)
+
+    snapshot = simulator.snapshot()
+    simulator.load_program([ADD] * 20 + [0])
+    simulator.interconnect.submit("dma", 0, 256)
+    forked = asyncio.run(simulator.run_simulation()).sim_time
+    simulator.restore(snapshot)
+    simulator.load_program([ADD] * 20 + [0])
+    simulator.interconnect.submit("dma", 0, 256)
+    again = asyncio.run(simulator.run_simulation()).sim_time
+
+    assert runs[0] > 20  # the DMA burst delays the CPU
+    assert runs == [forked, again] == [runs[0]] * 2
+    assert simulator.interconnect.snapshot() != snapshot.interconnect
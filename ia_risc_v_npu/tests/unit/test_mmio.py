@@ -0,0 +1,129 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.npu.model import NPU
+from src.simulator.main import NPU_MMIO_BASE, SPM_BASE, AdaptiveSimulator
+from src.simulator.memory import SPM, Bus
+from src.simulator.mmio import (
+    MMIO,
+    NPU_COMPLETED,
+    NPU_DESCRIPTOR_DTYPE,
+    NPU_DOORBELL,
+    NPU_OPCODES,
+    NPU_QUEUE_BASE,
+    NPU_QUEUE_HEAD,
+    NPU_QUEUE_SIZE,
+    NPU_QUEUE_TAIL,
+    NPU_STATUS,
+    NPU_STATUS_DONE,
+    NPU_STATUS_ERROR,
+)
+from tests.assembler import assemble_sw
+
+REGS = 0x8000
+SPM_START = 0x1000
+
+
+@pytest.fixture
+def system():
+    bus = Bus()
+    spm = SPM(size_kb=16)
+    npu = NPU(pool_size=1, max_array_size=(1,))
+    bus.add_device("spm", spm, SPM_START, SPM_START + spm.size - 1)
+    bus.add_device("mmio", MMIO(npu, bus), REGS, REGS + 0xFFF)
+    return bus, spm, npu
+
+
+def descriptor(op, a, b, dst, rows, cols):
+    entry = np.zeros(1, dtype=NPU_DESCRIPTOR_DTYPE)
+    entry[0] = (NPU_OPCODES.index(op), a, b, dst, rows, cols, (0, 0))
+    return entry.tobytes()
+
+
+def store(bus, address, array):
+    bus.write(address, np.ascontiguousarray(array, dtype="<f4").tobytes())
+
+
+def load(bus, address, shape):
+    return np.frombuffer(bus.read(address, int(np.prod(shape)) * 4), dtype="<f4").reshape(shape)
+
+
+def test_registers_use_the_bus_device_interface(system):
+    bus, _, npu = system
+    bus.write_u32(REGS + 0x40, 0xCAFEF00D)
+    bus.write(REGS + 0x44, b"\x01\x00\x00\x00\x02\x00\x00\x00")
+    assert bus.read_u32(REGS + 0x40) == 0xCAFEF00D
+    assert bus.read(REGS + 0x44, 8) == b"\x01\x00\x00\x00\x02\x00\x00\x00"
+    assert npu.internal_registers == {0x40: 0xCAFEF00D, 0x44: 1, 0x48: 2}
+    with pytest.raises(MemoryError, match="aligned"):
+        bus.write(REGS + 0x42, b"\x00\x00")
+
+
+def test_doorbell_drains_the_ring_in_one_batch(system):
+    bus, _, npu = system
+    ring = SPM_START
+    a = np.arange(12, dtype=np.float32).reshape(3, 4)
+    b = np.full((3, 4), 2, dtype=np.float32)
+    store(bus, 0x2000, a)
+    store(bus, 0x2100, b)
+    # Four-entry ring; the two queued descriptors wrap from slot 3 to slot 0.
+    bus.write(ring + 3 * 32, descriptor("v_add", 0x2000, 0x2100, 0x2200, 3, 4))
+    bus.write(ring + 0 * 32, descriptor("v_mul", 0x2200, 0x2100, 0x2300, 3, 4))
+    for offset, value in ((NPU_QUEUE_BASE, ring), (NPU_QUEUE_SIZE, 4), (NPU_QUEUE_HEAD, 3), (NPU_QUEUE_TAIL, 1)):
+        bus.write_u32(REGS + offset, value)
+
+    bus.write_u32(REGS + NPU_DOORBELL, 1)
+
+    assert np.array_equal(load(bus, 0x2200, (3, 4)), a + b)
+    assert np.array_equal(load(bus, 0x2300, (3, 4)), (a + b) * b)
+    assert bus.read_u32(REGS + NPU_QUEUE_HEAD) == 1
+    assert bus.read_u32(REGS + NPU_COMPLETED) == 2
+    assert bus.read_u32(REGS + NPU_STATUS) == NPU_STATUS_DONE
+    assert npu.execution_status == "done"
+
+    bus.write_u32(REGS + NPU_STATUS, NPU_STATUS_DONE)
+    bus.write_u32(REGS + NPU_DOORBELL, 1)  # empty queue: nothing runs
+    assert bus.read_u32(REGS + NPU_COMPLETED) == 2
+
+
+def test_failing_descriptor_stops_the_batch(system):
+    bus, _, npu = system
+    ring = SPM_START
+    store(bus, 0x2000, np.ones(4))
+    bus.write(ring, descriptor("v_sub", 0x2000, 0x2000, 0x2100, 1, 4))
+    bus.write(ring + 32, descriptor("v_add", 0x2000, 0xFFFF00, 0x2100, 1, 4))  # unmapped operand
+    bus.write(ring + 64, descriptor("v_add", 0x2000, 0x2000, 0x2200, 1, 4))
+    for offset, value in ((NPU_QUEUE_BASE, ring), (NPU_QUEUE_SIZE, 8), (NPU_QUEUE_TAIL, 3)):
+        bus.write_u32(REGS + offset, value)
+
+    bus.write_u32(REGS + NPU_DOORBELL, 1)
+
+    assert bus.read_u32(REGS + NPU_STATUS) == NPU_STATUS_ERROR
+    assert bus.read_u32(REGS + NPU_QUEUE_HEAD) == 1
+    assert bus.read_u32(REGS + NPU_COMPLETED) == 1
+    assert np.array_equal(load(bus, 0x2100, (1, 4)), np.zeros((1, 4)))
+    assert npu.execution_status == "error"
+
+
+def test_cpu_rings_the_doorbell():
+    simulator = AdaptiveSimulator()
+    bus = simulator.bus
+    store(bus, SPM_BASE + 0x100, np.arange(8))
+    store(bus, SPM_BASE + 0x200, np.arange(8))
+    bus.write(SPM_BASE, descriptor("v_add", SPM_BASE + 0x100, SPM_BASE + 0x200, SPM_BASE + 0x300, 2, 4))
+    bus.write_u32(NPU_MMIO_BASE + NPU_QUEUE_BASE, SPM_BASE)
+    bus.write_u32(NPU_MMIO_BASE + NPU_QUEUE_SIZE, 16)
+    simulator.load_program([
+        assemble_sw(1, 9, NPU_QUEUE_TAIL),
+        assemble_sw(1, 9, NPU_DOORBELL),
+        0,
+    ])
+    registers = simulator.risc_v_engine.registers
+    registers[1], registers[9] = 1, NPU_MMIO_BASE
+
+    asyncio.run(simulator.run_simulation())
+
+    assert np.array_equal(load(bus, SPM_BASE + 0x300, (2, 4)), 2 * np.arange(8).reshape(2, 4))
+    assert simulator.snapshot().npu_registers[NPU_COMPLETED] == 1
@@ -92,3 +92,11 @@ def test_pool_overflow(npu):
     # Try to return the extra array - should not be added as pool is full
     npu.return_array_to_pool(extra_arr)
     assert len(npu._array_pool) == initial_pool_size
+
+def test_execute_into_writes_output_buffer(npu):
+    out = np.empty(3, dtype=np.float32)
+    result = npu.execute_into("v_sub", np.array([5, 7, 9]), np.array([1, 2, 3]), out)
+    assert result is out
+    assert np.array_equal(out, np.array([4, 5, 6]))
+    with pytest.raises(ValueError, match="Unknown NPU operation type"):
+        npu.execute_into("v_pow", out, out, out)
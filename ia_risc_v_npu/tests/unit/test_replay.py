@@ -0,0 +1,186 @@
+import asyncio
+import pickle
+
+import numpy as np
+from src.risc_v.trace_file import EXECUTION_TRACE_DTYPE, ExecutionTraceWriter, read_execution_trace
+from src.simulator.cache import CacheHierarchy, SetAssociativeCache
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.latency import LATENCY_TABLE
+from src.simulator.main import SPM_BASE, AdaptiveSimulator
+from src.simulator.replay import (
+    LatencyConfig,
+    PipelineModel,
+    fetch_latencies,
+    replay_trace,
+    retime,
+    retime_trace,
+    trace_histogram,
+)
+from tests.assembler import add, assemble_b_type, assemble_lw, assemble_sw, mul
+
+
+LOOP_PROGRAM = [
+    assemble_lw(8, 9, 0),                  # 0x00: x8 = mem[x9]
+    add(8, 8, 5),                          # 0x04: load-use on x8
+    mul(10, 8, 6),                         # 0x08
+    assemble_sw(10, 9, 0),                 # 0x0c
+    add(5, 5, 6),                          # 0x10
+    assemble_b_type(0b001, 5, 7, -20),     # 0x14: bne x5, x7, loop
+    0,
+]
+TRIPS = 4000
+
+
+def record_run(tmp_path, hooks, program=LOOP_PROGRAM, registers=None):
+    path = tmp_path / "loop.trace"
+    with ExecutionTraceWriter(path) as writer:
+        simulator = AdaptiveSimulator(timing_hooks=hooks, trace=writer)
+        simulator.load_program(program)
+        for index, value in {6: 1, 7: TRIPS, 9: 0x8000, **(registers or {})}.items():
+            simulator.risc_v_engine.registers[index] = value
+        report = asyncio.run(simulator.run_simulation())
+    return report, read_execution_trace(path)
+
+
+def test_replay_reproduces_live_sim_time(tmp_path):
+    hooks = TimingHookSystem(buffer_size=30_000)
+    replay_hooks = pickle.loads(pickle.dumps(hooks))
+    report, records = record_run(tmp_path, hooks)
+
+    result = replay_trace(records, timing_hooks=replay_hooks)
+
+    assert result.instructions == report.cycles == 6 * TRIPS
+    assert result.sim_time == report.sim_time
+    assert result.icache_misses == int(replay_hooks.random_choices[:6 * TRIPS].sum())
+    assert result.memory_accesses == 2 * TRIPS
+    assert result.memory_cycles == 2 * TRIPS * TimingHookSystem.MEMORY_ACCESS_LATENCY
+    per_iteration = (
+        LATENCY_TABLE["LW"] + LATENCY_TABLE["SW"] + 2 * LATENCY_TABLE["ADD"]
+        + LATENCY_TABLE["MUL"] + LATENCY_TABLE["BNE"]
+    )
+    assert result.execute_cycles == per_iteration * TRIPS
+
+
+def test_replay_reproduces_cache_model_sim_time(tmp_path):
+    hooks = TimingHookSystem(caches=CacheHierarchy(l1i=SetAssociativeCache(size=256, ways=2)))
+    replay_hooks = pickle.loads(pickle.dumps(hooks))
+    report, records = record_run(tmp_path, hooks)
+
+    result = replay_trace(records, timing_hooks=replay_hooks)
+
+    assert result.sim_time == report.sim_time
+    assert result.icache_misses == hooks.caches.l1i.misses
+    assert hooks.caches.l1d.accesses == result.memory_accesses == 2 * TRIPS
+    assert replay_hooks.caches.l1i.accesses == 0  # replay works on a copy
+
+
+def test_spm_accesses_bypass_the_cache_model(tmp_path):
+    def make_hooks():
+        return TimingHookSystem(caches=CacheHierarchy())
+
+    hooks, replay_hooks = make_hooks(), make_hooks()
+    program = [assemble_sw(6, 11, 0), assemble_lw(8, 11, 0), assemble_lw(8, 9, 0), 0]
+    report, records = record_run(tmp_path, hooks, program, {11: SPM_BASE})
+
+    result = replay_trace(records, timing_hooks=replay_hooks)
+
+    assert hooks.caches.l1d.accesses == 1
+    assert result.memory_accesses == 3
+    assert result.sim_time == report.sim_time
+    assert result.memory_cycles == (
+        2 * TimingHookSystem.UNCACHED_ACCESS_LATENCY + CacheHierarchy().data(0x8000)
+    )
+
+
+def test_replay_charges_the_next_fetch(tmp_path):
+    # Straight-line code over four 16-byte lines: every instruction fetches
+    # its successor, so the line holding the halt is fetched (and missed) too.
+    def make_hooks():
+        return TimingHookSystem(caches=CacheHierarchy(
+            l1i=SetAssociativeCache(size=64, line_size=16, ways=1), shared_l2=False, memory_latency=20,
+        ))
+
+    hooks, replay_hooks = make_hooks(), make_hooks()
+    report, records = record_run(tmp_path, hooks, [add(1, 1, 2)] * 12 + [0])
+
+    result = replay_trace(records, timing_hooks=replay_hooks)
+    histogram = trace_histogram(records, timing_hooks=replay_hooks)
+
+    assert hooks.caches.l1i.misses == 4
+    assert result.sim_time == report.sim_time == 12 + 4 * 20
+    assert result.icache_misses == histogram.icache_misses.sum() == 4
+
+
+def test_replay_pipeline_model(tmp_path):
+    _, records = record_run(tmp_path, TimingHookSystem())
+    result = replay_trace(records, pipeline=PipelineModel(load_use_penalty=1, taken_branch_penalty=3))
+
+    # One load-use stall per iteration; every branch but the last is taken.
+    assert result.pipeline_stalls == TRIPS + 3 * (TRIPS - 1)
+
+
+def test_replay_with_custom_latencies():
+    records = np.zeros(3, dtype=EXECUTION_TRACE_DTYPE)
+    records["pc"] = [0, 4, 8]
+    records["instruction"] = [add(1, 2, 3), mul(1, 2, 3), 0]
+
+    result = replay_trace(records, latency_table={"ADD": 2, "MUL": 7})
+
+    assert result.instructions == 2
+    assert result.execute_cycles == 9
+
+
+def test_fetch_latencies_fall_back_to_hits_after_buffer():
+    hooks = TimingHookSystem(buffer_size=4)
+    hooks.random_choices[:] = True
+
+    latencies = fetch_latencies(6, hooks, fetch_counter=2)
+
+    assert list(latencies) == [10, 10, 1, 1, 1, 1]
+
+
+def test_retime_trace_matches_per_config_replay(tmp_path):
+    hooks = TimingHookSystem(buffer_size=30_000)
+    _, records = record_run(tmp_path, hooks)
+    configs = [
+        LatencyConfig(),
+        LatencyConfig(icache_miss_latency=20, memory_access_latency=5),
+        LatencyConfig(latency_table={**LATENCY_TABLE, "MUL": 1}, icache_hit_latency=2),
+    ]
+
+    totals = retime_trace(records, configs, timing_hooks=hooks)
+
+    assert totals.shape == (3,)
+    for config, total in zip(configs, totals):
+        hooks_for_config = pickle.loads(pickle.dumps(hooks))
+        hooks_for_config.ICACHE_HIT_LATENCY = config.icache_hit_latency
+        hooks_for_config.ICACHE_MISS_LATENCY = config.icache_miss_latency
+        hooks_for_config.MEMORY_ACCESS_LATENCY = config.memory_access_latency
+        result = replay_trace(records, timing_hooks=hooks_for_config, latency_table=config.latency_table)
+        assert total == result.sim_time + result.execute_cycles
+
+
+def test_retime_without_execute_latency_reproduces_live_sim_time(tmp_path):
+    hooks = TimingHookSystem(buffer_size=30_000)
+    replay_hooks = pickle.loads(pickle.dumps(hooks))
+    report, records = record_run(tmp_path, hooks)
+
+    live, full = retime_trace(
+        records, [LatencyConfig(charge_execute=False), LatencyConfig()], timing_hooks=replay_hooks
+    )
+
+    assert live == report.sim_time
+    assert full - live == replay_trace(records, timing_hooks=replay_hooks).execute_cycles
+
+
+def test_trace_histogram_splits_intervals(tmp_path):
+    _, records = record_run(tmp_path, TimingHookSystem())
+
+    histogram = trace_histogram(records, interval_size=1000)
+    per_interval = retime(histogram, [LatencyConfig(), LatencyConfig(memory_access_latency=5)])
+
+    assert histogram.executed.shape == (24, len(histogram.mnemonics))
+    assert list(histogram.instructions) == [1000] * 24
+    assert histogram.memory_accesses.sum() == 2 * TRIPS
+    assert per_interval.shape == (24, 2)
+    assert (per_interval[:, 1] - per_interval[:, 0] == 3 * histogram.memory_accesses).all()
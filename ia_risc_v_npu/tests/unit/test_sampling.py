@@ -0,0 +1,124 @@
+import asyncio
+
+import numpy as np
+import pytest
+from src.simulator.cache import CacheHierarchy
+from src.simulator.hooks import TimingHookSystem
+from src.simulator.main import AdaptiveSimulator
+from src.simulator.sampling import choose_clusters, collect_intervals, estimate_sim_time, Interval
+from tests.assembler import add, assemble_b_type, assemble_lw
+
+
+BNE = 0b001
+
+# Two phases: a two-instruction loop, then a three-instruction loop.
+TWO_PHASE_PROGRAM = [
+    add(5, 5, 6),                        # 0x00
+    assemble_b_type(BNE, 5, 7, -4),      # 0x04
+    add(8, 8, 6),                        # 0x08
+    add(9, 9, 6),                        # 0x0c
+    assemble_b_type(BNE, 8, 10, -8),     # 0x10
+    0,
+]
+
+
+class PhaseTimingHooks:
+    """Deterministic fetch latency that differs between the two phases."""
+
+    def __init__(self):
+        self.counters = {'fetch': 0, 'memory': 0}
+
+    def fetch_hook(self, pc, inst_bits):
+        self.counters['fetch'] += 1
+        return 1 if pc < 0x08 else 4
+
+
+def make_simulator(**options):
+    simulator = AdaptiveSimulator(timing_hooks=PhaseTimingHooks(), **options)
+    simulator.load_program(TWO_PHASE_PROGRAM)
+    registers = simulator.risc_v_engine.registers
+    registers[6] = 1
+    registers[7] = 30_000
+    registers[10] = 20_000
+    return simulator
+
+
+def test_sampled_estimate_tracks_full_simulation():
+    reference = make_simulator()
+    full = asyncio.run(reference.run_simulation())
+
+    simulator = make_simulator()
+    sampled = asyncio.run(simulator.run_sampled_simulation(interval_size=1000, seed=7))
+
+    assert sampled.halted and sampled.reason == "halt"
+    assert sampled.cycles == full.cycles
+    assert sampled.instructions == full.instructions
+    assert sampled.clusters >= 2
+    assert sampled.detailed_instructions < full.cycles / 4
+    assert abs(sampled.sim_time - full.sim_time) <= max(sampled.sim_time_error, 0.02 * full.sim_time)
+    # The functional pass leaves the simulator in the final state.
+    assert simulator.risc_v_engine.registers == reference.risc_v_engine.registers
+    assert simulator.risc_v_engine.pc == reference.risc_v_engine.pc
+
+
+def test_sampled_simulation_honours_max_cycles():
+    simulator = make_simulator()
+    report = asyncio.run(simulator.run_sampled_simulation(5_500, interval_size=1000))
+
+    assert report.reason == "max_cycles_reached"
+    assert report.cycles == 5_500
+    assert report.intervals == 6
+    assert report.sim_time == 5_500  # phase one only, fully determined by one cluster
+
+
+def test_fast_forwarded_loops_are_sampled_in_full():
+    full = asyncio.run(make_simulator().run_simulation())
+
+    simulator = make_simulator(fast_forward_loops=True)
+    sampled = asyncio.run(simulator.run_sampled_simulation(interval_size=1000, seed=7))
+
+    assert sampled.cycles == full.cycles
+    assert sampled.instructions == full.instructions
+    assert abs(sampled.sim_time - full.sim_time) <= max(sampled.sim_time_error, 0.02 * full.sim_time)
+    assert simulator.loop_fast_forwarder.skipped_instructions == 0
+    assert simulator.risc_v_engine._backward_branch_hook is not None  # re-attached
+
+
+def test_functional_pass_leaves_data_timing_untouched():
+    hooks = TimingHookSystem(caches=CacheHierarchy())
+    simulator = AdaptiveSimulator(timing_hooks=hooks)
+    simulator.load_program([
+        assemble_lw(8, 9, 0),                # 0x00
+        add(5, 5, 6),                        # 0x04
+        assemble_b_type(BNE, 5, 7, -8),      # 0x08
+        0,
+    ])
+    registers = simulator.risc_v_engine.registers
+    registers[6], registers[7], registers[9] = 1, 100, 0x400
+
+    intervals, reason = collect_intervals(simulator, 50)
+
+    assert reason == "halt"
+    assert sum(interval.instructions for interval in intervals) == 300
+    assert hooks.caches.l1d.accesses == 0
+    assert hooks.counters['memory'] == 0
+    assert simulator.risc_v_engine.data_hook is not None  # re-attached
+
+
+def test_choose_clusters_separates_distinct_phases():
+    rng = np.random.default_rng(0)
+    points = np.array([[1.0, 0.0]] * 5 + [[0.0, 1.0]] * 3 + [[0.1, 0.9]])
+    labels, distances = choose_clusters(points, 4, rng)
+
+    assert len(set(labels[:5])) == 1 and len(set(labels[5:])) == 1
+    assert labels[0] != labels[5]
+    assert distances[:5].max() == 0.0
+
+
+def test_estimate_without_sampling_error_when_fully_simulated():
+    intervals = [Interval(index, index * 10, 10, None, {}) for index in range(3)]
+    labels = np.array([0, 0, 1])
+    estimate, error = estimate_sim_time(intervals, labels, {0: 20, 1: 40, 2: 50})
+
+    assert estimate == pytest.approx(110)
+    assert error == 0.0
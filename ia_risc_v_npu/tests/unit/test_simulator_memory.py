@@ -1,5 +1,5 @@
 import pytest
-from src.simulator.memory import SPM, Bus
+from src.simulator.memory import SPM, Bus, PagedMemory
 
 @pytest.fixture
 def spm():
@@ -79,3 +79,228 @@ def test_bus_cross_boundary_write(bus, spm):
     except MemoryError:
         exception_raised = True
     assert exception_raised # Write 8 bytes, but only 4 bytes left in device
+
+def test_paged_memory_access_across_pages():
+    memory = PagedMemory(4 * 4096)
+    data = bytes(range(256)) * 40
+    memory.write(4000, data)
+    assert memory.read(4000, len(data)) == data
+    assert memory.read(4094, 4) == data[94:98]
+
+def test_paged_memory_out_of_bounds():
+    memory = PagedMemory(4096)
+    with pytest.raises(IndexError, match="Memory read out of bounds"):
+        memory.read(4094, 4)
+    with pytest.raises(IndexError, match="Memory write out of bounds"):
+        memory.write(4095, b'\x00\x00')
+    with pytest.raises(ValueError):
+        PagedMemory(1000)
+
+def test_paged_memory_snapshot_is_copy_on_write():
+    memory = PagedMemory(16 * 4096)
+    memory.write(0, b'\x01\x02\x03\x04')
+    snapshot = memory.snapshot()
+    assert memory.copied_pages == 0
+
+    memory.write(2, b'\xff')
+    memory.write(5 * 4096, b'\xee')
+    assert memory.copied_pages == 2
+    assert snapshot[0][:4] == b'\x01\x02\x03\x04'
+
+    memory.restore(snapshot)
+    assert memory.read(0, 4) == b'\x01\x02\x03\x04'
+    assert memory.read(5 * 4096, 1) == b'\x00'
+
+    memory.write(0, b'\x09')
+    memory.restore(snapshot)  # snapshots survive being restored from
+    assert memory.read(0, 1) == b'\x01'
+
+
+def test_bus_routes_between_devices(bus, spm):
+    low = bytearray(range(16))
+    high = bytearray(range(100, 116))
+    bus.add_device("high", high, 0x3000, 0x300F)
+    bus.add_device("spm", spm, 0x1000, 0x1FFF)
+    bus.add_device("low", low, 0x0000, 0x000F)
+
+    assert bus.read(0x3004, 2) == bytes([104, 105])
+    assert bus.read(0x0004, 2) == bytes([4, 5])
+    bus.write(0x1000, b"\x07")
+    assert spm.read(0, 1) == b"\x07"
+    assert bus.read(0x3000, 1) == bytes([100])
+    with pytest.raises(MemoryError):
+        bus.read(0x0010, 1)  # gap between "low" and "spm"
+    with pytest.raises(MemoryError):
+        bus.read(0x300E, 4)  # runs past the last-hit device
+
+
+def test_bus_rejects_overlapping_devices(bus, spm):
+    bus.add_device("spm", spm, 0x1000, 0x1FFF)
+    with pytest.raises(ValueError, match="overlaps"):
+        bus.add_device("dram", bytearray(0x100), 0x1F00, 0x1FFF)
+    # Re-registering a device under its own name replaces it.
+    replacement = SPM(size_kb=4)
+    bus.add_device("spm", replacement, 0x1000, 0x1FFF)
+    bus.write(0x1000, b"\x01")
+    assert replacement.read(0, 1) == b"\x01"
+
+
+def test_spm_read_view_shares_storage(spm):
+    view = spm.read_view(8, 4)
+    spm.write(8, b"\x01\x02\x03\x04")
+    assert view.readonly
+    assert bytes(view) == b"\x01\x02\x03\x04"
+    with pytest.raises(IndexError, match="SPM read out of bounds"):
+        spm.read_view(spm.size - 2, 4)
+
+
+def test_paged_memory_read_view():
+    memory = PagedMemory(8192, page_size=4096)
+    memory.write(4094, b"\xaa\xbb\xcc\xdd")
+    snapshot = memory.snapshot()
+
+    within_page = memory.read_view(0, 16)
+    spanning = memory.read_view(4094, 4)
+    memory.write(0, b"\x11")  # copies page 0 away from the snapshot
+
+    assert within_page.readonly and spanning.readonly
+    assert bytes(spanning) == b"\xaa\xbb\xcc\xdd"
+    assert bytes(within_page[:1]) == b"\x00"  # still the snapshot's page
+    assert snapshot[0][0] == 0
+    assert bytes(memory.read_view(0, 1)) == b"\x11"
+
+
+def test_bus_read_view(bus, spm):
+    raw = bytearray(range(32))
+    bus.add_device("spm", spm, 0x1000, 0x1FFF)
+    bus.add_device("raw", raw, 0x3000, 0x301F)
+
+    spm_view = bus.read_view(0x1004, 4)
+    raw_view = bus.read_view(0x3002, 3)
+    bus.write(0x1004, b"\xca\xfe\xba\xbe")
+    raw[2] = 0xFF
+
+    assert bytes(spm_view) == b"\xca\xfe\xba\xbe"
+    assert bytes(raw_view) == b"\xff\x03\x04"
+    with pytest.raises(TypeError):
+        raw_view[0] = 0
+    with pytest.raises(MemoryError):
+        bus.read_view(0x1FFC, 8)
+
+
+def test_spm_word_access(spm):
+    spm.write_u32(4, 0xDEADBEEF)
+    spm.write_u64(8, 0x0123456789ABCDEF)
+    assert spm.read(4, 4) == b"\xef\xbe\xad\xde"
+    assert spm.read_u32(4) == 0xDEADBEEF
+    assert spm.read_u64(8) == 0x0123456789ABCDEF
+    with pytest.raises(IndexError, match="SPM read out of bounds"):
+        spm.read_u32(spm.size - 2)
+    with pytest.raises(IndexError, match="SPM write out of bounds"):
+        spm.write_u64(spm.size - 4, 0)
+
+
+def test_paged_memory_word_access_across_pages():
+    memory = PagedMemory(8192, page_size=4096)
+    snapshot = memory.snapshot()
+    memory.write_u32(4094, 0x11223344)
+    memory.write_u64(16, 0xCAFEBABE00C0FFEE)
+
+    assert memory.read(4094, 4) == b"\x44\x33\x22\x11"
+    assert memory.read_u32(4094) == 0x11223344
+    assert memory.read_u64(16) == 0xCAFEBABE00C0FFEE
+    assert snapshot == {}  # taken before any page was allocated
+    with pytest.raises(IndexError, match="Memory read out of bounds"):
+        memory.read_u32(8190)
+
+
+def test_bus_word_access(bus, spm):
+    raw = bytearray(16)
+    writes = []
+    bus.add_device("spm", spm, 0x1000, 0x1FFF)
+    bus.add_device("raw", raw, 0x3000, 0x300F)
+    bus.add_write_observer(lambda address, size: writes.append((address, size)))
+
+    bus.write_u32(0x1008, 0x01020304)
+    bus.write_u64(0x3008, 2 ** 64 - 1)
+
+    assert bus.read_u32(0x1008) == 0x01020304
+    assert spm.read(8, 4) == b"\x04\x03\x02\x01"
+    assert bus.read_u64(0x3008) == 2 ** 64 - 1
+    assert raw[8:] == b"\xff" * 8
+    assert writes == [(0x1008, 4), (0x3008, 8)]
+    with pytest.raises(MemoryError):
+        bus.read_u32(0x300E)
+
+
+def test_paged_memory_allocates_pages_lazily():
+    memory = PagedMemory(8 * 1024 ** 3)
+    assert memory.allocated_pages == 0
+    assert memory.read(5 * 1024 ** 3, 4) == b"\x00" * 4
+    assert memory.read_u32(7 * 1024 ** 3) == 0
+
+    memory.write_u32(6 * 1024 ** 3 + 4094, 0xAABBCCDD)
+    assert memory.allocated_pages == 2
+    assert memory.read_u32(6 * 1024 ** 3 + 4094) == 0xAABBCCDD
+
+    snapshot = memory.snapshot()
+    memory.write(0, b"\x01")
+    assert memory.allocated_pages == 3
+    memory.restore(snapshot)
+    assert memory.allocated_pages == 2
+    assert memory.read(0, 1) == b"\x00"
+    with pytest.raises(ValueError, match="memory has 1 pages"):
+        PagedMemory(4096).restore(snapshot)
+
+
+def test_paged_memory_maps_file_lazily(tmp_path):
+    image_path = tmp_path / "image.bin"
+    image_path.write_bytes(bytes(range(256)) * 40)  # 10240 bytes, 2.5 pages
+    memory = PagedMemory(8 * 4096)
+    memory.write(4096, b"\xff" * 8)
+
+    image = memory.map_file(4096, image_path)
+
+    assert memory.images == (image,)
+    assert memory.allocated_pages == 0
+    assert memory.read(4096 + 300, 4) == bytes([44, 45, 46, 47])
+    assert memory.read_u32(3 * 4096 + 2044) == int.from_bytes(bytes([252, 253, 254, 255]), "little")
+    assert memory.read(3 * 4096 + 2048, 4) == b"\x00" * 4  # past the end of the file
+    assert memory.allocated_pages == 2
+
+    snapshot = memory.snapshot()
+    memory.write(2 * 4096, b"\x00\x00")
+    assert memory.read(2 * 4096, 3) == bytes([0, 0, 2])
+    memory.restore(snapshot)
+    assert memory.read(2 * 4096, 3) == bytes([0, 1, 2])
+    assert image_path.read_bytes()[4096:4099] == bytes([0, 1, 2])  # file untouched
+
+    with pytest.raises(ValueError, match="aligned"):
+        memory.map_file(100, image_path)
+    with pytest.raises(IndexError, match="out of bounds"):
+        memory.map_file(6 * 4096, image_path)
+    memory.close()
+
+
+def test_paged_memory_latest_image_wins(tmp_path):
+    first, second = tmp_path / "first.bin", tmp_path / "second.bin"
+    first.write_bytes(b"A" * 2 * 4096)
+    second.write_bytes(b"B" * 4096)
+    memory = PagedMemory(4 * 4096)
+
+    image_a = memory.map_file(0, first)
+    image_b = memory.map_file(4096, second)
+
+    assert memory.images == (image_a, image_b)
+    assert memory.read(4094, 4) == b"AABB"
+
+    image_a = memory.map_file(0, first)  # covers the second image entirely
+
+    assert memory.images == (image_a,)
+    assert memory.read(4094, 4) == b"AAAA"
+
+    image_b = memory.map_file(0, second)
+
+    assert memory.images == (image_a, image_b)
+    assert memory.read(4094, 4) == b"BBAA"
+    memory.close()